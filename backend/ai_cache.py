@@ -0,0 +1,214 @@
+"""Response cache for AI calls, with in-flight deduplication.
+
+`ResponseCache.get_or_compute(key, compute)` returns a cached value while it
+is fresh (AI_CACHE_TTL_SECONDS). If an identical call is already running, it
+waits for that call instead of starting another: a double-click or a retry
+costs one upstream round trip, not two. Failures are shared with the waiters
+but never cached.
+
+Values are strings (the callers store JSON). The default backend is an
+in-process LRU of AI_CACHE_SIZE entries. AI_CACHE_BACKEND=sqlite keeps entries in a
+local SQLite file (AI_CACHE_PATH) so they survive restarts, and "off" disables caching.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+AI_CACHE_BACKEND = os.getenv("AI_CACHE_BACKEND", "memory")
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "./ai_cache.db")
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1000"))
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "600"))
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_entries: int = AI_CACHE_SIZE, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """The same LRU + TTL semantics in a SQLite file, shared by restarts (and by workers on one host).
+
+    Calls do disk I/O, so ResponseCache runs them in a worker thread; the lock
+    serializes the threads on the one connection.
+    """
+    blocking = True
+
+    def __init__(self, path: str = AI_CACHE_PATH, max_entries: int = AI_CACHE_SIZE, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=1000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ai_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_used_at ON ai_cache (used_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE ai_cache SET used_at = ? WHERE key = ? AND expires_at > ? RETURNING value", (now, key, now)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float):
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            # Expired rows first, then the least recently used beyond the cap
+            self._conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM ai_cache WHERE key IN "
+                "(SELECT key FROM ai_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl: float = AI_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight = {}
+
+    async def _call(self, method, *args):
+        """Run a backend method, off the event loop if it blocks."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _cached(self, key: str) -> Optional[str]:
+        value = await self._call(self.backend.get, key) if self.backend is not None else None
+        if value is not None:
+            self.hits += 1
+        return value
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Cached value for `key`, or the result of an identical call already in flight.
+
+        None (counted as a miss) means the caller has to compute the value itself
+        and `store` it; used where the result cannot come from a single awaitable,
+        such as a streamed reply.
+        """
+        value = await self._cached(key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        self.misses += 1
+        return None
+
+    async def store(self, key: str, value: str):
+        if self.backend is not None:
+            await self._call(self.backend.set, key, value, self.ttl)
+
+    async def get_or_compute(self, key: str, compute) -> str:
+        """Cached value for `key`, or the result of `await compute()` shared with concurrent callers."""
+        value = await self._cached(key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so one caller going away does not cancel the others' result
+            task = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute) -> str:
+        try:
+            value = await compute()
+        except BaseException:
+            self.errors += 1
+            raise
+        else:
+            await self.store(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+
+def create_backend(kind: str):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "off":
+        return None
+    raise ValueError(f"Unknown AI_CACHE_BACKEND: {kind}")
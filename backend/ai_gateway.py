@@ -0,0 +1,223 @@
+"""Admission control in front of the OpenAI API.
+
+Every upstream call runs inside `gateway.slot(user_id)`:
+
+- at most AI_MAX_CONCURRENCY calls are in flight, and at most AI_MAX_PER_USER
+  per user; a user over their share gets AIRateLimited (429) immediately
+- callers waiting for a global slot form a queue of at most AI_MAX_QUEUE;
+  beyond that AIOverloaded (503) is raised instead of piling up coroutines
+- each call has a deadline of AI_TIMEOUT_SECONDS covering both the wait and
+  the upstream request (AITimeout, 504)
+- AI_BREAKER_THRESHOLD consecutive upstream failures open the circuit for
+  AI_BREAKER_COOLDOWN_SECONDS, during which calls fail with AIUnavailable (503)
+  without reaching the API; afterwards a single trial call decides whether it closes
+"""
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_MAX_PER_USER = int(os.getenv("AI_MAX_PER_USER", "2"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "32"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "30"))
+AI_BREAKER_THRESHOLD = int(os.getenv("AI_BREAKER_THRESHOLD", "5"))
+AI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("AI_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class AIGatewayError(RuntimeError):
+    status_code = 503
+    retry_after: Optional[float] = None
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        if retry_after is not None:
+            self.retry_after = retry_after
+
+
+class AIRateLimited(AIGatewayError):
+    status_code = 429
+    retry_after = 1
+
+
+class AIOverloaded(AIGatewayError):
+    retry_after = 1
+
+
+class AIUnavailable(AIGatewayError):
+    pass
+
+
+class AITimeout(AIGatewayError):
+    status_code = 504
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    # 4xx responses other than 429 are the request's fault, not the upstream's
+    status = getattr(exc, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open after `cooldown` -> closed on success."""
+
+    def __init__(self, threshold: int = AI_BREAKER_THRESHOLD, cooldown: float = AI_BREAKER_COOLDOWN_SECONDS,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def check(self):
+        """Raise AIUnavailable if a call would be refused right now."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            remaining = self.cooldown - (self.clock() - self.opened_at)
+            raise AIUnavailable("AI service temporarily unavailable", retry_after=max(remaining, 1))
+
+    def before_call(self) -> bool:
+        """check(), then claim the half-open trial if due; returns True for the trial call."""
+        self.check()
+        if self.opened_at is None:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self, probe: bool = False):
+        self.failures = 0
+        self.opened_at = None
+        if probe:
+            self._probing = False
+
+    def record_failure(self, probe: bool = False):
+        self.failures += 1
+        if probe or (self.opened_at is None and self.failures >= self.threshold):
+            self.trips += 1
+            self.opened_at = self.clock()
+        if probe:
+            self._probing = False
+
+    def release_probe(self):
+        # The trial call ended without a verdict (rejected, cancelled, or the caller's own error)
+        self._probing = False
+
+
+class AIGateway:
+    def __init__(self, max_concurrency: int = AI_MAX_CONCURRENCY, max_per_user: int = AI_MAX_PER_USER,
+                 max_queue: int = AI_MAX_QUEUE, timeout: float = AI_TIMEOUT_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.clock = clock
+        self.in_flight = 0
+        self.queued = 0
+        self.calls = 0
+        self.rejected = Counter()
+        self.latencies = deque(maxlen=1024)
+        self.latency_sum = 0.0
+        self._per_user = Counter()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def check(self, user_id=None):
+        """Raise now if a call would be refused, so streaming routes can still answer with a status code."""
+        if user_id is not None and self._per_user[user_id] >= self.max_per_user:
+            self.rejected["per_user"] += 1
+            raise AIRateLimited("Too many AI requests in progress for this user")
+        try:
+            self.breaker.check()
+        except AIUnavailable:
+            self.rejected["circuit_open"] += 1
+            raise
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AIOverloaded("AI service is overloaded")
+
+    @asynccontextmanager
+    async def slot(self, user_id=None, timeout: Optional[float] = None):
+        self.check(user_id)
+        probe = self.breaker.before_call()
+
+        if user_id is not None:
+            self._per_user[user_id] += 1
+        acquired = False
+        started = None
+        succeeded = None  # None: no verdict for the breaker
+        try:
+            try:
+                async with asyncio.timeout(self.timeout if timeout is None else timeout):
+                    self.queued += 1
+                    try:
+                        await self._slots.acquire()
+                        acquired = True
+                    finally:
+                        self.queued -= 1
+                    self.in_flight += 1
+                    started = self.clock()
+                    yield
+            except TimeoutError as exc:
+                self.rejected["timeout"] += 1
+                raise AITimeout("AI request deadline exceeded") from exc
+            succeeded = True
+        except Exception as exc:
+            if started is not None and is_upstream_failure(exc):
+                succeeded = False
+            raise
+        finally:
+            if succeeded is True:
+                self.breaker.record_success(probe)
+            elif succeeded is False:
+                self.breaker.record_failure(probe)
+            elif probe:
+                self.breaker.release_probe()
+            if started is not None:
+                elapsed = self.clock() - started
+                self.latencies.append(elapsed)
+                self.latency_sum += elapsed
+                self.calls += 1
+                self.in_flight -= 1
+            if acquired:
+                self._slots.release()
+            if user_id is not None:
+                self._per_user[user_id] -= 1
+                if not self._per_user[user_id]:
+                    del self._per_user[user_id]
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def quantile(q):
+            return latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else None
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "calls": self.calls,
+            "rejected": dict(self.rejected),
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "circuit_trips": self.breaker.trips,
+            "latency_seconds": {
+                "count": self.calls, "sum": self.latency_sum,
+                "p50": quantile(0.5), "p95": quantile(0.95), "max": latencies[-1] if latencies else None,
+            },
+        }
+
+
+gateway = AIGateway()
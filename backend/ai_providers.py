@@ -0,0 +1,234 @@
+"""Backends that answer AI requests, selected with AI_PROVIDER.
+
+"openai" calls the OpenAI API (AI_MODEL; OPENAI_BASE_URL for any compatible
+server). The client is created on first use, so importing the app needs no key.
+
+"local" answers offline with a deterministic, rule-based engine that reads the
+board context and the user's message ("add a card called "X" to Done",
+"delete #12", "rename #4 to Y", "add 5 cards"). Each reply waits a simulated
+model latency drawn from a log-normal distribution (median AI_LOCAL_LATENCY_MS,
+spread AI_LOCAL_LATENCY_SIGMA; 0 for a fixed delay) and streams at
+AI_LOCAL_CHARS_PER_SECOND, so the chat path can be load-tested without the network.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+import metrics
+
+AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
+AI_MODEL = os.getenv("AI_MODEL", "gpt-5-nano")
+AI_LOCAL_LATENCY_MS = float(os.getenv("AI_LOCAL_LATENCY_MS", "300"))
+AI_LOCAL_LATENCY_SIGMA = float(os.getenv("AI_LOCAL_LATENCY_SIGMA", "0.5"))
+AI_LOCAL_CHARS_PER_SECOND = float(os.getenv("AI_LOCAL_CHARS_PER_SECOND", "400"))
+AI_LOCAL_SEED = os.getenv("AI_LOCAL_SEED")
+
+
+class AIProvider(ABC):
+    """Answers the three kinds of requests ai_service makes.
+
+    `chat` returns an AIResponse; `stream_chat` yields the same reply as
+    fragments of its JSON document.
+    """
+    name = "base"
+    model = None
+
+    @abstractmethod
+    async def complete(self, prompt: str) -> str:
+        ...
+
+    @abstractmethod
+    async def chat(self, user_message: str, board_context: str):
+        ...
+
+    @abstractmethod
+    def stream_chat(self, user_message: str, board_context: str) -> AsyncIterator[str]:
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIProvider(AIProvider):
+    name = "openai"
+
+    def __init__(self, model: str = AI_MODEL, client=None):
+        self.model = model
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            from ai_gateway import AI_TIMEOUT_SECONDS
+            # Reads OPENAI_API_KEY / OPENAI_BASE_URL from the environment
+            self._client = AsyncOpenAI(timeout=AI_TIMEOUT_SECONDS)
+        return self._client
+
+    def _record_usage(self, usage):
+        if usage is not None:
+            metrics.AI_TOKENS.labels(self.name, "prompt").inc(usage.prompt_tokens)
+            metrics.AI_TOKENS.labels(self.name, "completion").inc(usage.completion_tokens)
+
+    async def complete(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        self._record_usage(response.usage)
+        return response.choices[0].message.content or ""
+
+    async def chat(self, user_message: str, board_context: str):
+        from ai_service import AIResponse, build_messages
+        response = await self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=build_messages(user_message, board_context),
+            response_format=AIResponse
+        )
+        self._record_usage(response.usage)
+        return response.choices[0].message.parsed
+
+    async def stream_chat(self, user_message: str, board_context: str):
+        from ai_service import AIResponse, build_messages
+        async with self.client.chat.completions.stream(
+            model=self.model,
+            messages=build_messages(user_message, board_context),
+            response_format=AIResponse,
+            # The last chunk then carries the token usage
+            stream_options={"include_usage": True},
+        ) as stream:
+            async for event in stream:
+                if event.type == "content.delta":
+                    yield event.delta
+                elif event.type == "chunk" and event.chunk.usage is not None:
+                    self._record_usage(event.chunk.usage)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+
+
+COLUMN_LINE = re.compile(r'^Column (\d+) "(.*)" \(\d+ cards\)$')
+CARD_LINE = re.compile(r"^- #(\d+) ")
+QUOTED = re.compile(r'"([^"]+)"|“([^”]+)”')
+NAMED = re.compile(r"\b(?:called|named|titled)\s+(.+?)(?=\s+(?:to|in|into|on)\s|[.!?]?$)", re.IGNORECASE)
+CARD_ID = re.compile(r"(?:#|\bcard\s+)(\d+)", re.IGNORECASE)
+RENAME = re.compile(r"\b(?:rename|retitle)\b.*?\bto\s+(.+?)[.!?]?$", re.IGNORECASE)
+ADD_MANY = re.compile(r"\badd\s+(\d+)\s+cards?\b", re.IGNORECASE)
+MAX_GENERATED_CARDS = 50
+
+
+def parse_board_context(board_context: str):
+    """Column (id, title) pairs and the set of card ids visible in a board_context.build_board_context text."""
+    columns, card_ids = [], set()
+    for line in board_context.splitlines():
+        if match := COLUMN_LINE.match(line):
+            columns.append((int(match.group(1)), match.group(2)))
+        elif match := CARD_LINE.match(line):
+            card_ids.add(int(match.group(1)))
+    return columns, card_ids
+
+
+def rule_based_reply(user_message: str, board_context: str) -> dict:
+    """The same message against the same board always gets the same reply."""
+    columns, card_ids = parse_board_context(board_context)
+    text = user_message.strip()
+    lowered = text.lower()
+    # The column named after "to/in/into", else any column the message mentions
+    target = next((title for _, title in columns if re.search(rf"\b(?:to|in|into)\s+(?:the\s+)?{re.escape(title.lower())}\b", lowered)), None)
+    target = target or next((title for _, title in columns if title.lower() in lowered), None)
+    operations = []
+
+    def operation(action, title=None, column_name=None, card_id=None):
+        return {"action": action, "title": title, "description": None, "column_name": column_name, "card_id": card_id}
+
+    if re.search(r"\b(delete|remove|archive)\b", lowered):
+        for card_id in dict.fromkeys(int(n) for n in CARD_ID.findall(text)):
+            if card_id in card_ids:
+                operations.append(operation("delete_card", card_id=card_id))
+    elif (rename := RENAME.search(text)) and (ids := CARD_ID.findall(text)):
+        if int(ids[0]) in card_ids:
+            operations.append(operation("update_card", title=rename.group(1).strip('"“” '), card_id=int(ids[0])))
+    elif re.search(r"\b(add|create|new)\b", lowered) and columns:
+        titles = [a or b for a, b in QUOTED.findall(text)]
+        if not titles and (named := NAMED.search(text)):
+            titles = [named.group(1).strip()]
+        if not titles and (many := ADD_MANY.search(text)):
+            titles = [f"Card {i + 1}" for i in range(min(int(many.group(1)), MAX_GENERATED_CARDS))]
+        column_name = target or columns[0][1]
+        operations.extend(operation("add_card", title=title, column_name=column_name) for title in titles)
+
+    if operations:
+        counts = {}
+        for op in operations:
+            counts[op["action"]] = counts.get(op["action"], 0) + 1
+        verbs = {"add_card": "Added", "update_card": "Renamed", "delete_card": "Deleted"}
+        message = ", ".join(f"{verbs[action]} {n} card{'s' if n != 1 else ''}" for action, n in counts.items()) + "."
+    else:
+        message = f"Your board has {len(columns)} columns and {len(card_ids)} cards in view. Nothing to change."
+    return {"response_message": message, "operations": operations}
+
+
+class LocalProvider(AIProvider):
+    name = "local"
+    model = "local-rules"
+
+    def __init__(self, latency_ms: float = AI_LOCAL_LATENCY_MS, sigma: float = AI_LOCAL_LATENCY_SIGMA,
+                 chars_per_second: float = AI_LOCAL_CHARS_PER_SECOND, seed: Optional[int] = None, chunk_size: int = 16):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.chars_per_second = chars_per_second
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def latency(self) -> float:
+        """Seconds until the first token: log-normal around the median, or fixed with sigma 0."""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.latency_ms / 1000
+        return self.random.lognormvariate(math.log(self.latency_ms / 1000), self.sigma)
+
+    def _transfer_time(self, text: str) -> float:
+        return len(text) / self.chars_per_second if self.chars_per_second > 0 else 0.0
+
+    async def complete(self, prompt: str) -> str:
+        self.requests += 1
+        numbers = re.fullmatch(r"\s*what is (\d+)\s*([+*-])\s*(\d+)\??\s*", prompt, re.IGNORECASE)
+        if numbers:
+            a, op, b = int(numbers.group(1)), numbers.group(2), int(numbers.group(3))
+            reply = str(a + b if op == "+" else a - b if op == "-" else a * b)
+        else:
+            reply = "OK"
+        await asyncio.sleep(self.latency() + self._transfer_time(reply))
+        return reply
+
+    async def chat(self, user_message: str, board_context: str):
+        from ai_service import AIResponse
+        self.requests += 1
+        document = json.dumps(rule_based_reply(user_message, board_context))
+        await asyncio.sleep(self.latency() + self._transfer_time(document))
+        return AIResponse.model_validate_json(document)
+
+    async def stream_chat(self, user_message: str, board_context: str):
+        self.requests += 1
+        document = json.dumps(rule_based_reply(user_message, board_context))
+        await asyncio.sleep(self.latency())
+        for i in range(0, len(document), self.chunk_size):
+            chunk = document[i:i + self.chunk_size]
+            await asyncio.sleep(self._transfer_time(chunk))
+            yield chunk
+
+
+def create_provider(kind: str) -> AIProvider:
+    if kind == "openai":
+        return OpenAIProvider()
+    if kind == "local":
+        return LocalProvider(seed=int(AI_LOCAL_SEED) if AI_LOCAL_SEED else None)
+    raise ValueError(f"Unknown AI_PROVIDER: {kind}")
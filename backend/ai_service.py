@@ -1,20 +1,37 @@
-import os
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+import time
+from contextlib import asynccontextmanager
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+import ai_gateway
+import metrics
+from ai_cache import AI_CACHE_BACKEND, ResponseCache, cache_key, create_backend
+from ai_providers import AI_PROVIDER, create_provider
+
+# AI_PROVIDER=openai (default) or local; see ai_providers.py
+provider = create_provider(AI_PROVIDER)
+# Keyed by model, prompt and board version; concurrent identical calls share one upstream request
+response_cache = ResponseCache(create_backend(AI_CACHE_BACKEND))
+
+@asynccontextmanager
+async def timed_call(operation: str):
+    """Record the provider call's latency (not the gateway wait) by operation and outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        metrics.AI_REQUEST_SECONDS.labels(provider.name, operation, outcome).observe(time.perf_counter() - started)
 
 async def ask_math_question(prompt: str = "What is 2+2?") -> str:
-    response = await client.chat.completions.create(
-        model="gpt-5-nano",
-        messages=[{"role": "user", "content": prompt}],
-    )
-    
-    return response.choices[0].message.content or ""
+    async def compute():
+        async with ai_gateway.gateway.slot(), timed_call("complete"):
+            return await provider.complete(prompt)
+
+    return await response_cache.get_or_compute(cache_key(provider.model, prompt), compute)
 import json
 from pydantic import BaseModel, Field
 
@@ -29,24 +46,142 @@ class AIResponse(BaseModel):
     response_message: str = Field(description="The natural language response to the user")
     operations: list[BoardOperation] = Field(description="List of operations to apply to the Kanban board")
 
-async def process_chat(user_message: str, board_data: dict) -> AIResponse:
-    prompt = f"""You are a helpful Kanban board assistant.
-Here is the current board state in JSON format:
-{json.dumps(board_data, indent=2)}
+def build_prompt(user_message: str, board_context: str) -> str:
+    return f"""You are a helpful Kanban board assistant.
+Here is the current board. Each column is listed with its id, and each card as "#<card_id> <title> — <description>":
+{board_context}
 
 The user says: "{user_message}"
 
 Determine if any operations need to be performed on the board. Respond with a helpful message and the required operations. 
 Only use column_name if you need to add to it, or card_id if you want to modify/delete it.
 """
-    
-    response = await client.beta.chat.completions.parse(
-        model="gpt-5-nano",
-        messages=[
-            {"role": "system", "content": "You are a helpful Kanban assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        response_format=AIResponse
-    )
-    
-    return response.choices[0].message.parsed
+
+def build_messages(user_message: str, board_context: str) -> list[dict]:
+    return [
+        {"role": "system", "content": "You are a helpful Kanban assistant."},
+        {"role": "user", "content": build_prompt(user_message, board_context)}
+    ]
+
+def chat_cache_key(user_message: str, board_context: str, board_version=None) -> str:
+    return cache_key(provider.model, build_messages(user_message, board_context), board_version)
+
+def chat_reply_id(user_message: str, board_context: str, board_version, response: AIResponse) -> str:
+    """Identifies one reply: its question and board version, plus the operations it proposes.
+
+    Duplicate submits sharing a cached reply get the same id and apply it once;
+    a fresh reply with other operations (cache off or expired) gets its own.
+    """
+    operations = [operation.model_dump() for operation in response.operations]
+    return cache_key(chat_cache_key(user_message, board_context, board_version), operations)
+
+async def process_chat(user_message: str, board_context: str, board_version=None, user_id=None) -> AIResponse:
+    """`board_version` (e.g. "<board id>:<version>") scopes the cached reply to one state of the board."""
+    async def compute():
+        async with ai_gateway.gateway.slot(user_id), timed_call("chat"):
+            response = await provider.chat(user_message, board_context)
+        return response.model_dump_json()
+
+    key = chat_cache_key(user_message, board_context, board_version)
+    return AIResponse.model_validate_json(await response_cache.get_or_compute(key, compute))
+
+class AIResponseParser:
+    """Incremental parser for the AIResponse JSON as it streams in.
+
+    `feed` returns ("message", text) events for each new piece of
+    response_message and ("operation", BoardOperation) once an operation's
+    object has closed; `result` validates the complete document.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []          # open containers: "{" or "["
+        self._in_string = False
+        self._escape = ""         # pending escape sequence inside a string
+        self._string_start = 0
+        self._expect_key = False  # next string in the top-level object is a key
+        self._key = None          # top-level key whose value is being read
+        self._message_start = None
+        self._operation_start = None
+
+    def feed(self, chunk: str) -> list[tuple]:
+        self.text += chunk
+        events = []
+        message = []
+        text = self.text
+        while self._pos < len(text):
+            i, ch = self._pos, text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape += ch
+                    if self._escape[1] != "u" or len(self._escape) == 6:
+                        if self._message_start is not None:
+                            message.append(json.loads(f'"{self._escape}"'))
+                        self._escape = ""
+                elif ch == "\\":
+                    self._escape = ch
+                elif ch == '"':
+                    self._in_string = False
+                    if self._message_start is not None:
+                        self._message_start = None
+                    elif len(self._stack) == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                        self._expect_key = False
+                elif self._message_start is not None:
+                    message.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if len(self._stack) == 1 and not self._expect_key and self._key == "response_message":
+                    self._message_start = i
+            elif ch in "{[":
+                if ch == "{" and len(self._stack) == 2 and self._key == "operations":
+                    self._operation_start = i
+                self._stack.append(ch)
+                if len(self._stack) == 1:
+                    self._expect_key = True
+            elif ch in "}]":
+                self._stack.pop()
+                if ch == "}" and len(self._stack) == 2 and self._operation_start is not None:
+                    if message:
+                        events.append(("message", "".join(message)))
+                        message = []
+                    events.append(("operation", BoardOperation.model_validate_json(text[self._operation_start:i + 1])))
+                    self._operation_start = None
+            elif ch == "," and len(self._stack) == 1:
+                self._expect_key = True
+                self._key = None
+        if message:
+            events.append(("message", "".join(message)))
+        return events
+
+    def result(self) -> AIResponse:
+        return AIResponse.model_validate_json(self.text)
+
+async def stream_chat(user_message: str, board_context: str, board_version=None):
+    """Yield the parser's events as the model streams its structured reply, then ("done", AIResponse).
+
+    A reply already in the cache, or being computed by an identical non-streamed
+    call, is replayed as one message event and its operations."""
+    key = chat_cache_key(user_message, board_context, board_version)
+    cached = await response_cache.lookup(key)
+    if cached is not None:
+        result = AIResponse.model_validate_json(cached)
+        if result.response_message:
+            yield ("message", result.response_message)
+        for operation in result.operations:
+            yield ("operation", operation)
+        yield ("done", result)
+        return
+
+    parser = AIResponseParser()
+    async with timed_call("stream"):
+        async for delta in provider.stream_chat(user_message, board_context):
+            for parsed in parser.feed(delta):
+                yield parsed
+        result = parser.result()
+    await response_cache.store(key, result.model_dump_json())
+    yield ("done", result)
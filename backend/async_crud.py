@@ -0,0 +1,82 @@
+"""Async counterparts of the crud.py functions for use from `async def` routes.
+
+Simple reads and inserts are written against AsyncSession directly. Functions
+with non-trivial logic (snapshot assembly, rank placement) reuse the sync
+implementation through `AsyncSession.run_sync`, which runs it on the async
+connection without blocking the event loop on I/O.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import models, schemas, crud, passwords
+
+# Users
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await passwords.hasher.hash(user.password)
+    db_user = models.User(username=user.username, password_hash=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def register_user(db: AsyncSession, username: str, password: str, template: str = "default") -> int:
+    """Create a user and their default board in one transaction; returns the user id."""
+    hashed_password = await passwords.hasher.hash(password)
+    return await db.run_sync(crud.create_user_with_board, username, hashed_password, template)
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[models.User]:
+    user = await get_user_by_username(db, username)
+    if not user or not await passwords.hasher.verify(password, user.password_hash):
+        return None
+    if passwords.hasher.needs_rehash(user.password_hash):
+        # The configured work factor changed since this hash was made
+        user.password_hash = await passwords.hasher.hash(password)
+        await db.commit()
+    return user
+
+async def revoke_token(db: AsyncSession, jti: str, expires_at):
+    await db.run_sync(crud.revoke_token, jti, expires_at)
+
+# Boards
+async def get_board_snapshots(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_board_snapshots, user_id)
+
+async def get_board_with_owner(db: AsyncSession, board_id: int):
+    return await db.run_sync(crud.get_board_with_owner, board_id)
+
+async def get_latest_change_seq(db: AsyncSession, board_id: int) -> int:
+    return await db.run_sync(crud.get_latest_change_seq, board_id)
+
+async def get_board_changes(db: AsyncSession, board: models.Board, since: int, limit: int = 500):
+    return await db.run_sync(crud.get_board_changes, board, since, limit)
+
+async def create_board(db: AsyncSession, board: schemas.BoardCreate):
+    db_board = models.Board(title=board.title, user_id=board.user_id)
+    db.add(db_board)
+    await db.commit()
+    await db.refresh(db_board)
+    return db_board
+
+# Columns
+async def create_column(db: AsyncSession, column: schemas.ColumnCreate):
+    return await db.run_sync(crud.create_column, column)
+
+# Cards
+async def get_card_with_owner(db: AsyncSession, card_id: int):
+    return await db.run_sync(crud.get_card_with_owner, card_id)
+
+async def create_card(db: AsyncSession, card: schemas.CardCreate):
+    return await db.run_sync(crud.create_card, card)
+
+async def update_card(db: AsyncSession, db_card: models.Card, card_update: schemas.CardUpdate):
+    return await db.run_sync(crud.update_card, db_card, card_update)
+
+async def delete_card(db: AsyncSession, db_card: models.Card):
+    return await db.run_sync(crud.delete_card, db_card)
+
+async def apply_board_operations(db: AsyncSession, board: models.Board, operations, since_seq: Optional[int] = None,
+                                 reply_id: Optional[str] = None):
+    return await db.run_sync(crud.apply_board_operations, board, operations, since_seq, reply_id)
@@ -0,0 +1,200 @@
+from fastapi import Depends, HTTPException, status, Request
+from fastapi.security import HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import jwt
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import models, crud, async_crud, profiling
+from database import get_db
+
+SECRET_KEY = "your-secret-key-change-in-production"
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
+    # jti keeps every token distinct, so revoking one never affects a later login
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(8)})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if "sub" in data:
+        # A token just issued is known to be valid: its first use skips the decode and denylist check
+        token_cache.put(encoded_jwt, int(data["sub"]), expire.timestamp())
+    return encoded_jwt
+
+def verify_token(token: str):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return payload
+    except jwt.PyJWTError:
+        return None
+
+class TokenCache:
+    """Bounded LRU of verified tokens, keyed by SHA-256 digest, holding the decoded user id.
+
+    An entry lives for `ttl` seconds but never past the token's own `exp`.
+    Tokens revoked in this process are remembered until they expire. The cache
+    is per process: revocations reach other workers through the
+    revoked_tokens table, which resolve_token checks on every cache miss, so
+    another worker stops accepting a logged-out token within `ttl` seconds.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL_SECONDS, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token: str) -> Optional[int]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, user_id: int, exp: Optional[float] = None):
+        now = self.clock()
+        expires_at = now + self.ttl if exp is None else min(now + self.ttl, exp)
+        key = self._key(token)
+        with self._lock:
+            if key in self._revoked or expires_at <= now:
+                return
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, token: str) -> bool:
+        with self._lock:
+            return self._key(token) in self._revoked
+
+    def revoke(self, token: str, exp: Optional[float] = None):
+        now = self.clock()
+        key = self._key(token)
+        with self._lock:
+            self._entries.pop(key, None)
+            # Drop denylist entries whose tokens can no longer verify anyway
+            for revoked_key in [k for k, until in self._revoked.items() if until <= now]:
+                del self._revoked[revoked_key]
+            self._revoked[key] = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60 if exp is None else exp
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revoked": len(self._revoked),
+            }
+
+token_cache = TokenCache()
+
+def _token_id(token: str, payload: dict) -> str:
+    # Tokens issued before jti was added are identified by their digest
+    return payload.get("jti") or hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def resolve_token(db: Session, token: str) -> Optional[int]:
+    """User id of a valid, unrevoked bearer token, or None."""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    payload = verify_token(token)
+    if payload is None or token_cache.is_revoked(token):
+        return None
+    if crud.is_token_revoked(db, _token_id(token, payload)):
+        token_cache.revoke(token, payload.get("exp"))
+        return None
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    token_cache.put(token, int(user_id), payload.get("exp"))
+    return int(user_id)
+
+def get_current_user(request: Request, token: str = Depends(security), db: Session = Depends(get_db)):
+    user_id = resolve_token(db, token.credentials)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    profiling.attribute(user_id)
+    return user_id
+
+async def revoke_token(db: AsyncSession, token: str):
+    payload = verify_token(token)
+    if payload is None:
+        return
+    exp = payload.get("exp", time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    token_cache.revoke(token, exp)
+    expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+    await async_crud.revoke_token(db, _token_id(token, payload), expires_at)
+
+# Ownership checks: each resolves the row and its board owner in one joined query
+def _authorize(row, user_id: int, not_found: str):
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    obj, owner_id = row
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return obj
+
+def authorize_board(db: Session, board_id: int, user_id: int) -> models.Board:
+    return _authorize(crud.get_board_with_owner(db, board_id), user_id, "Board not found")
+
+def authorize_column(db: Session, column_id: int, user_id: int) -> models.Column:
+    return _authorize(crud.get_column_with_owner(db, column_id), user_id, "Column not found")
+
+def authorize_card(db: Session, card_id: int, user_id: int) -> models.Card:
+    return _authorize(crud.get_card_with_owner(db, card_id), user_id, "Card not found")
+
+# FastAPI dependencies for routes addressing a row by path parameter
+def owned_board(board_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)) -> models.Board:
+    return authorize_board(db, board_id, current_user_id)
+
+def owned_column(column_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)) -> models.Column:
+    return authorize_column(db, column_id, current_user_id)
+
+def owned_card(card_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)) -> models.Card:
+    return authorize_card(db, card_id, current_user_id)
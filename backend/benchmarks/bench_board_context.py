@@ -0,0 +1,53 @@
+"""Prompt size and build time of the AI board context, from 10 to 10,000 cards.
+
+Compares the previous prompt body (the board as indented JSON) with the
+budgeted compact context.
+
+    python benchmarks/bench_board_context.py --budget 4000
+"""
+import argparse
+import json
+
+from common import timed
+
+from board_context import build_board_context, estimate_tokens
+
+
+def board_data(cards, columns=5):
+    return {
+        "board_title": "Benchmark",
+        "columns": [
+            {
+                "id": c,
+                "title": f"Column {c}",
+                "cards": [
+                    {
+                        "id": c * 100000 + i,
+                        "title": f"Ship release {i} checklist" if i % 97 == 0 else f"Task {i} for the team",
+                        "description": "Coordinate with design and QA, update the docs, and notify support. " * 3,
+                    }
+                    for i in range(cards // columns)
+                ],
+            }
+            for c in range(columns)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'cards':>6}  {'json tokens':>11}  {'context tokens':>14}  {'listed':>7}  {'relevant+desc':>13}  {'build ms':>8}")
+    for cards in (10, 100, 1000, 10000):
+        data = board_data(cards)
+        json_tokens = estimate_tokens(json.dumps(data, indent=2))
+        context = build_board_context(data, "update the release checklist", args.budget)
+        best, _ = timed(lambda: build_board_context(data, "update the release checklist", args.budget))
+        print(f"{cards:>6}  {json_tokens:>11}  {context.tokens:>14}  {context.cards_listed:>7}  "
+              f"{context.descriptions:>13}  {best * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare persisting one drag via per-card PATCH requests vs. the bulk moves endpoint.
+
+    python benchmarks/bench_card_moves.py --cards 200
+"""
+import argparse
+
+from common import bench_client, login, temp_database, timed
+
+import crud, models, schemas
+
+
+def seed(session_factory, cards_per_column):
+    db = session_factory()
+    user = crud.create_user(db, schemas.UserCreate(username="bench", password="pw"))
+    board = crud.create_board(db, schemas.BoardCreate(title="Bench", user_id=user.id))
+    source = crud.create_column(db, schemas.ColumnCreate(title="Source", order=0, board_id=board.id))
+    target = crud.create_column(db, schemas.ColumnCreate(title="Target", order=1, board_id=board.id))
+    for column in (source, target):
+        db.add_all(
+            models.Card(title=f"Card {i}", description="", order=i, column_id=column.id)
+            for i in range(cards_per_column)
+        )
+    db.commit()
+    ids = (board.id, source.id, target.id)
+    db.close()
+    return ids
+
+
+def drag_layout(client, board_id, source_id, target_id):
+    """Move the first card of the source column to the top of the target column."""
+    columns = {c["id"]: [card["id"] for card in c["cards"]] for c in client.get(
+        f"/api/users/{client.user_id}/boards").json()[0]["columns"]}
+    moved = columns[source_id].pop(0)
+    columns[target_id].insert(0, moved)
+    return [
+        {"card_id": card_id, "column_id": column_id, "order": index}
+        for column_id in (target_id, source_id)
+        for index, card_id in enumerate(columns[column_id])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=200, help="cards per column")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, session_factory):
+        board_id, source_id, target_id = seed(session_factory, args.cards)
+        with bench_client(engine, session_factory) as client:
+            client.user_id = login(client, "bench")
+
+            def per_card_patch():
+                for move in drag_layout(client, board_id, source_id, target_id):
+                    client.patch(f"/api/cards/{move['card_id']}",
+                                 json={"column_id": move["column_id"], "order": move["order"]})
+
+            def bulk_moves():
+                moves = drag_layout(client, board_id, source_id, target_id)
+                client.post(f"/api/boards/{board_id}/moves", json={"moves": moves}).raise_for_status()
+
+            requests_per_drag = len(drag_layout(client, board_id, source_id, target_id))
+            patch_best, patch_mean = timed(per_card_patch, args.repeat)
+            bulk_best, bulk_mean = timed(bulk_moves, args.repeat)
+
+    print(f"{args.cards} cards per column, {requests_per_drag} cards rewritten per drag")
+    print(f"per-card PATCH : best {patch_best * 1000:8.1f} ms  mean {patch_mean * 1000:8.1f} ms  ({requests_per_drag} requests)")
+    print(f"bulk moves     : best {bulk_best * 1000:8.1f} ms  mean {bulk_mean * 1000:8.1f} ms  (1 request)")
+    print(f"speedup        : {patch_best / bulk_best:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Latency of an unrelated endpoint while many AI chat requests are in flight.
+
+The model is the local provider (ai_providers.LocalProvider): no network, a
+log-normal reply latency, and real operations applied to the board. The
+numbers measure how much the chat path's own work (DB round trips, pool waits,
+applying operations) stalls the event loop for everyone else.
+
+    python benchmarks/bench_event_loop.py --chats 50 --cards 2000 --latency-ms 500 --sigma 0.5
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import insert
+
+from common import override_databases, temp_database
+
+import ai_gateway, ai_service, crud, models, ranking, schemas
+from ai_providers import LocalProvider
+
+
+def seed(session_factory, users, cards):
+    """One user per concurrent chat (chats for the same board would conflict), each with a `cards`-card board."""
+    db = session_factory()
+    user_ids = []
+    ranks = ranking.ranks_between(None, None, cards)
+    for n in range(users):
+        user = crud.create_user(db, schemas.UserCreate(username=f"bench{n}", password="pw"))
+        board = crud.create_board(db, schemas.BoardCreate(title="Bench", user_id=user.id))
+        column = crud.create_column(db, schemas.ColumnCreate(title="To Do", order=0, board_id=board.id))
+        db.execute(insert(models.Card), [
+            {"title": f"Card {i}", "description": "details", "order": i, "rank": ranks[i], "column_id": column.id}
+            for i in range(cards)
+        ])
+        user_ids.append(user.id)
+    db.commit()
+    db.close()
+    return user_ids
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(app, user_ids):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        tokens = {}
+        for n, user_id in enumerate(user_ids):
+            response = await client.post("/api/auth/login", json={"username": f"bench{n}", "password": "pw"})
+            tokens[user_id] = response.json()["access_token"]
+
+        latencies, done = [], asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/api/hello")
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            client.post("/api/ai/chat", json={"message": 'add a card called "From AI"', "user_id": user_id},
+                        headers={"Authorization": f"Bearer {token}"})
+            for user_id, token in tokens.items()
+        ])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    failures = sum(r.status_code != 200 for r in results)
+    return elapsed, failures, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=2000, help="cards on each chatting user's board")
+    parser.add_argument("--latency-ms", type=float, default=500, help="median reply latency of the local model")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency (0: fixed)")
+    args = parser.parse_args()
+
+    ai_service.provider = LocalProvider(latency_ms=args.latency_ms, sigma=args.sigma, seed=1)
+    # Admit every chat at once; the gateway limits are not what is being measured here
+    ai_gateway.gateway = ai_gateway.AIGateway(max_concurrency=args.chats, max_queue=args.chats)
+    with temp_database() as (engine, session_factory):
+        user_ids = seed(session_factory, args.chats, args.cards)
+        from main import app
+        override_databases(app, engine, session_factory)
+        elapsed, failures, latencies = asyncio.run(run(app, user_ids))
+        app.dependency_overrides.clear()
+
+    print(f"{args.chats} concurrent chats over a {args.cards}-card board finished in {elapsed:.2f}s ({failures} failed)")
+    print(f"/api/hello n={len(latencies)}  p50 {percentile(latencies, 0.5) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
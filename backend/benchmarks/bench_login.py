@@ -0,0 +1,88 @@
+"""Login throughput and the latency of an unrelated endpoint during a login burst.
+
+    python benchmarks/bench_login.py --logins 64 --rounds 12
+    python benchmarks/bench_login.py --logins 64 --rounds 12 --inline   # bcrypt on the event loop, as before
+
+Bursts larger than PASSWORD_HASH_MAX_PENDING are partly shed with 429.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from common import override_databases, temp_database
+
+import crud, passwords
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def burst(app, logins):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        latencies, done = [], asyncio.Event()
+
+        async def probe():
+            # Latency is measured from when the probe was due, so time spent
+            # waiting for a blocked event loop counts too
+            due = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                await client.get("/api/hello")
+                latencies.append(time.perf_counter() - due)
+                due += 0.01
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            client.post("/api/auth/login", json={"username": "bench", "password": "pw"})
+            for _ in range(logins)
+        ])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    return elapsed, [r.status_code for r in results], latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=passwords.BCRYPT_ROUNDS)
+    parser.add_argument("--max-pending", type=int, default=passwords.PASSWORD_HASH_MAX_PENDING)
+    parser.add_argument("--inline", action="store_true", help="verify on the event loop instead of the pool")
+    args = parser.parse_args()
+
+    passwords.hasher = passwords.PasswordHasher(max_pending=args.max_pending, rounds=args.rounds)
+    if args.inline:
+        async def inline(fn, *fn_args):
+            return fn(*fn_args)
+        passwords.hasher._submit = inline
+
+    with temp_database() as (engine, session_factory):
+        db = session_factory()
+        db.add(crud.models.User(username="bench", password_hash=passwords.hash_password("pw", args.rounds)))
+        db.commit()
+        db.close()
+
+        from main import app
+        override_databases(app, engine, session_factory)
+        elapsed, statuses, latencies = asyncio.run(burst(app, args.logins))
+        app.dependency_overrides.clear()
+    passwords.hasher.shutdown()
+
+    ok = statuses.count(200)
+    mode = "inline" if args.inline else f"pool of {passwords.hasher.workers} (max pending {passwords.hasher.max_pending})"
+    print(f"bcrypt cost {args.rounds}, {mode}, {os.cpu_count()} cores")
+    print(f"{args.logins} logins in {elapsed:.2f}s: {ok} ok, {statuses.count(429)} shed with 429")
+    print(f"throughput {ok / elapsed:.1f} logins/s ({ok / elapsed / min(passwords.hasher.workers, os.cpu_count()):.1f} per core)")
+    print(f"/api/hello n={len(latencies)}  p50 {percentile(latencies, 0.5) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Cost of the always-on metrics: per observation, per request and per SQL statement.
+
+Requests are driven straight through the ASGI interface (no HTTP client) into
+a trivial app, with and without RequestMetricsMiddleware, so the difference is
+the middleware alone. SQL statements are `SELECT 1` on an engine with and
+without metrics.instrument_engine.
+
+    python benchmarks/bench_metrics.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+
+async def trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def drive(app, requests):
+    scope = {"type": "http", "method": "GET", "path": "/api/hello"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def per_statement(engine, statements):
+    with engine.connect() as conn:
+        for _ in range(1000):
+            conn.execute(text("SELECT 1"))
+        start = time.perf_counter()
+        for _ in range(statements):
+            conn.execute(text("SELECT 1"))
+        return (time.perf_counter() - start) / statements
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    registry = metrics.Registry()
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram.", ("route",))
+    start = time.perf_counter()
+    for i in range(args.requests):
+        histogram.labels("/api/hello").observe(i * 1e-6)
+    print(f"histogram observe:       {(time.perf_counter() - start) / args.requests * 1e6:7.2f} us")
+
+    bare = asyncio.run(drive(trivial_app, args.requests))
+    instrumented = asyncio.run(drive(metrics.RequestMetricsMiddleware(trivial_app), args.requests))
+    print(f"request, bare:           {bare * 1e6:7.2f} us")
+    print(f"request, with metrics:   {instrumented * 1e6:7.2f} us  (+{(instrumented - bare) * 1e6:.2f} us)")
+
+    plain = create_engine("sqlite://")
+    timed_engine = create_engine("sqlite://")
+    metrics.instrument_engine(timed_engine)
+    bare = per_statement(plain, args.requests)
+    instrumented = per_statement(timed_engine, args.requests)
+    print(f"SELECT 1, bare:          {bare * 1e6:7.2f} us")
+    print(f"SELECT 1, with metrics:  {instrumented * 1e6:7.2f} us  (+{(instrumented - bare) * 1e6:.2f} us)")
+
+
+if __name__ == "__main__":
+    main()
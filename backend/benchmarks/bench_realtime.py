@@ -0,0 +1,121 @@
+"""Fan-out load test: N WebSocket subscribers on one board, M card writes.
+
+Starts the app under uvicorn in a subprocess against a throwaway database,
+connects the subscribers, then creates cards through the REST API one at a
+time and measures how long each event takes to reach every subscriber.
+
+    python benchmarks/bench_realtime.py --subscribers 1000 --events 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def wait_until_up(base_url):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(200):
+            try:
+                await client.get("/api/hello")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def run(base_url, subscribers, events):
+    await wait_until_up(base_url)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post("/api/auth/login", json={"username": "user", "password": "password"})
+        token, user_id = response.json()["access_token"], response.json()["user_id"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        board = (await client.get(f"/api/users/{user_id}/boards")).json()[0]
+
+        ws_url = base_url.replace("http", "ws") + f"/api/boards/{board['id']}/ws?token={token}"
+        start = time.perf_counter()
+        sockets = []
+        for i in range(0, subscribers, 100):
+            sockets += await asyncio.gather(*[connect(ws_url, max_queue=None) for _ in range(min(100, subscribers - i))])
+        connect_time = time.perf_counter() - start
+
+        received = [0] * events
+        last_arrival = [0.0] * events
+        closed = []
+
+        async def listen(ws):
+            try:
+                for n in range(events):
+                    await ws.recv()
+                    received[n] += 1
+                    last_arrival[n] = time.perf_counter()
+            except Exception:
+                closed.append(ws)
+
+        listeners = [asyncio.create_task(listen(ws)) for ws in sockets]
+        sent_at = []
+        for n in range(events):
+            sent_at.append(time.perf_counter())
+            await client.post("/api/cards", json={"title": f"Event {n}", "column_id": board["columns"][0]["id"]})
+            # Let this event reach everyone before the next write
+            while received[n] + len(closed) < subscribers:
+                await asyncio.sleep(0.001)
+        await asyncio.gather(*listeners)
+        await asyncio.gather(*[ws.close() for ws in sockets])
+
+    fan_out = [last_arrival[n] - sent_at[n] for n in range(events)]
+    return connect_time, fan_out, sum(received), len(closed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+            "BCRYPT_ROUNDS": "4",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+             "--ws-max-queue", "1024"],
+            cwd=BACKEND, env=env,
+        )
+        try:
+            connect_time, fan_out, delivered, dropped = asyncio.run(run(f"http://127.0.0.1:{port}", args.subscribers, args.events))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.subscribers} subscribers connected in {connect_time:.2f}s")
+    print(f"{args.events} events, {delivered} deliveries, {dropped} subscribers dropped")
+    print(f"write -> all subscribers: p50 {percentile(fan_out, 0.5) * 1000:.1f} ms  "
+          f"p99 {percentile(fan_out, 0.99) * 1000:.1f} ms  max {max(fan_out) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Card search: the FTS5 index against a LIKE scan over the same cards.
+
+Seeds one board with --cards cards (the worst case: every card belongs to the
+searched board) whose words follow a Zipf distribution over a 5,000-word
+vocabulary, like real text. It then times crud.search_cards and the
+equivalent LIKE query for words of decreasing frequency and a two-word prefix.
+The LIKE scan is unranked and stops after `limit` rows, so it is only fast for
+common words; for rare ones it reads the whole table. FTS ranks every
+match, and highlights only the returned page.
+
+    python benchmarks/bench_search.py --cards 1000000
+"""
+import argparse
+import itertools
+import random
+import time
+
+from sqlalchemy import text
+
+from common import temp_database
+
+import crud, migrations, ranking, schemas
+
+WORDS = (
+    "fix update review deploy staging release customer report sprint backlog design bug test docs "
+    "migration schema index query cache login billing refund onboarding email alert metric dashboard "
+    "mobile android ios api webhook payment export import search filter upload avatar profile invoice"
+).split()
+VOCABULARY = WORDS + [f"term{n}" for n in range(5000 - len(WORDS))]
+# Zipf: the n-th most common word appears with weight 1/n
+CUM_WEIGHTS = list(itertools.accumulate(1 / (n + 1) for n in range(len(VOCABULARY))))
+
+
+def seed(engine, session_factory, cards, seed_value=1):
+    db = session_factory()
+    user = crud.create_user(db, schemas.UserCreate(username="bench", password="pw"))
+    board = crud.create_board(db, schemas.BoardCreate(title="Bench", user_id=user.id))
+    column_ids = [crud.create_column(db, schemas.ColumnCreate(title=f"Col {i}", order=i, board_id=board.id)).id for i in range(10)]
+    board_id = board.id
+    db.close()
+
+    rng = random.Random(seed_value)
+    ranks = ranking.ranks_between(None, None, cards // len(column_ids) + 1)
+    raw = engine.raw_connection()
+    try:
+        # Bulk-load with the sync triggers off, then build the index in one pass
+        for name in migrations.CARD_SEARCH_TRIGGERS:
+            raw.execute(f"DROP TRIGGER {name}")
+        batch = []
+        for i in range(cards):
+            title = " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=4))
+            # One card in ~10,000 mentions the rare word
+            description = " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=20)) + (" quetzal" if i % 10_000 == 0 else "")
+            batch.append((title, description, i // len(column_ids), ranks[i // len(column_ids)], column_ids[i % len(column_ids)]))
+            if len(batch) == 50_000:
+                raw.executemany('INSERT INTO cards (title, description, "order", rank, column_id) VALUES (?, ?, ?, ?, ?)', batch)
+                batch = []
+        if batch:
+            raw.executemany('INSERT INTO cards (title, description, "order", rank, column_id) VALUES (?, ?, ?, ?, ?)', batch)
+        raw.execute("INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')")
+        for name, body in migrations.CARD_SEARCH_TRIGGERS.items():
+            raw.execute(f"CREATE TRIGGER {name} {body}")
+        raw.commit()
+    finally:
+        raw.close()
+    return board_id
+
+
+def like_search(db, board_id, query, limit=20):
+    terms = crud.search_terms(query)
+    where = " AND ".join(f"(cards.title LIKE :t{i} OR cards.description LIKE :t{i})" for i in range(len(terms)))
+    return db.execute(text(
+        "SELECT cards.id FROM cards JOIN columns ON columns.id = cards.column_id "
+        f"WHERE columns.board_id = :board_id AND {where} LIMIT :limit"
+    ), {"board_id": board_id, "limit": limit, **{f"t{i}": f"%{term}%" for i, term in enumerate(terms)}}).all()
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, session_factory):
+        migrations.upgrade(engine)
+        start = time.perf_counter()
+        board_id = seed(engine, session_factory, args.cards)
+        print(f"Seeded {args.cards} cards and built the index in {time.perf_counter() - start:.1f}s")
+
+        db = session_factory()
+        print(f"{'query':<16} {'FTS5 ms':>9} {'hits':>5} {'LIKE ms':>9} {'hits':>5}")
+        for query in ("fix", "invoice", "term2500", "quetzal", "depl stag", "nosuchword"):
+            fts, fts_hits = measure(lambda: crud.search_cards(db, board_id, query), args.repeat)
+            like, like_hits = measure(lambda: like_search(db, board_id, query), args.repeat)
+            print(f"{query:<16} {fts * 1000:>9.2f} {fts_hits:>5} {like * 1000:>9.2f} {like_hits:>5}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Serializing a large board: the response_model path against the payloads fast path.
+
+Seeds one board with --cards cards and measures, per request, the time and the
+memory allocated (tracemalloc peak) to turn the database rows into JSON bytes:
+
+  board list, before   ORM snapshot -> response_model validation -> JSON
+  board list, after    tuple rows -> dicts -> payloads.dumps
+  chat reply, before   Board.model_validate(...).model_dump() -> jsonable_encoder -> json
+  chat reply, after    payloads.board_payload(...) -> payloads.dumps
+
+The chat rows start from the already-loaded snapshot, as in the route.
+Tracing slows everything down, so time and memory are measured in separate runs.
+
+    python benchmarks/bench_serialization.py --cards 10000
+"""
+import argparse
+import json
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from common import temp_database, timed
+
+import crud, models, payloads, ranking, schemas
+
+BOARDS = TypeAdapter(list[schemas.Board])
+
+
+def seed(session_factory, cards, columns=10):
+    db = session_factory()
+    user = crud.create_user(db, schemas.UserCreate(username="bench", password="pw"))
+    board = crud.create_board(db, schemas.BoardCreate(title="Bench", user_id=user.id))
+    column_ids = [crud.create_column(db, schemas.ColumnCreate(title=f"Col {i}", order=i, board_id=board.id)).id for i in range(columns)]
+    ranks = ranking.ranks_between(None, None, cards // columns)
+    db.execute(insert(models.Card), [
+        {"title": f"Card {i}", "description": "Coordinate with design and QA, then update the docs.",
+         "order": i, "rank": ranks[i], "column_id": column_id}
+        for column_id in column_ids
+        for i in range(cards // columns)
+    ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def peak_allocated(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, session_factory):
+        user_id = seed(session_factory, args.cards)
+        db = session_factory()
+        snapshot = crud.get_board_snapshots(db, user_id)[0]
+
+        def list_before():
+            db.expunge_all()
+            return BOARDS.dump_json(BOARDS.validate_python(crud.get_board_snapshots(db, user_id), from_attributes=True))
+
+        def list_after():
+            return payloads.dumps(crud.get_board_payloads(db, user_id))
+
+        def chat_before():
+            board = schemas.Board.model_validate(snapshot).model_dump()
+            return json.dumps(jsonable_encoder({"board": board}), separators=(",", ":")).encode()
+
+        def chat_after():
+            return payloads.dumps({"board": payloads.board_payload(snapshot)})
+
+        assert json.loads(list_before()) == json.loads(list_after())
+        assert json.loads(chat_before()) == json.loads(chat_after())
+
+        print(f"{args.cards} cards, encoder: {'orjson' if payloads.orjson else 'json'}")
+        print(f"{'path':<20} {'best ms':>9} {'peak MiB':>9}")
+        for name, fn in (("board list, before", list_before), ("board list, after", list_after),
+                         ("chat reply, before", chat_before), ("chat reply, after", chat_after)):
+            best, _ = timed(fn, args.repeat)
+            print(f"{name:<20} {best * 1000:>9.1f} {peak_allocated(fn) / 2**20:>9.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
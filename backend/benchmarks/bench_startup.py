@@ -0,0 +1,90 @@
+"""Worker cold start and registration latency.
+
+Cold start runs a fresh interpreter per sample, as a new uvicorn worker would,
+and times `import main` and the lifespan startup separately. It does this first
+against an empty database (schema creation plus the demo seed), then against
+the same database again, as every later worker sees it.
+
+Registration posts --users new accounts through the app in-process and reports
+the latency percentiles and the SQL statements per registration. bcrypt runs at
+--rounds (default 4) so the database work is not hidden behind hashing.
+
+    python benchmarks/bench_startup.py --samples 5 --users 200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import bench_client, temp_database
+
+import profiling
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = """
+import asyncio, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(imported - started, ready - imported)
+"""
+
+
+def boot(database_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "AI_CACHE_BACKEND": "memory"}
+    output = subprocess.run([sys.executable, "-c", BOOT], cwd=BACKEND_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    imported, started = map(float, output.split())
+    return imported, started
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'cold start':<16} {'import ms':>10} {'startup ms':>11}")
+    fresh, existing = [], []
+    for _ in range(args.samples):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "startup.db")
+            fresh.append(boot(path))
+            existing.append(boot(path))
+    for name, samples in (("empty database", fresh), ("existing database", existing)):
+        print(f"{name:<16} {statistics.median(s[0] for s in samples) * 1000:>10.1f} "
+              f"{statistics.median(s[1] for s in samples) * 1000:>11.1f}")
+
+    import passwords
+    passwords.hasher = passwords.PasswordHasher(rounds=args.rounds)
+    with temp_database() as (engine, session_factory):
+        with bench_client(engine, session_factory) as client:
+            latencies = []
+            with profiling.capture() as profile:
+                for i in range(args.users):
+                    start = time.perf_counter()
+                    client.post("/api/auth/register", json={"username": f"user{i}", "password": "pw"}).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+    passwords.hasher.shutdown()
+    print(f"registration (bcrypt cost {args.rounds}): p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, {len(profile) / args.users:.1f} statements each")
+
+
+if __name__ == "__main__":
+    main()
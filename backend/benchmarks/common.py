@@ -0,0 +1,81 @@
+"""Shared setup for the backend benchmarks.
+
+Each benchmark runs against a throwaway SQLite file so it never touches
+kanban.db, and drives the app in-process through TestClient.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+import models
+from database import create_async_db_engine, create_db_engine, get_async_db, get_db
+
+
+@contextmanager
+def temp_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        try:
+            yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        finally:
+            engine.dispose()
+
+
+def override_databases(app, engine, session_factory):
+    """Point both the sync and async session dependencies at the benchmark database."""
+    async_session_factory = async_sessionmaker(
+        create_async_db_engine(engine.url), autoflush=False, expire_on_commit=False
+    )
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+
+@contextmanager
+def bench_client(engine, session_factory):
+    from main import app
+
+    override_databases(app, engine, session_factory)
+    try:
+        # Not entered as a context manager: the lifespan would seed kanban.db
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def login(client, username, password="pw"):
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return response.json()["user_id"]
+
+
+def timed(fn, repeat=5):
+    """Run fn `repeat` times and return (best, mean) wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), sum(samples) / len(samples)
@@ -0,0 +1,133 @@
+"""Compact, token-budgeted board description for AI prompts.
+
+The board is rendered as one line per column and per card (`#id title — description`)
+instead of indented JSON. Cards are admitted in priority order until the
+budget is spent: cards matching the user's message first (with their
+descriptions, up to half the budget), then the rest by position (titles only). Every listed card
+keeps its id so the model can target it in a BoardOperation; whatever does
+not fit is summarized as a per-column count.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "4000"))
+TITLE_CHARS = 80
+DESCRIPTION_CHARS = 200
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "card", "cards", "please",
+    "can", "you", "all", "add", "move", "delete", "remove", "update", "make", "new", "column",
+}
+
+
+@dataclass
+class BoardContext:
+    text: str
+    tokens: int
+    cards_total: int
+    cards_listed: int
+    descriptions: int
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens,
+            "chars": len(self.text),
+            "cards_total": self.cards_total,
+            "cards_listed": self.cards_listed,
+            "descriptions": self.descriptions,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text and ids
+    return (len(text) + 3) // 4
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _hidden_line(count: int) -> str:
+    return f"  (+{count} more cards not shown)"
+
+
+def keywords(message: str) -> set:
+    return {w for w in re.findall(r"[a-z0-9]+", message.lower()) if len(w) >= 3 and w not in STOPWORDS}
+
+
+def _relevance(card: dict, words: set, mentioned_ids: set) -> int:
+    if card["id"] in mentioned_ids:
+        return 100
+    title = card["title"].lower()
+    description = (card.get("description") or "").lower()
+    # Substring matches, so "invoice" also finds "invoices"
+    return sum(3 * (word in title) + (word in description) for word in words)
+
+
+def build_board_context(board_data: dict, message: str = "", budget: Optional[int] = None) -> BoardContext:
+    """Render `board_data` ({board_title, columns: [{id, title, cards: [{id, title, description}]}]})."""
+    budget = AI_CONTEXT_TOKEN_BUDGET if budget is None else budget
+    words = keywords(message)
+    mentioned_ids = {int(n) for n in re.findall(r"#?(\d+)", message)}
+
+    header = f"Board: {board_data['board_title']}"
+    column_lines = {
+        column["id"]: f'Column {column["id"]} "{column["title"]}" ({len(column["cards"])} cards)'
+        for column in board_data["columns"]
+    }
+    # Headers are always included (the model needs every column name), and
+    # room is kept for each column's "+N more" line
+    used = estimate_tokens(header) + sum(
+        estimate_tokens(line) + 1 + estimate_tokens(_hidden_line(len(column["cards"]))) + 1
+        for column, line in zip(board_data["columns"], column_lines.values())
+    )
+
+    candidates = []
+    for column_index, column in enumerate(board_data["columns"]):
+        for position, card in enumerate(column["cards"]):
+            score = _relevance(card, words, mentioned_ids) if words or mentioned_ids else 0
+            candidates.append((-score, column_index, position, card))
+    candidates.sort(key=lambda c: c[:3])
+
+    listed = {}
+    descriptions = 0
+    # Descriptions may use at most half the budget, so titles of other cards still fit
+    description_budget = budget // 2
+    for negative_score, _, _, card in candidates:
+        relevant = negative_score < 0
+        line = f"- #{card['id']} {_clip(card['title'], TITLE_CHARS)}"
+        described = False
+        if relevant and card.get("description") and description_budget > 0:
+            with_description = f"{line} — {_clip(card['description'], DESCRIPTION_CHARS)}"
+            extra = estimate_tokens(with_description) - estimate_tokens(line)
+            if extra <= description_budget:
+                line, described = with_description, True
+                description_budget -= extra
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if relevant:
+                continue  # a shorter relevant card may still fit
+            break
+        used += cost
+        listed[card["id"]] = line
+        descriptions += described
+
+    lines = [header]
+    for column in board_data["columns"]:
+        lines.append(column_lines[column["id"]])
+        shown = [listed[card["id"]] for card in column["cards"] if card["id"] in listed]
+        lines.extend(shown)
+        hidden = len(column["cards"]) - len(shown)
+        if hidden:
+            lines.append(_hidden_line(hidden))
+    text = "\n".join(lines)
+    return BoardContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        cards_total=len(candidates),
+        cards_listed=len(listed),
+        descriptions=descriptions,
+    )
@@ -1,17 +1,51 @@
-from sqlalchemy.orm import Session
-import models, schemas
-import bcrypt
+from sqlalchemy import delete, func, insert, select, text, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+import models, schemas, ranking, passwords
+from collections import defaultdict
+from datetime import datetime, timedelta
+import json
+import os
+import html
+import re
 from typing import Optional
 
+class InvalidPlacement(ValueError):
+    pass
+
+class BoardVersionConflict(ValueError):
+    pass
+
+class InvalidOperations(ValueError):
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+# Change log retention: entries kept per board, and how often (in global seqs) to compact
+CHANGE_LOG_RETAIN = int(os.getenv("CHANGE_LOG_RETAIN", "1000"))
+CHANGE_LOG_COMPACT_EVERY = int(os.getenv("CHANGE_LOG_COMPACT_EVERY", "500"))
+# How long applied AI reply ids are remembered; well beyond the AI cache TTL that lets duplicates share a reply
+APPLIED_REPLY_RETENTION = timedelta(days=1)
+# Session.info key collecting the changes of the open transaction; published after commit (see realtime.py)
+PENDING_CHANGES = "pending_board_changes"
+
 # Users
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+verify_password = passwords.verify_password
+hash_password = passwords.hash_password
 
-def hash_password(plain_password: str) -> str:
-    return bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def create_user_with_board(db: Session, username: str, password_hash: str, template: str = "default",
+                           board_title: str = "Default Board") -> int:
+    """A new user and their first board, built from `template`, in one transaction; returns the user id."""
+    user_id = db.scalar(
+        insert(models.User).values(username=username, password_hash=password_hash).returning(models.User.id)
+    )
+    _insert_board_template(db, user_id, board_title, template)
+    db.commit()
+    return user_id
 
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = hash_password(user.password)
@@ -27,10 +61,282 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
         return None
     return user
 
+# Revoked tokens
+def is_token_revoked(db: Session, jti: str) -> bool:
+    return db.get(models.RevokedToken, jti) is not None
+
+def revoke_token(db: Session, jti: str, expires_at: datetime):
+    # Rows for tokens that can no longer verify are pruned as new ones arrive
+    db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= models.utcnow()))
+    if db.get(models.RevokedToken, jti) is None:
+        db.add(models.RevokedToken(jti=jti, expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent logout of the same token got there first
+        db.rollback()
+
 # Boards
 def get_boards(db: Session, user_id: int):
     return db.query(models.Board).filter(models.Board.user_id == user_id).all()
 
+def get_board_snapshots(db: Session, user_id: int):
+    """Load a user's boards with their columns and cards in exactly three queries.
+
+    The relationships are populated directly, so serializing the result never
+    triggers a lazy load regardless of how many columns or cards a board has.
+    """
+    boards = db.scalars(
+        select(models.Board).where(models.Board.user_id == user_id).order_by(models.Board.id)
+        .execution_options(populate_existing=True)
+    ).all()
+    columns = db.scalars(
+        select(models.Column)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Column.board_id, models.Column.order, models.Column.id)
+        .execution_options(populate_existing=True)
+    ).all()
+    cards = db.scalars(
+        select(models.Card)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Card.column_id, models.Card.rank, models.Card.id)
+        .execution_options(populate_existing=True)
+    ).all()
+
+    cards_by_column = defaultdict(list)
+    for card in cards:
+        cards_by_column[card.column_id].append(card)
+    columns_by_board = defaultdict(list)
+    for column in columns:
+        set_committed_value(column, "cards", cards_by_column[column.id])
+        columns_by_board[column.board_id].append(column)
+    for board in boards:
+        set_committed_value(board, "columns", columns_by_board[board.id])
+    return boards
+
+def get_board_payloads(db: Session, user_id: int) -> list[dict]:
+    """A user's boards as plain dicts shaped like schemas.Board, for payloads.JSONResponse.
+
+    The same three queries as get_board_snapshots, but selecting bare columns:
+    no ORM identity map, no attribute instrumentation and no pydantic
+    validation on the way out.
+    """
+    boards = db.execute(
+        select(models.Board.title, models.Board.id, models.Board.user_id, models.Board.version)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Board.id)
+    ).all()
+    columns = db.execute(
+        select(models.Column.title, models.Column.order, models.Column.id, models.Column.board_id)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Column.board_id, models.Column.order, models.Column.id)
+    ).all()
+    cards = db.execute(
+        select(models.Card.title, models.Card.description, models.Card.order, models.Card.id, models.Card.column_id, models.Card.rank)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Card.column_id, models.Card.rank, models.Card.id)
+    ).all()
+
+    # Keys in schemas.Board field order, so the JSON matches the response_model output
+    cards_by_column = defaultdict(list)
+    for title, description, order, id, column_id, rank in cards:
+        cards_by_column[column_id].append({
+            "title": title, "description": description, "order": order, "id": id, "column_id": column_id, "rank": rank,
+        })
+    columns_by_board = defaultdict(list)
+    for title, order, id, board_id in columns:
+        columns_by_board[board_id].append({
+            "title": title, "order": order, "id": id, "board_id": board_id, "cards": cards_by_column[id],
+        })
+    return [
+        {"title": title, "id": id, "user_id": user_id, "version": version, "columns": columns_by_board[id]}
+        for title, id, user_id, version in boards
+    ]
+
+def get_board_summary(db: Session, board: models.Board, cards_per_column: int):
+    """A board's columns with their card counts and only the first `cards_per_column` cards of each.
+
+    Three queries whatever the board size: the columns, the counts (an
+    index-only scan), and the leading cards, which are one LIMITed index range
+    read per column on (column_id, rank).
+    """
+    columns = db.scalars(
+        select(models.Column)
+        .where(models.Column.board_id == board.id)
+        .order_by(models.Column.order, models.Column.id)
+        .execution_options(populate_existing=True)
+    ).all()
+    column_ids = [column.id for column in columns]
+    counts = dict(db.execute(
+        select(models.Card.column_id, func.count())
+        .where(models.Card.column_id.in_(column_ids))
+        .group_by(models.Card.column_id)
+    ).all()) if column_ids else {}
+
+    cards_by_column = defaultdict(list)
+    if column_ids and cards_per_column > 0:
+        # One LIMITed index range read per column; SQLite caps a compound SELECT at 500 terms
+        cards = []
+        for i in range(0, len(column_ids), 200):
+            leading = union_all(*(
+                select(
+                    select(models.Card)
+                    .where(models.Card.column_id == column_id)
+                    .order_by(models.Card.rank, models.Card.id)
+                    .limit(cards_per_column)
+                    .subquery()
+                )
+                for column_id in column_ids[i:i + 200]
+            ))
+            cards.extend(db.scalars(
+                select(models.Card).from_statement(leading).execution_options(populate_existing=True)
+            ))
+        for card in sorted(cards, key=lambda card: (card.rank, card.id)):
+            cards_by_column[card.column_id].append(card)
+
+    return {
+        "id": board.id, "title": board.title, "user_id": board.user_id, "version": board.version,
+        "columns": [
+            {
+                "id": column.id, "title": column.title, "order": column.order, "board_id": column.board_id,
+                "card_count": counts.get(column.id, 0), "cards": cards_by_column[column.id],
+            }
+            for column in columns
+        ],
+    }
+
+def get_board_versions(db: Session, user_id: int):
+    """(id, version, updated_at) of each of a user's boards, without loading their contents."""
+    return db.execute(
+        select(models.Board.id, models.Board.version, models.Board.updated_at)
+        .where(models.Board.user_id == user_id)
+        .order_by(models.Board.id)
+    ).all()
+
+def _touch_boards(db: Session, board_ids=None, column_ids=None) -> list[int]:
+    """Bump the version of the given boards, or of the boards owning the given columns; returns their ids."""
+    if column_ids is not None:
+        board_ids = select(models.Column.board_id).where(models.Column.id.in_(column_ids))
+    return db.scalars(
+        update(models.Board)
+        .where(models.Board.id.in_(board_ids))
+        .values(version=models.Board.version + 1, updated_at=models.utcnow())
+        .returning(models.Board.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+# Change log: (entity, entity_id, op, payload) entries appended in the mutating transaction.
+# "create" carries the full row, "update" only the changed fields, "delete" nothing.
+# Deleting a column implies deleting its cards; no separate card entries are written.
+def _column_state(column: models.Column) -> dict:
+    return {"id": column.id, "title": column.title, "order": column.order, "board_id": column.board_id}
+
+def _card_state(card: models.Card) -> dict:
+    return {
+        "id": card.id, "title": card.title, "description": card.description,
+        "order": card.order, "rank": card.rank, "column_id": card.column_id,
+    }
+
+def _insert_returning_ids(db: Session, id_column, rows: list[dict]) -> list[int]:
+    """Insert `rows` and return their new integer primary keys, in the order of `rows`.
+
+    SQLite does not promise RETURNING order, so sort_by_parameter_order makes
+    SQLAlchemy fall back to one INSERT per row. A multi-row INSERT assigns
+    rowids in row order, though, so one statement and a sort give the same answer.
+    """
+    statement = insert(id_column.class_)
+    if db.get_bind().dialect.name == "sqlite":
+        return sorted(db.scalars(statement.returning(id_column), rows).all())
+    return db.scalars(statement.returning(id_column, sort_by_parameter_order=True), rows).all()
+
+def _record_changes(db: Session, board_id: int, changes):
+    seqs = _insert_returning_ids(db, models.BoardChange.seq, [
+        {
+            "board_id": board_id, "entity": entity, "entity_id": entity_id, "op": op,
+            "payload": None if payload is None else json.dumps(payload),
+        }
+        for entity, entity_id, op, payload in changes
+    ])
+    db.info.setdefault(PENDING_CHANGES, []).extend(
+        {"seq": seq, "board_id": board_id, "entity": entity, "entity_id": entity_id, "op": op, "payload": payload}
+        for seq, (entity, entity_id, op, payload) in zip(seqs, changes)
+    )
+    if seqs and max(seqs) // CHANGE_LOG_COMPACT_EVERY != (min(seqs) - 1) // CHANGE_LOG_COMPACT_EVERY:
+        compact_changes(db)
+
+def compact_changes(db: Session, retain: Optional[int] = None):
+    """Trim every board's log to its newest `retain` entries, raising the board's change floor."""
+    retain = CHANGE_LOG_RETAIN if retain is None else retain
+    board_ids = db.scalars(
+        select(models.BoardChange.board_id).group_by(models.BoardChange.board_id).having(func.count() > retain)
+    ).all()
+    for board_id in board_ids:
+        floor = db.scalar(
+            select(models.BoardChange.seq).where(models.BoardChange.board_id == board_id)
+            .order_by(models.BoardChange.seq.desc()).offset(retain).limit(1)
+        )
+        db.execute(
+            delete(models.BoardChange)
+            .where(models.BoardChange.board_id == board_id, models.BoardChange.seq <= floor)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(models.Board).where(models.Board.id == board_id).values(change_floor=floor)
+            .execution_options(synchronize_session=False)
+        )
+
+def get_latest_change_seq(db: Session, board_id: int) -> int:
+    return db.scalar(select(func.max(models.BoardChange.seq)).where(models.BoardChange.board_id == board_id)) or 0
+
+def get_board_changes(db: Session, board: models.Board, since: int, limit: int = 500):
+    """Changes to `board` after seq `since`, or a resync marker if they have been compacted away."""
+    if since < board.change_floor:
+        latest = get_latest_change_seq(db, board.id)
+        return {"cursor": latest or board.change_floor, "resync": True, "has_more": False, "changes": []}
+    changes = db.scalars(
+        select(models.BoardChange)
+        .where(models.BoardChange.board_id == board.id, models.BoardChange.seq > since)
+        .order_by(models.BoardChange.seq)
+        .limit(limit + 1)
+    ).all()
+    page = changes[:limit]
+    return {
+        "cursor": page[-1].seq if page else since,
+        "resync": False,
+        "has_more": len(changes) > limit,
+        "changes": page,
+    }
+
+def get_board(db: Session, board_id: int):
+    return db.query(models.Board).filter(models.Board.id == board_id).first()
+
+# Ownership lookups: (row, owning user id) in one query, or None if the row does not exist
+def get_board_with_owner(db: Session, board_id: int):
+    return db.execute(
+        select(models.Board, models.Board.user_id).where(models.Board.id == board_id)
+    ).first()
+
+def get_column_with_owner(db: Session, column_id: int):
+    return db.execute(
+        select(models.Column, models.Board.user_id)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Column.id == column_id)
+    ).first()
+
+def get_card_with_owner(db: Session, card_id: int):
+    return db.execute(
+        select(models.Card, models.Board.user_id)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .join(models.Board, models.Column.board_id == models.Board.id)
+        .where(models.Card.id == card_id)
+    ).first()
+
 def create_board(db: Session, board: schemas.BoardCreate):
     db_board = models.Board(title=board.title, user_id=board.user_id)
     db.add(db_board)
@@ -38,50 +344,519 @@ def create_board(db: Session, board: schemas.BoardCreate):
     db.refresh(db_board)
     return db_board
 
+# Board templates: each column's title and its seed cards as (title, description)
+BOARD_TEMPLATES = {
+    "default": [("To Do", []), ("In Progress", []), ("Done", [])],
+    "demo": [
+        ("Backlog", [
+            ("Align roadmap themes", "Draft quarterly themes with impact statements and metrics."),
+            ("Gather customer signals", "Review support tags, sales notes, and churn feedback."),
+        ]),
+        ("Discovery", [
+            ("Prototype analytics view", "Sketch initial dashboard layout and key drill-downs."),
+        ]),
+        ("In Progress", [
+            ("Refine status language", "Standardize column labels and tone across the board."),
+            ("Design card layout", "Add hierarchy and spacing for scanning dense lists."),
+        ]),
+        ("Review", [
+            ("QA micro-interactions", "Verify hover, focus, and loading states."),
+        ]),
+        ("Done", [
+            ("Ship marketing page", "Final copy approved and asset pack delivered."),
+            ("Close onboarding sprint", "Document release notes and share internally."),
+        ]),
+    ],
+}
+
+def _insert_board_template(db: Session, user_id: int, title: str, template: str) -> int:
+    """Insert a board with the template's columns and cards (three statements) without committing.
+
+    A new board starts at version 1 with this content, like any board read at
+    that version, so no change log entries are written for it.
+    """
+    columns = BOARD_TEMPLATES[template]
+    board_id = db.scalar(insert(models.Board).values(title=title, user_id=user_id).returning(models.Board.id))
+    column_ids = _insert_returning_ids(db, models.Column.id, [
+        {"title": column_title, "order": i, "board_id": board_id} for i, (column_title, _) in enumerate(columns)
+    ])
+    cards = [
+        {"title": card_title, "description": description, "order": i, "rank": rank, "column_id": column_id}
+        for column_id, (_, seed) in zip(column_ids, columns)
+        for i, ((card_title, description), rank) in enumerate(zip(seed, ranking.ranks_between(None, None, len(seed))))
+    ]
+    if cards:
+        db.execute(insert(models.Card), cards)
+    return board_id
+
 # Columns
 def create_column(db: Session, column: schemas.ColumnCreate):
     db_column = models.Column(title=column.title, order=column.order, board_id=column.board_id)
     db.add(db_column)
+    db.flush()
+    _touch_boards(db, board_ids=[column.board_id])
+    _record_changes(db, column.board_id, [("column", db_column.id, "create", _column_state(db_column))])
     db.commit()
     db.refresh(db_column)
     return db_column
 
-def update_column(db: Session, column_id: int, column_update: schemas.ColumnUpdate):
-    db_column = db.query(models.Column).filter(models.Column.id == column_id).first()
-    if db_column:
-        for key, value in column_update.model_dump(exclude_unset=True).items():
-            setattr(db_column, key, value)
-        db.commit()
-        db.refresh(db_column)
+def update_column(db: Session, db_column: models.Column, column_update: schemas.ColumnUpdate):
+    changed = column_update.model_dump(exclude_unset=True)
+    for key, value in changed.items():
+        setattr(db_column, key, value)
+    _touch_boards(db, board_ids=[db_column.board_id])
+    _record_changes(db, db_column.board_id, [("column", db_column.id, "update", changed)])
+    db.commit()
+    db.refresh(db_column)
     return db_column
 
-def delete_column(db: Session, column_id: int):
-    db_column = db.query(models.Column).filter(models.Column.id == column_id).first()
-    if db_column:
-        db.delete(db_column)
-        db.commit()
+def delete_column(db: Session, db_column: models.Column):
+    _touch_boards(db, board_ids=[db_column.board_id])
+    _record_changes(db, db_column.board_id, [("column", db_column.id, "delete", None)])
+    db.delete(db_column)
+    db.commit()
     return db_column
 
 # Cards
+def _sibling_ranks(column_id: int, exclude_id: Optional[int] = None):
+    query = select(models.Card.rank).where(models.Card.column_id == column_id)
+    if exclude_id is not None:
+        query = query.where(models.Card.id != exclude_id)
+    return query
+
+def _placement_rank(db: Session, column_id: int, placement: schemas.CardPlacement, index: Optional[int] = None, exclude_id: Optional[int] = None) -> str:
+    """Compute a rank for one card from its neighbours, reading at most two sibling ranks."""
+    siblings = _sibling_ranks(column_id, exclude_id)
+    anchor_ids = {i for i in (placement.before_id, placement.after_id) if i is not None}
+
+    if anchor_ids:
+        anchors = dict(db.execute(
+            select(models.Card.id, models.Card.rank)
+            .where(models.Card.id.in_(anchor_ids), models.Card.column_id == column_id, models.Card.id != exclude_id)
+        ).all())
+        if set(anchors) != anchor_ids:
+            raise InvalidPlacement("before_id/after_id must reference other cards in the target column")
+        lower = anchors.get(placement.after_id)
+        upper = anchors.get(placement.before_id)
+        if placement.after_id is not None and placement.after_id == placement.before_id:
+            raise InvalidPlacement("before_id and after_id must be different cards")
+        if lower is not None and upper is not None and lower > upper:
+            raise InvalidPlacement("after_id must come before before_id in the column")
+        if placement.before_id is None:
+            upper = db.scalar(siblings.with_only_columns(func.min(models.Card.rank)).where(models.Card.rank > lower))
+        elif placement.after_id is None:
+            lower = db.scalar(siblings.with_only_columns(func.max(models.Card.rank)).where(models.Card.rank < upper))
+    elif index is None or index < 0:
+        lower, upper = db.scalar(siblings.with_only_columns(func.max(models.Card.rank))), None
+    else:
+        # Legacy absolute index: find the two cards the new position falls between
+        neighbours = db.scalars(
+            siblings.order_by(models.Card.rank, models.Card.id).offset(max(index - 1, 0)).limit(2 if index else 1)
+        ).all()
+        if index == 0:
+            lower, upper = None, (neighbours[0] if neighbours else None)
+        elif neighbours:
+            lower, upper = neighbours[0], (neighbours[1] if len(neighbours) > 1 else None)
+        else:
+            lower, upper = db.scalar(siblings.with_only_columns(func.max(models.Card.rank))), None
+
+    return ranking.rank_between(lower, upper)
+
+def _place(db: Session, column_id: int, placement: schemas.CardPlacement, index: Optional[int] = None, exclude_id: Optional[int] = None) -> str:
+    try:
+        return _placement_rank(db, column_id, placement, index, exclude_id)
+    except InvalidPlacement:
+        raise
+    except ValueError:
+        # Neighbouring ranks collided (e.g. concurrent inserts); respread the column and retry
+        rebalance_column(db, column_id, commit=False)
+        return _placement_rank(db, column_id, placement, index, exclude_id)
+
 def create_card(db: Session, card: schemas.CardCreate):
-    db_card = models.Card(title=card.title, description=card.description, order=card.order, column_id=card.column_id)
+    index = card.order if "order" in card.model_fields_set else None
+    rank = _place(db, card.column_id, card, index)
+    db_card = models.Card(title=card.title, description=card.description, order=card.order or 0, rank=rank, column_id=card.column_id)
     db.add(db_card)
+    db.flush()
+    board_id, = _touch_boards(db, column_ids=[card.column_id])
+    _record_changes(db, board_id, [("card", db_card.id, "create", _card_state(db_card))])
     db.commit()
     db.refresh(db_card)
     return db_card
 
-def update_card(db: Session, card_id: int, card_update: schemas.CardUpdate):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if db_card:
-        for key, value in card_update.model_dump(exclude_unset=True).items():
-            setattr(db_card, key, value)
-        db.commit()
-        db.refresh(db_card)
+def update_card(db: Session, db_card: models.Card, card_update: schemas.CardUpdate):
+    fields = card_update.model_fields_set
+    source_column_id = db_card.column_id
+    moved = bool(fields & {"order", "before_id", "after_id"}) or (
+        card_update.column_id is not None and card_update.column_id != db_card.column_id
+    )
+    changed = card_update.model_dump(exclude_unset=True, exclude={"before_id", "after_id"})
+    for key, value in changed.items():
+        setattr(db_card, key, value)
+    if moved:
+        # Only this card's row is written; its siblings keep their ranks
+        index = card_update.order if "order" in fields else None
+        db_card.rank = _place(db, db_card.column_id, card_update, index, exclude_id=db_card.id)
+        changed["rank"] = db_card.rank
+    board_ids = _touch_boards(db, column_ids={source_column_id, db_card.column_id})
+    if len(board_ids) == 1:
+        _record_changes(db, board_ids[0], [("card", db_card.id, "update", changed)])
+    else:
+        # Moved to another board: it leaves one feed and appears in the other
+        boards = dict(db.execute(
+            select(models.Column.id, models.Column.board_id)
+            .where(models.Column.id.in_([source_column_id, db_card.column_id]))
+        ).all())
+        _record_changes(db, boards[source_column_id], [("card", db_card.id, "delete", None)])
+        _record_changes(db, boards[db_card.column_id], [("card", db_card.id, "create", _card_state(db_card))])
+    db.commit()
+    db.refresh(db_card)
     return db_card
 
-def delete_card(db: Session, card_id: int):
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if db_card:
-        db.delete(db_card)
-        db.commit()
+def delete_card(db: Session, db_card: models.Card):
+    board_id, = _touch_boards(db, column_ids=[db_card.column_id])
+    _record_changes(db, board_id, [("card", db_card.id, "delete", None)])
+    db.delete(db_card)
+    db.commit()
     return db_card
+
+def rebalance_column(db: Session, column_id: int, commit: bool = True):
+    """Rewrite every rank in a column with short, evenly spread keys."""
+    card_ids = db.scalars(
+        select(models.Card.id).where(models.Card.column_id == column_id).order_by(models.Card.rank, models.Card.id)
+    ).all()
+    if card_ids:
+        rows = [
+            {"id": card_id, "rank": rank}
+            for card_id, rank in zip(card_ids, ranking.ranks_between(None, None, len(card_ids)))
+        ]
+        db.execute(update(models.Card), rows)
+        board_id, = _touch_boards(db, column_ids=[column_id])
+        _record_changes(db, board_id, [("card", row["id"], "update", {"rank": row["rank"]}) for row in rows])
+    if commit:
+        db.commit()
+
+# Search
+# Matches are marked with control characters inside SQLite, then turned into <mark> after escaping
+_MARK_START, _MARK_END = "\x02", "\x03"
+SEARCH_TITLE_WEIGHT = 10.0
+
+def search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
+def fts_query(terms: list[str]) -> str:
+    # Every term must match, each as a prefix: "deploy stag" finds "Deploy to staging"
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _highlight(fragment: Optional[str]) -> Optional[str]:
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def search_cards(db: Session, board_id: int, query: str, limit: int = 20):
+    """Cards on a board matching every word of `query` (as prefixes), best matches first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if db.get_bind().dialect.name != "sqlite":
+        return _search_cards_like(db, board_id, terms, limit)
+    # Every match is ranked; highlights and snippets are built only for the page that is returned
+    rows = db.execute(text(
+        "SELECT cards.id, cards.column_id, cards.title, cards.description, "
+        "highlight(cards_fts, 0, :start, :end) AS title_highlight, "
+        "snippet(cards_fts, 1, :start, :end, '…', 16) AS description_snippet, "
+        "bm25(cards_fts, :title_weight, 1.0) AS score "
+        "FROM cards_fts "
+        "JOIN cards ON cards.id = cards_fts.rowid "
+        "WHERE cards_fts MATCH :match AND cards_fts.rowid IN ("
+        "SELECT cards_fts.rowid FROM cards_fts "
+        "JOIN cards ON cards.id = cards_fts.rowid "
+        "JOIN columns ON columns.id = cards.column_id "
+        "WHERE cards_fts MATCH :match AND columns.board_id = :board_id "
+        "ORDER BY bm25(cards_fts, :title_weight, 1.0) LIMIT :limit"
+        ") ORDER BY score"
+    ), {
+        "start": _MARK_START, "end": _MARK_END, "title_weight": SEARCH_TITLE_WEIGHT,
+        "match": fts_query(terms), "board_id": board_id, "limit": limit,
+    }).all()
+    return [
+        {
+            "id": row.id, "column_id": row.column_id, "title": row.title, "description": row.description,
+            "title_highlight": _highlight(row.title_highlight),
+            "description_snippet": _highlight(row.description_snippet) if row.description else None,
+            # bm25 is lower-is-better; expose higher-is-better
+            "score": -row.score,
+        }
+        for row in rows
+    ]
+
+def _search_cards_like(db: Session, board_id: int, terms: list[str], limit: int):
+    # Unranked substring scan for databases without FTS5
+    conditions = [
+        models.Card.title.ilike(f"%{term}%") | models.Card.description.ilike(f"%{term}%") for term in terms
+    ]
+    cards = db.scalars(
+        select(models.Card)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .where(models.Column.board_id == board_id, *conditions)
+        .order_by(models.Card.column_id, models.Card.rank)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "id": card.id, "column_id": card.column_id, "title": card.title, "description": card.description,
+            "title_highlight": html.escape(card.title), "description_snippet": None, "score": 0.0,
+        }
+        for card in cards
+    ]
+
+def get_column_cards_page(db: Session, column_id: int, after: Optional[str] = None,
+                          after_id: Optional[int] = None, limit: int = 50):
+    """Keyset page of a column's cards in (rank, id) order, continuing after the card at (after, after_id).
+
+    The cursor is the last card's rank and id, so each page is an index range
+    read on (column_id, rank) whose cost does not grow with how far in it is.
+    """
+    query = select(models.Card).where(models.Card.column_id == column_id)
+    if after is not None:
+        if after_id is None:
+            query = query.where(models.Card.rank > after)
+        else:
+            query = query.where(tuple_(models.Card.rank, models.Card.id) > tuple_(after, after_id))
+    cards = db.scalars(query.order_by(models.Card.rank, models.Card.id).limit(limit + 1)).all()
+    has_more = len(cards) > limit
+    cards = cards[:limit]
+    last = cards[-1] if has_more else None
+    return {
+        "cards": cards,
+        "has_more": has_more,
+        "next_after": last.rank if last else None,
+        "next_after_id": last.id if last else None,
+    }
+
+def _batch_ranks(existing: list[str], incoming: list[schemas.CardMove]) -> list[dict]:
+    """Slot moved cards into a column by index and rank each run of them between its fixed neighbours."""
+    layout: list = list(existing)
+    for move in sorted(incoming, key=lambda m: m.order):
+        layout.insert(min(max(move.order, 0), len(layout)), move)
+
+    rows, run, lower = [], [], None
+    for item in layout + [None]:
+        if isinstance(item, schemas.CardMove):
+            run.append(item)
+            continue
+        if run:
+            for move, rank in zip(run, ranking.ranks_between(lower, item, len(run))):
+                rows.append({"id": move.card_id, "column_id": move.column_id, "order": move.order, "rank": rank})
+            run = []
+        lower = item
+    return rows
+
+def move_cards(db: Session, board_id: int, moves: list[schemas.CardMove]):
+    # Last entry wins if a card is listed twice
+    moves_by_card = {move.card_id: move for move in moves}
+    if not moves_by_card:
+        return []
+
+    source_columns = dict(db.execute(
+        select(models.Card.id, models.Card.column_id)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .where(models.Card.id.in_(moves_by_card), models.Column.board_id == board_id)
+    ).all())
+    target_column_ids = {move.column_id for move in moves_by_card.values()}
+    valid_column_ids = set(db.scalars(
+        select(models.Column.id)
+        .where(models.Column.id.in_(target_column_ids), models.Column.board_id == board_id)
+    ))
+    if len(source_columns) != len(moves_by_card) or valid_column_ids != target_column_ids:
+        return None
+
+    incoming = defaultdict(list)
+    for move in moves_by_card.values():
+        incoming[move.column_id].append(move)
+
+    def plan():
+        # Ranks of the cards that stay put in each target column, in order
+        existing = defaultdict(list)
+        for column_id, rank in db.execute(
+            select(models.Card.column_id, models.Card.rank)
+            .where(models.Card.column_id.in_(target_column_ids), models.Card.id.not_in(moves_by_card))
+            .order_by(models.Card.column_id, models.Card.rank, models.Card.id)
+        ):
+            existing[column_id].append(rank)
+        return [row for column_id in incoming for row in _batch_ranks(existing[column_id], incoming[column_id])]
+
+    try:
+        rows = plan()
+    except ValueError:
+        for column_id in target_column_ids:
+            rebalance_column(db, column_id, commit=False)
+        rows = plan()
+
+    db.execute(update(models.Card), rows)
+    _touch_boards(db, board_ids=[board_id])
+    _record_changes(db, board_id, [
+        ("card", row["id"], "update", {"column_id": row["column_id"], "order": row["order"], "rank": row["rank"]})
+        for row in rows
+    ])
+    db.commit()
+
+    affected_column_ids = target_column_ids | set(source_columns.values())
+    return db.scalars(
+        select(models.Column)
+        .where(models.Column.id.in_(affected_column_ids))
+        .options(selectinload(models.Column.cards))
+        .order_by(models.Column.order)
+    ).all()
+
+# Batched board operations (add_card / update_card / delete_card, as produced by the AI assistant)
+def _validate_operations(db: Session, board: models.Board, operations):
+    """Check every operation before anything is written; returns (columns by title, card ids on the board)."""
+    columns = db.execute(
+        select(models.Column.id, models.Column.title)
+        .where(models.Column.board_id == board.id)
+        .order_by(models.Column.order, models.Column.id)
+    ).all()
+    referenced = {op.card_id for op in operations if op.card_id is not None}
+    # Card ids from another board (or another user) are treated exactly like missing ones
+    on_board = set(db.scalars(
+        select(models.Card.id)
+        .join(models.Column, models.Card.column_id == models.Column.id)
+        .where(models.Card.id.in_(referenced), models.Column.board_id == board.id)
+    )) if referenced else set()
+
+    errors, deleted = [], set()
+    for i, op in enumerate(operations):
+        if op.action == "add_card":
+            if not columns:
+                errors.append(f"operation {i}: board has no columns")
+        elif op.action in ("update_card", "delete_card"):
+            if op.card_id is None:
+                errors.append(f"operation {i}: {op.action} requires card_id")
+            elif op.card_id not in on_board:
+                errors.append(f"operation {i}: card {op.card_id} not found")
+            elif op.card_id in deleted:
+                errors.append(f"operation {i}: card {op.card_id} is deleted earlier in the batch")
+            elif op.action == "delete_card":
+                deleted.add(op.card_id)
+        else:
+            errors.append(f"operation {i}: unknown action {op.action!r}")
+    if errors:
+        raise InvalidOperations(errors)
+    return columns, on_board
+
+def _claim_reply(db: Session, board_id: int, reply_id: str) -> bool:
+    """Record `reply_id` as applied; False if an earlier request already applied it."""
+    db.execute(delete(models.AppliedAIReply).where(models.AppliedAIReply.applied_at < models.utcnow() - APPLIED_REPLY_RETENTION))
+    try:
+        with db.begin_nested():
+            db.add(models.AppliedAIReply(reply_id=reply_id, board_id=board_id))
+    except IntegrityError:
+        return False
+    return True
+
+def _conflicting_cards(db: Session, board_id: int, card_ids, since_seq: int) -> list[int]:
+    """Cards among `card_ids` whose title or description changed after change-log seq `since_seq`."""
+    if not card_ids:
+        return []
+    floor = db.scalar(select(models.Board.change_floor).where(models.Board.id == board_id))
+    if since_seq < floor:
+        # The entries in between were compacted away; assume the worst
+        return sorted(card_ids)
+    conflicts = set()
+    for entity_id, op, payload in db.execute(
+        select(models.BoardChange.entity_id, models.BoardChange.op, models.BoardChange.payload)
+        .where(
+            models.BoardChange.board_id == board_id, models.BoardChange.seq > since_seq,
+            models.BoardChange.entity == "card", models.BoardChange.entity_id.in_(card_ids),
+        )
+    ):
+        # Moves and rebalances only touch rank, column and order
+        if op != "update" or {"title", "description"} & json.loads(payload or "{}").keys():
+            conflicts.add(entity_id)
+    return sorted(conflicts)
+
+def apply_board_operations(db: Session, board: models.Board, operations, since_seq: Optional[int] = None,
+                           reply_id: Optional[str] = None):
+    """Validate then apply a batch of operations to one board in a single transaction.
+
+    Nothing is written unless every operation is valid. Inserts, updates and
+    deletes each go out as one bulk statement, the board version and change
+    log are written once, and the owner's boards are returned from one snapshot load.
+
+    `since_seq` is the board's latest change-log seq when the operations were
+    planned. Edits made since then only conflict (BoardVersionConflict) if they
+    changed the title or description of a card the batch updates or deletes;
+    anything else on the board may have moved on. `reply_id` identifies the AI
+    reply the batch came from: duplicate submits that share one reply apply it
+    once, and the later ones just get the current boards back.
+    """
+    columns, _ = _validate_operations(db, board, operations)
+    if reply_id is not None and operations:
+        # The first write, so on SQLite the batch holds the write lock from here on
+        if not _claim_reply(db, board.id, reply_id):
+            db.rollback()
+            return get_board_snapshots(db, board.user_id)
+    if since_seq is not None:
+        touched = {op.card_id for op in operations if op.action in ("update_card", "delete_card")}
+        conflicts = _conflicting_cards(db, board.id, touched, since_seq)
+        if conflicts:
+            db.rollback()
+            raise BoardVersionConflict(
+                f"Card{'s' if len(conflicts) > 1 else ''} {', '.join(map(str, conflicts))} changed while the reply was being generated"
+            )
+    column_ids = {title.lower(): column_id for column_id, title in reversed(columns)}
+
+    additions = defaultdict(list)
+    updates, deletes = {}, []
+    for op in operations:
+        if op.action == "add_card":
+            # Unknown or missing column names fall back to the first column
+            column_id = column_ids.get((op.column_name or "").lower(), columns[0].id)
+            additions[column_id].append(op)
+        elif op.action == "delete_card":
+            updates.pop(op.card_id, None)
+            deletes.append(op.card_id)
+        else:
+            changed = updates.setdefault(op.card_id, {})
+            if op.title is not None:
+                changed["title"] = op.title
+            if op.description is not None:
+                changed["description"] = op.description
+
+    new_rows = []
+    if additions:
+        tails = {
+            column_id: (last_rank, count)
+            for column_id, last_rank, count in db.execute(
+                select(models.Card.column_id, func.max(models.Card.rank), func.count(models.Card.id))
+                .where(models.Card.column_id.in_(additions))
+                .group_by(models.Card.column_id)
+            )
+        }
+        for column_id, ops in additions.items():
+            last_rank, count = tails.get(column_id, (None, 0))
+            for k, (op, rank) in enumerate(zip(ops, ranking.ranks_between(last_rank, None, len(ops)))):
+                new_rows.append({
+                    "title": op.title or "New Card", "description": op.description or "",
+                    "order": count + k, "rank": rank, "column_id": column_id,
+                })
+
+    changes = []
+    if new_rows:
+        ids = _insert_returning_ids(db, models.Card.id, new_rows)
+        for card_id, row in zip(ids, new_rows):
+            changes.append(("card", card_id, "create", {"id": card_id, **row}))
+    update_rows = [{"id": card_id, **changed} for card_id, changed in updates.items() if changed]
+    if update_rows:
+        db.execute(update(models.Card), update_rows)
+        changes.extend(("card", row["id"], "update", {k: v for k, v in row.items() if k != "id"}) for row in update_rows)
+    if deletes:
+        db.execute(delete(models.Card).where(models.Card.id.in_(deletes)).execution_options(synchronize_session=False))
+        changes.extend(("card", card_id, "delete", None) for card_id in deletes)
+
+    if changes:
+        _touch_boards(db, board_ids=[board.id])
+        _record_changes(db, board.id, changes)
+    db.commit()
+    return get_board_snapshots(db, board.user_id)
@@ -1,16 +1,119 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from dotenv import load_dotenv
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./kanban.db"
+import metrics
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+load_dotenv()
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./kanban.db")
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, NORMAL sync is durable in WAL mode, and busy_timeout makes
+# concurrent writers wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE_KB", "64000")) * -1,  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+def _pool_options(url):
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection; pool sizing does not apply
+        return {}
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+    }
+    if os.getenv("DB_POOL_RECYCLE"):
+        options["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE"))
+    return options
+
+def apply_sqlite_pragmas(engine, pragmas=None):
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    in_memory = engine.url.database in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if name in ("journal_mode", "mmap_size") and in_memory:
+                continue
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+def _engine_options(url, kwargs):
+    # An explicit poolclass (e.g. NullPool) replaces the configured pool sizing
+    pool_options = {} if "poolclass" in kwargs else _pool_options(url)
+    return {**pool_options, "echo": os.getenv("DB_ECHO", "false").lower() == "true", **kwargs}
+
+# pyproject extras that provide the drivers for a backend
+DRIVER_EXTRAS = {"postgresql": "postgres"}
+
+def _build(factory, url, options):
+    try:
+        return factory(url, **options)
+    except ModuleNotFoundError as e:
+        extra = DRIVER_EXTRAS.get(url.get_backend_name())
+        hint = f" (uv sync --extra {extra})" if extra else ""
+        raise RuntimeError(f"DATABASE_URL uses {url.drivername}, which needs the {e.name} package{hint}") from e
+
+def create_db_engine(url=SQLALCHEMY_DATABASE_URL, **kwargs):
+    """Build an engine for `url`; SQLite connections get the tuned PRAGMA profile."""
+    url = make_url(url)
+    options = _engine_options(url, kwargs)
+    if url.get_backend_name() == "sqlite":
+        options.setdefault("connect_args", {"check_same_thread": False})
+        engine = _build(create_engine, url, options)
+        apply_sqlite_pragmas(engine)
+    else:
+        engine = _build(create_engine, url, options)
+    metrics.instrument_engine(engine)
+    return engine
+
+# Async drivers used when the configured URL names a sync one (asyncpg comes with the postgres extra)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def to_async_url(url):
+    url = make_url(url)
+    if url.get_dialect().is_async:
+        return url
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+def create_async_db_engine(url=SQLALCHEMY_DATABASE_URL, **kwargs):
+    """Async counterpart of create_db_engine, sharing the same pool and PRAGMA settings."""
+    url = to_async_url(url)
+    options = _engine_options(url, kwargs)
+    if url.get_backend_name() == "sqlite":
+        async_engine = _build(create_async_engine, url, options)
+        apply_sqlite_pragmas(async_engine.sync_engine)
+    else:
+        async_engine = _build(create_async_engine, url, options)
+    metrics.instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+# expire_on_commit=False: an expired attribute would need an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
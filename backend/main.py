@@ -1,48 +1,59 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.security import HTTPBearer
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, status, Request, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
-from typing import Optional
+import hashlib
+import json
+import math
 import os
-import jwt
-from datetime import datetime, timedelta
-
-import models, schemas, crud
-from database import engine, get_db, SessionLocal
+from datetime import timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
 
-# Create all tables (database initialization script logic)
-models.Base.metadata.create_all(bind=engine)
+import models, schemas, crud, async_crud, ranking, migrations, auth, passwords, realtime, ai_gateway, ai_service, payloads, metrics, profiling, static_assets
+from auth import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_user
+from database import engine, get_db, get_async_db, SessionLocal
 
-security = HTTPBearer()
+# Apply pending schema migrations at startup; set MIGRATE_ON_STARTUP=false when
+# `python migrations.py` runs as a separate release step instead
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
 
-def get_current_user(request: Request, token: str = Depends(security)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    payload = verify_token(token.credentials)
-    if payload is None:
-        raise credentials_exception
+def rebalance_column_in_background(bind, column_id: int):
+    db = Session(bind=bind)
+    try:
+        crud.rebalance_column(db, column_id)
+    finally:
+        db.close()
 
-    user_id = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
+def schedule_rebalance(background_tasks: BackgroundTasks, db: Session, cards):
+    for column_id in {card.column_id for card in cards if ranking.needs_rebalance(card.rank)}:
+        background_tasks.add_task(rebalance_column_in_background, db.get_bind(), column_id)
 
-    return int(user_id)
+def setup_dummy_data(db: Session):
+    if not crud.get_user_by_username(db, "user"):
+        crud.create_user_with_board(db, "user", passwords.hash_password("password"), template="demo")
 
 @asynccontextmanager
-def lifespan(app: FastAPI):
-    # Startup: Initialize dummy DB data if needed
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        migrations.upgrade(engine)
     db = SessionLocal()
-    setup_dummy_data(db)
-    db.close()
+    try:
+        setup_dummy_data(db)
+    finally:
+        db.close()
+    await realtime.broker.start()
     yield
     # Shutdown
+    await realtime.broker.stop()
+    passwords.hasher.shutdown()
+    await ai_service.provider.aclose()
 
 app = FastAPI(title="Kanban Board API", lifespan=lifespan)
+app.add_middleware(profiling.SQLProfilerMiddleware)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 @app.middleware("http")
 async def add_cors_middleware(request: Request, call_next):
@@ -52,61 +63,25 @@ async def add_cors_middleware(request: Request, call_next):
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
 
-SECRET_KEY = "your-secret-key-change-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.JWTError:
-        return None
+metrics.registry.register_stats("ai_gateway", ai_gateway.gateway.stats)
+metrics.registry.register_stats("ai_cache", ai_service.response_cache.stats)
+metrics.registry.register_stats("token_cache", auth.token_cache.stats)
+metrics.registry.register_stats("realtime", realtime.hub.stats)
+metrics.registry.register_stats("password_pool", passwords.hasher.stats)
 
-def setup_dummy_data(db: Session):
-    user = crud.get_user_by_username(db, "user")
-    if not user:
-        user = crud.create_user(db, schemas.UserCreate(username="user", password="password"))
-        board = crud.create_board(db, schemas.BoardCreate(title="Default Board", user_id=user.id))
-        c1 = crud.create_column(db, schemas.ColumnCreate(title="Backlog", order=0, board_id=board.id))
-        c2 = crud.create_column(db, schemas.ColumnCreate(title="Discovery", order=1, board_id=board.id))
-        c3 = crud.create_column(db, schemas.ColumnCreate(title="In Progress", order=2, board_id=board.id))
-        c4 = crud.create_column(db, schemas.ColumnCreate(title="Review", order=3, board_id=board.id))
-        c5 = crud.create_column(db, schemas.ColumnCreate(title="Done", order=4, board_id=board.id))
-
-        crud.create_card(db, schemas.CardCreate(title="Align roadmap themes", description="Draft quarterly themes with impact statements and metrics.", order=0, column_id=c1.id))
-        crud.create_card(db, schemas.CardCreate(title="Gather customer signals", description="Review support tags, sales notes, and churn feedback.", order=1, column_id=c1.id))
-        crud.create_card(db, schemas.CardCreate(title="Prototype analytics view", description="Sketch initial dashboard layout and key drill-downs.", order=0, column_id=c2.id))
-        crud.create_card(db, schemas.CardCreate(title="Refine status language", description="Standardize column labels and tone across the board.", order=0, column_id=c3.id))
-        crud.create_card(db, schemas.CardCreate(title="Design card layout", description="Add hierarchy and spacing for scanning dense lists.", order=1, column_id=c3.id))
-        crud.create_card(db, schemas.CardCreate(title="QA micro-interactions", description="Verify hover, focus, and loading states.", order=0, column_id=c4.id))
-        crud.create_card(db, schemas.CardCreate(title="Ship marketing page", description="Final copy approved and asset pack delivered.", order=0, column_id=c5.id))
-        crud.create_card(db, schemas.CardCreate(title="Close onboarding sprint", description="Document release notes and share internally.", order=1, column_id=c5.id))
+@app.exception_handler(passwords.PasswordPoolBusy)
+async def password_pool_busy(request: Request, exc: passwords.PasswordPoolBusy):
+    # Shed excess logins rather than queueing bcrypt work without bound
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup: Initialize dummy DB data if needed
-    db = SessionLocal()
-    setup_dummy_data(db)
-    db.close()
-    yield
-    # Shutdown
-
-app = FastAPI(title="Kanban Board API", lifespan=lifespan)
+@app.exception_handler(ai_gateway.AIGatewayError)
+async def ai_gateway_error(request: Request, exc: ai_gateway.AIGatewayError):
+    headers = {"Retry-After": str(math.ceil(exc.retry_after))} if exc.retry_after is not None else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
 
 @app.post("/api/auth/login", response_model=schemas.AuthResponse)
-async def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, request.username, request.password)
+async def login(request: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.authenticate_user(db, request.username, request.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -122,34 +97,69 @@ async def login(request: schemas.LoginRequest, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer", "user_id": user.id}
 
 @app.post("/api/auth/register", response_model=schemas.AuthResponse)
-async def register(request: schemas.LoginRequest, db: Session = Depends(get_db)):
-    existing_user = crud.get_user_by_username(db, request.username)
+async def register(request: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await async_crud.get_user_by_username(db, request.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
 
-    user_create = schemas.UserCreate(username=request.username, password=request.password)
-    user = crud.create_user(db, user_create)
-
-    # Initialize a default board for the newly registered user
-    board = crud.create_board(db, schemas.BoardCreate(title="Default Board", user_id=user.id))
-    crud.create_column(db, schemas.ColumnCreate(title="To Do", order=0, board_id=board.id))
-    crud.create_column(db, schemas.ColumnCreate(title="In Progress", order=1, board_id=board.id))
-    crud.create_column(db, schemas.ColumnCreate(title="Done", order=2, board_id=board.id))
+    # The user and their default board are created in one transaction
+    try:
+        user_id = await async_crud.register_user(db, request.username, request.password)
+    except IntegrityError:
+        # A concurrent registration took the name after the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered",
+        )
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data={"sub": str(user_id)}, expires_delta=access_token_expires
     )
 
-    return {"access_token": access_token, "token_type": "bearer", "user_id": user.id}
+    return {"access_token": access_token, "token_type": "bearer", "user_id": user_id}
 
 @app.get("/api/auth/logout")
-async def logout():
+async def logout(token=Depends(auth.optional_security), db: AsyncSession = Depends(get_async_db)):
+    if token is not None:
+        await auth.revoke_token(db, token.credentials)
     return {"message": "Logged out successfully"}
 
+@app.get("/api/auth/token-cache")
+def read_token_cache_stats(current_user_id: int = Depends(get_current_user)):
+    return auth.token_cache.stats()
+
+@app.get("/api/ai/gateway")
+def read_ai_gateway_stats(current_user_id: int = Depends(get_current_user)):
+    return {**ai_gateway.gateway.stats(), "cache": ai_service.response_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def sql_profiling_enabled():
+    # Resolved before authentication, so the routes do not exist at all while profiling is off
+    if not profiling.PROFILE_SQL:
+        raise HTTPException(status_code=404, detail="SQL profiling is disabled")
+
+@app.get("/api/debug/sql-profiles", include_in_schema=False, dependencies=[Depends(sql_profiling_enabled)])
+def read_sql_profiles(current_user_id: int = Depends(get_current_user)):
+    """The caller's recent request profiles, newest first (PROFILE_SQL=true only)."""
+    return [
+        {key: value for key, value in profile.summary().items() if key != "queries"}
+        for profile in profiling.profiles_of(current_user_id)
+    ]
+
+@app.get("/api/debug/sql-profiles/{profile_id}", include_in_schema=False, dependencies=[Depends(sql_profiling_enabled)])
+def read_sql_profile(profile_id: int, current_user_id: int = Depends(get_current_user)):
+    profile = profiling.get_profile(profile_id, current_user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.summary()
+
 @app.get("/api/hello")
 def read_hello():
     return {"message": "hello world"}
@@ -161,118 +171,124 @@ def read_user(username: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
+def board_cache_headers(versions):
+    digest = hashlib.sha1(",".join(f"{id}:{version}" for id, version, _ in versions).encode()).hexdigest()
+    headers = {"ETag": f'W/"{digest[:20]}"', "Cache-Control": "private, no-cache"}
+    modified = [updated_at for _, _, updated_at in versions if updated_at is not None]
+    if modified:
+        headers["Last-Modified"] = format_datetime(max(modified).replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    # Weak comparison: W/"x" and "x" name the same representation
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
 @app.get("/api/users/{user_id}/boards", response_model=list[schemas.Board])
-def read_user_boards(user_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
+def read_user_boards(user_id: int, request: Request, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
     if current_user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    boards = crud.get_boards(db, user_id=user_id)
-    return boards
+    # Validators come from board versions alone, so an unchanged board list
+    # is answered without loading any columns or cards
+    headers = board_cache_headers(crud.get_board_versions(db, user_id=user_id))
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # Already in the schemas.Board shape; returned as a response so it is not validated again
+    return payloads.JSONResponse(crud.get_board_payloads(db, user_id=user_id), headers=headers)
 
 @app.post("/api/boards", response_model=schemas.Board)
 def create_board(board: schemas.BoardCreate, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
     board.user_id = current_user_id
     return crud.create_board(db=db, board=board)
 
+@app.post("/api/boards/{board_id}/moves", response_model=list[schemas.Column])
+def move_cards(batch: schemas.CardMoveBatch, background_tasks: BackgroundTasks, db: Session = Depends(get_db), db_board: models.Board = Depends(auth.owned_board)):
+    # Persist a whole drag-and-drop (every card whose position changed) in one transaction
+    columns = crud.move_cards(db, db_board.id, batch.moves)
+    if columns is None:
+        raise HTTPException(status_code=404, detail="Card or column not found on this board")
+    schedule_rebalance(background_tasks, db, [card for column in columns for card in column.cards])
+    return columns
+
+@app.get("/api/boards/{board_id}/summary", response_model=schemas.BoardSummary)
+def read_board_summary(request: Request, response: Response, cards_per_column: int = 20, db: Session = Depends(get_db), db_board: models.Board = Depends(auth.owned_board)):
+    """First paint of a large board: every column with its card count and first cards.
+    The rest of a column comes from GET /api/columns/{id}/cards."""
+    headers = board_cache_headers([(db_board.id, db_board.version, db_board.updated_at)])
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return crud.get_board_summary(db, db_board, min(max(cards_per_column, 0), 200))
+
+@app.get("/api/boards/{board_id}/changes", response_model=schemas.BoardChangeFeed)
+def read_board_changes(since: int = 0, limit: int = 500, db: Session = Depends(get_db), db_board: models.Board = Depends(auth.owned_board)):
+    return crud.get_board_changes(db, db_board, since, min(max(limit, 1), 1000))
+
+@app.get("/api/boards/{board_id}/search", response_model=list[schemas.CardSearchHit])
+def search_board(q: str, limit: int = 20, db: Session = Depends(get_db), db_board: models.Board = Depends(auth.owned_board)):
+    return crud.search_cards(db, db_board.id, q, min(max(limit, 1), 100))
+
+@app.websocket("/api/boards/{board_id}/ws")
+async def board_updates(websocket: WebSocket, board_id: int, token: str = "", db: AsyncSession = Depends(get_async_db)):
+    # Browsers cannot set headers on a WebSocket handshake, so the bearer token comes as ?token=
+    user_id = await db.run_sync(auth.resolve_token, token)
+    row = await async_crud.get_board_with_owner(db, board_id) if user_id is not None else None
+    # Do not hold a pooled connection for the lifetime of the socket
+    await db.close()
+    if row is None or row.user_id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await realtime.serve(websocket, board_id)
+
+@app.get("/api/columns/{column_id}/cards", response_model=schemas.CardPage)
+def read_column_cards(after: Optional[str] = None, after_id: Optional[int] = None, limit: int = 50, db: Session = Depends(get_db), db_column: models.Column = Depends(auth.owned_column)):
+    return crud.get_column_cards_page(db, db_column.id, after, after_id, min(max(limit, 1), 200))
+
 @app.post("/api/columns", response_model=schemas.Column)
 def create_column(column: schemas.ColumnCreate, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the board
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    auth.authorize_board(db, column.board_id, current_user_id)
     return crud.create_column(db=db, column=column)
 
 @app.patch("/api/columns/{column_id}", response_model=schemas.Column)
-def update_column(column_id: int, column: schemas.ColumnUpdate, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the column's board
-    db_column = db.query(models.Column).filter(models.Column.id == column_id).first()
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if db_column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    db_column = crud.update_column(db, column_id, column)
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-    return db_column
+def update_column(column: schemas.ColumnUpdate, db: Session = Depends(get_db), db_column: models.Column = Depends(auth.owned_column)):
+    return crud.update_column(db, db_column, column)
 
 @app.delete("/api/columns/{column_id}")
-def delete_column(column_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the column's board
-    db_column = db.query(models.Column).filter(models.Column.id == column_id).first()
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if db_column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    db_column = crud.delete_column(db, column_id)
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
+def delete_column(db: Session = Depends(get_db), db_column: models.Column = Depends(auth.owned_column)):
+    crud.delete_column(db, db_column)
     return {"message": "deleted"}
 
 @app.post("/api/cards", response_model=schemas.Card)
-def create_card(card: schemas.CardCreate, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the column's board
-    db_column = db.query(models.Column).filter(models.Column.id == card.column_id).first()
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if db_column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    return crud.create_card(db=db, card=card)
+def create_card(card: schemas.CardCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
+    auth.authorize_column(db, card.column_id, current_user_id)
+    try:
+        db_card = crud.create_card(db=db, card=card)
+    except crud.InvalidPlacement as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    schedule_rebalance(background_tasks, db, [db_card])
+    return db_card
 
 @app.patch("/api/cards/{card_id}", response_model=schemas.Card)
-def update_card(card_id: int, card: schemas.CardUpdate, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the card's board
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if not db_card:
-        raise HTTPException(status_code=404, detail="Card not found")
-
-    db_column = db.query(models.Column).filter(models.Column.id == db_card.column_id).first()
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if db_column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    db_card = crud.update_card(db, card_id, card)
-    if not db_card:
-        raise HTTPException(status_code=404, detail="Card not found")
+def update_card(card: schemas.CardUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user), db_card: models.Card = Depends(auth.owned_card)):
+    if card.column_id is not None and card.column_id != db_card.column_id:
+        # Moving to another column: the target must be on one of the user's boards too
+        auth.authorize_column(db, card.column_id, current_user_id)
+    try:
+        db_card = crud.update_card(db, db_card, card)
+    except crud.InvalidPlacement as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    schedule_rebalance(background_tasks, db, [db_card])
     return db_card
 
 @app.delete("/api/cards/{card_id}")
-def delete_card(card_id: int, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
-    # Verify user owns the card's board
-    db_card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if not db_card:
-        raise HTTPException(status_code=404, detail="Card not found")
-
-    db_column = db.query(models.Column).filter(models.Column.id == db_card.column_id).first()
-    if not db_column:
-        raise HTTPException(status_code=404, detail="Column not found")
-
-    boards = crud.get_boards(db, user_id=current_user_id)
-    board_ids = [b.id for b in boards]
-    if db_column.board_id not in board_ids:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    db_card = crud.delete_card(db, card_id)
-    if not db_card:
-        raise HTTPException(status_code=404, detail="Card not found")
+def delete_card(db: Session = Depends(get_db), db_card: models.Card = Depends(auth.owned_card)):
+    crud.delete_card(db, db_card)
     return {"message": "deleted"}
 
-from ai_service import ask_math_question, process_chat
+from ai_service import ask_math_question, chat_reply_id, process_chat, stream_chat
+from board_context import build_board_context
 from pydantic import BaseModel
 
 @app.get("/api/ai/test")
@@ -280,6 +296,8 @@ async def test_ai():
     try:
         response = await ask_math_question("What is 2+2?")
         return {"response": response}
+    except ai_gateway.AIGatewayError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -287,67 +305,113 @@ class ChatRequest(BaseModel):
     message: str
     user_id: int
 
+def board_prompt_data(board: models.Board) -> dict:
+    return {
+        "board_title": board.title,
+        "columns": [
+            {
+                "id": col.id,
+                "title": col.title,
+                "cards": [
+                    {"id": card.id, "title": card.title, "description": card.description}
+                    for card in col.cards
+                ]
+            }
+            for col in board.columns
+        ]
+    }
+
 @app.post("/api/ai/chat")
-async def chat_with_ai(request: ChatRequest, db: Session = Depends(get_db), current_user_id: int = Depends(get_current_user)):
+async def chat_with_ai(request: ChatRequest, db: AsyncSession = Depends(get_async_db), current_user_id: int = Depends(get_current_user)):
     if current_user_id != request.user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
     try:
-        boards = crud.get_boards(db, user_id=request.user_id)
+        boards = await async_crud.get_board_snapshots(db, user_id=request.user_id)
         if not boards:
             raise HTTPException(status_code=404, detail="No board found")
 
         board = boards[0]
-        board_data = {
-            "board_title": board.title,
-            "columns": [
-                {
-                    "id": col.id,
-                    "title": col.title,
-                    "cards": [
-                        {"id": card.id, "title": card.title, "description": card.description}
-                        for card in col.cards
-                    ]
-                }
-                for col in board.columns
-            ]
-        }
-
-        ai_response = await process_chat(request.message, board_data)
-
-        for op in ai_response.operations:
-            if op.action == "add_card":
-                col = next((c for c in board.columns if c.title.lower() == op.column_name.lower()), None) if op.column_name else None
-                if not col and board.columns: col = board.columns[0]
-                if col:
-                    crud.create_card(db, schemas.CardCreate(
-                        title=op.title or "New Card",
-                        description=op.description or "",
-                        order=len(col.cards),
-                        column_id=col.id
-                    ))
-            elif op.action == "delete_card" and op.card_id:
-                crud.delete_card(db, op.card_id)
-            elif op.action == "update_card" and op.card_id:
-                update_data = {}
-                if op.title is not None: update_data["title"] = op.title
-                if op.description is not None: update_data["description"] = op.description
-                if update_data:
-                    crud.update_card(db, op.card_id, schemas.CardUpdate(**update_data))
-
-        db.refresh(board)
-        updated_boards = crud.get_boards(db, user_id=request.user_id)
-
-        return {
+        version = board.version
+        context = build_board_context(board_prompt_data(board), request.message)
+        cursor = await async_crud.get_latest_change_seq(db, board.id)
+
+        # Hand the connection back to the pool while waiting on the model
+        await db.commit()
+        ai_response = await process_chat(request.message, context.text, f"{board.id}:{version}", request.user_id)
+
+        # Duplicate submits share one cached reply and apply it once
+        reply_id = chat_reply_id(request.message, context.text, f"{board.id}:{version}", ai_response)
+        try:
+            updated_boards = await async_crud.apply_board_operations(db, board, ai_response.operations,
+                                                                     since_seq=cursor, reply_id=reply_id)
+        except crud.InvalidOperations as e:
+            raise HTTPException(status_code=422, detail={"response_message": ai_response.response_message, "errors": e.errors})
+        except crud.BoardVersionConflict as e:
+            # A card the reply edits was edited meanwhile; nothing was applied
+            raise HTTPException(status_code=409, detail={"response_message": ai_response.response_message, "errors": [str(e)]})
+
+        return payloads.JSONResponse({
             "response_message": ai_response.response_message,
-            "board": schemas.Board.model_validate(updated_boards[0]).model_dump()
-        }
+            "board": payloads.board_payload(updated_boards[0]),
+            "context": context.stats()
+        })
+    except (HTTPException, ai_gateway.AIGatewayError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/ai/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest, db: AsyncSession = Depends(get_async_db), current_user_id: int = Depends(get_current_user)):
+    """Server-sent events: `message` text deltas, each `operation` as soon as it is parsed,
+    then `board` (the change-feed delta the operations produced) and `done`."""
+    if current_user_id != request.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Refuse with a status code while we still can; the slot itself is taken inside the stream
+    ai_gateway.gateway.check(request.user_id)
+
+    boards = await async_crud.get_board_snapshots(db, user_id=request.user_id)
+    if not boards:
+        raise HTTPException(status_code=404, detail="No board found")
+    board = boards[0]
+    version = board.version
+    context = build_board_context(board_prompt_data(board), request.message)
+    cursor = await async_crud.get_latest_change_seq(db, board.id)
+    await db.commit()
+
+    async def events():
+        try:
+            async with ai_gateway.gateway.slot(request.user_id):
+                async for kind, value in stream_chat(request.message, context.text, f"{board.id}:{version}"):
+                    if kind == "message":
+                        yield sse_event("message", {"delta": value})
+                    elif kind == "operation":
+                        yield sse_event("operation", value.model_dump())
+                    else:
+                        ai_response = value
+
+            reply_id = chat_reply_id(request.message, context.text, f"{board.id}:{version}", ai_response)
+            await async_crud.apply_board_operations(db, board, ai_response.operations, since_seq=cursor, reply_id=reply_id)
+            feed = await async_crud.get_board_changes(db, board, cursor, limit=1000)
+            yield sse_event("board", schemas.BoardChangeFeed.model_validate(feed, from_attributes=True).model_dump(mode="json"))
+            yield sse_event("done", {"response_message": ai_response.response_message, "context": context.stats()})
+        except crud.InvalidOperations as e:
+            # Nothing was applied; the streamed operations are void
+            yield sse_event("error", {"detail": str(e), "errors": e.errors})
+        except crud.BoardVersionConflict as e:
+            yield sse_event("error", {"detail": str(e), "errors": [str(e)]})
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
-app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
+app.mount("/", static_assets.PrecompressedStaticFiles(directory=STATIC_DIR, html=True), name="static")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,290 @@
+"""Prometheus metrics, served as text on GET /metrics.
+
+Recorded on the hot path (each a dict lookup and a locked add):
+
+- per route: request count by status, latency histogram, and requests in
+  flight per method (RequestMetricsMiddleware; the route label is the path
+  template, e.g. /api/boards/{board_id}/summary)
+- SQL: every statement's duration, whose _count is the statement count (instrument_engine, installed by
+  database.py on each engine), plus the statement count and SQL time of each
+  request as histograms per route
+- bcrypt hash/verify time (passwords.py), AI request latency by provider,
+  operation and outcome (ai_service.py), and upstream token usage (ai_providers.py)
+
+Read at scrape time: the `stats()` of the AI gateway and response cache, the
+token cache, the realtime hub and the password pool, registered by main.py
+with `registry.register_stats`.
+
+Set METRICS_ENABLED=false to turn recording off.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+NAMESPACE = "kanban"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    @abstractmethod
+    def _render_child(self, values, child) -> list[str]:
+        ...
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines += self._render_child(values, child)
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if METRICS_ENABLED:
+            with self._lock:
+                self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if METRICS_ENABLED:
+            i = bisect.bisect_left(self.bounds, value)
+            with self._lock:
+                self.counts[i] += 1
+                self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._stats = []
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._add(Counter(f"{NAMESPACE}_{name}", documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._add(Gauge(f"{NAMESPACE}_{name}", documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(f"{NAMESPACE}_{name}", documentation, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict]):
+        """Expose a component's `stats()` dict as gauges named <namespace>_<prefix>_<key>.
+
+        Nested dicts flatten into the name, strings become a `value` label set
+        to 1, and None is skipped.
+        """
+        self._stats.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for prefix, stats in self._stats:
+            lines += _render_stats(f"{NAMESPACE}_{prefix}", stats())
+        return "\n".join(lines) + "\n"
+
+
+def _render_stats(prefix: str, stats: dict) -> list[str]:
+    lines = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            lines += _render_stats(name, value)
+        elif isinstance(value, bool):
+            lines += [f"# TYPE {name} gauge", f"{name} {int(value)}"]
+        elif isinstance(value, (int, float)):
+            lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        elif isinstance(value, str):
+            lines += [f"# TYPE {name} gauge", f'{name}{{value="{_escape(value)}"}} 1']
+    return lines
+
+
+registry = Registry()
+
+REQUESTS = registry.counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency, until the last body byte.", ("method", "route"))
+REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served.", ("method",))
+REQUEST_SQL_STATEMENTS = registry.histogram("http_request_sql_statements", "SQL statements run by one request.", ("route",), COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = registry.histogram("http_request_sql_seconds", "Time one request spent in SQL statements.", ("route",), SQL_BUCKETS)
+SQL_SECONDS = registry.histogram("sql_statement_duration_seconds", "SQL statement execution time.", buckets=SQL_BUCKETS)
+PASSWORD_SECONDS = registry.histogram("password_hash_duration_seconds", "bcrypt time per operation.", ("operation",), AI_BUCKETS[:6])
+AI_REQUEST_SECONDS = registry.histogram("ai_request_duration_seconds", "AI provider call latency.", ("provider", "operation", "outcome"), AI_BUCKETS)
+AI_TOKENS = registry.counter("ai_tokens_total", "Tokens reported by the AI provider.", ("provider", "kind"))
+
+# [statements, seconds] of the request being served, shared with the threads and greenlets it runs SQL on
+_request_sql: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_sql", default=None)
+
+
+def instrument_engine(engine):
+    """Time every statement on a (sync) engine and add it to the current request's totals."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_started
+        SQL_SECONDS.observe(elapsed)
+        totals = _request_sql.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Unrouted paths (the static frontend, 404s) share one label to bound cardinality
+    return getattr(route, "path_format", None) or "other"
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware, so it adds no task or stream wrapping to the request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        totals = [0, 0.0]
+        token = _request_sql.set(totals)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            _request_sql.reset(token)
+            route = _route_label(scope)
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_SECONDS.labels(method, route).observe(elapsed)
+            REQUEST_SQL_STATEMENTS.labels(route).observe(totals[0])
+            REQUEST_SQL_SECONDS.labels(route).observe(totals[1])
@@ -0,0 +1,185 @@
+"""Versioned schema migrations.
+
+`Base.metadata.create_all` only creates missing tables, so anything added to an
+existing table (columns, indexes, triggers, ...) is a numbered migration here.
+Applied versions are recorded in `schema_migrations`. Migrations must be
+idempotent: a fresh database already gets the current schema from the models,
+and each step checks what is there before changing it. Each one runs in its
+own short transaction, so upgrades are additive and can be applied while the
+app keeps serving.
+
+Run `python migrations.py` to upgrade the configured database explicitly.
+"""
+from collections import defaultdict
+
+from sqlalchemy import inspect, text
+
+import models
+import ranking
+
+
+def _columns(conn, table):
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def add_card_ranks(conn):
+    if "rank" in _columns(conn, "cards"):
+        return
+    conn.execute(text("ALTER TABLE cards ADD COLUMN rank VARCHAR(255) NOT NULL DEFAULT ''"))
+
+    # Seed ranks from the existing dense order so every board keeps its layout
+    card_ids = defaultdict(list)
+    for card_id, column_id in conn.execute(text('SELECT id, column_id FROM cards ORDER BY column_id, "order", id')):
+        card_ids[column_id].append(card_id)
+    rows = [
+        {"id": card_id, "rank": rank}
+        for ids in card_ids.values()
+        for card_id, rank in zip(ids, ranking.ranks_between(None, None, len(ids)))
+    ]
+    if rows:
+        conn.execute(text("UPDATE cards SET rank = :rank WHERE id = :id"), rows)
+
+
+def add_hot_path_indexes(conn):
+    # Foreign keys used by every board read and ownership check, plus ordered card reads
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_boards_user_id ON boards (user_id)"))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_columns_board_id_order ON columns (board_id, "order")'))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cards_column_id_rank ON cards (column_id, rank)"))
+
+
+def add_board_versions(conn):
+    existing = _columns(conn, "boards")
+    if "version" not in existing:
+        conn.execute(text("ALTER TABLE boards ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    if "updated_at" not in existing:
+        # SQLite cannot add a column with a non-constant default, so backfill instead
+        conn.execute(text("ALTER TABLE boards ADD COLUMN updated_at TIMESTAMP"))
+        conn.execute(text("UPDATE boards SET updated_at = :now"), {"now": models.utcnow()})
+
+
+def add_board_change_log(conn):
+    # The board_changes table itself comes from create_all
+    if "change_floor" not in _columns(conn, "boards"):
+        conn.execute(text("ALTER TABLE boards ADD COLUMN change_floor INTEGER NOT NULL DEFAULT 0"))
+
+
+CARD_SEARCH_TRIGGERS = {
+    "cards_fts_insert": "AFTER INSERT ON cards BEGIN "
+        "INSERT INTO cards_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "cards_fts_delete": "AFTER DELETE ON cards BEGIN "
+        "INSERT INTO cards_fts (cards_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "cards_fts_update": "AFTER UPDATE OF title, description ON cards BEGIN "
+        "INSERT INTO cards_fts (cards_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO cards_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+}
+
+
+def add_card_search(conn):
+    # Full-text index over card titles and descriptions (SQLite FTS5). It is an
+    # external-content table: it stores only the index, and triggers keep it in step
+    # with `cards` for every write path, including bulk statements and cascades.
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5("
+        "title, description, content='cards', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    for name, body in CARD_SEARCH_TRIGGERS.items():
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+    conn.execute(text("INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')"))
+
+
+def use_bytewise_rank_collation(conn):
+    # Under a locale collation PostgreSQL would order ranks differently from
+    # ranking.py. SQLite already compares text bytewise.
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text('ALTER TABLE cards ALTER COLUMN rank TYPE VARCHAR(255) COLLATE "C"'))
+
+
+MIGRATIONS = [
+    (1, "add_card_ranks", add_card_ranks),
+    (2, "add_hot_path_indexes", add_hot_path_indexes),
+    (3, "add_board_versions", add_board_versions),
+    (4, "add_board_change_log", add_board_change_log),
+    (5, "add_card_search", add_card_search),
+    (6, "use_bytewise_rank_collation", use_bytewise_rank_collation),
+]
+
+
+def applied_versions(conn):
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def current_version(engine):
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("schema_migrations"):
+            return 0
+        return max(applied_versions(conn), default=0)
+
+
+def is_current(engine) -> bool:
+    """Every model table exists and every migration is applied: two queries, nothing to do."""
+    with engine.connect() as conn:
+        tables = set(inspect(conn).get_table_names())
+        if not tables >= set(models.Base.metadata.tables) | {"schema_migrations"}:
+            return False
+        return applied_versions(conn) >= {version for version, _, _ in MIGRATIONS}
+
+
+# pg_advisory_xact_lock key shared by every worker running upgrade()
+ADVISORY_LOCK_ID = 4_715_309
+
+
+def _lock_schema(conn):
+    """Take the database write lock for the rest of this transaction.
+
+    Workers starting together would otherwise all see a migration as pending
+    and all run it: SQLite's default deferred transactions only lock on the
+    first write, after the check.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def upgrade(engine):
+    """Create missing tables, then apply every pending migration in order.
+
+    Safe to run on every start: an up-to-date database is detected without
+    touching the schema, and concurrent upgrades take turns under a lock.
+    """
+    if is_current(engine):
+        return []
+    with engine.begin() as conn:
+        _lock_schema(conn)
+        models.Base.metadata.create_all(bind=conn)
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            # Re-check under the lock in case another worker got here first
+            _lock_schema(conn)
+            if version in applied_versions(conn):
+                continue
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": models.utcnow()},
+            )
+            applied.append(name)
+    return applied
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    applied = upgrade(engine)
+    print(f"Applied {len(applied)} migration(s): {', '.join(applied) or 'none'}")
+    print(f"Schema version: {current_version(engine)}")
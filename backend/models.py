@@ -1,8 +1,13 @@
-from sqlalchemy import Column as SAColumn, Integer, String, Text, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column as SAColumn, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+def utcnow() -> datetime:
+    """Current UTC time, naive, as the DateTime columns store it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -17,13 +22,19 @@ class Board(Base):
     
     id = SAColumn(Integer, primary_key=True, index=True)
     title = SAColumn(String(100), nullable=False)
-    user_id = SAColumn(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = SAColumn(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    # Bumped by every column/card mutation; drives the ETag of board reads
+    version = SAColumn(Integer, nullable=False, default=1, server_default="1")
+    updated_at = SAColumn(DateTime, nullable=True, default=utcnow)
+    # Highest change-log seq compacted away; feed cursors below it must resync
+    change_floor = SAColumn(Integer, nullable=False, default=0, server_default="0")
     
     owner = relationship("User", back_populates="boards")
     columns = relationship("Column", back_populates="board", cascade="all, delete-orphan", order_by="Column.order")
 
 class Column(Base):
     __tablename__ = 'columns'
+    __table_args__ = (Index('ix_columns_board_id_order', 'board_id', 'order'),)
     
     id = SAColumn(Integer, primary_key=True, index=True)
     title = SAColumn(String(50), nullable=False)
@@ -31,15 +42,50 @@ class Column(Base):
     board_id = SAColumn(Integer, ForeignKey('boards.id'), nullable=False)
     
     board = relationship("Board", back_populates="columns")
-    cards = relationship("Card", back_populates="column", cascade="all, delete-orphan", order_by="Card.order")
+    cards = relationship("Card", back_populates="column", cascade="all, delete-orphan", order_by="[Card.rank, Card.id]")
 
 class Card(Base):
     __tablename__ = 'cards'
+    __table_args__ = (Index('ix_cards_column_id_rank', 'column_id', 'rank'),)
     
     id = SAColumn(Integer, primary_key=True, index=True)
     title = SAColumn(String(200), nullable=False)
     description = SAColumn(Text, nullable=True)
+    # Legacy dense position; cards are ordered by `rank` (see ranking.py)
     order = SAColumn(Integer, nullable=False, default=0)
+    # Ranks sort by code point (see ranking.py); PostgreSQL needs the C collation to agree
+    rank = SAColumn(String(255).with_variant(String(255, collation="C"), "postgresql"), nullable=False, default="")
     column_id = SAColumn(Integer, ForeignKey('columns.id'), nullable=False)
     
     column = relationship("Column", back_populates="cards")
+
+class BoardChange(Base):
+    """Append-only log of column and card mutations, read by the board change feed."""
+    __tablename__ = 'board_changes'
+    __table_args__ = (
+        Index('ix_board_changes_board_id_seq', 'board_id', 'seq'),
+        # AUTOINCREMENT: a seq is never reused, even after compaction empties the table
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = SAColumn(Integer, primary_key=True)
+    board_id = SAColumn(Integer, ForeignKey('boards.id', ondelete='CASCADE'), nullable=False)
+    entity = SAColumn(String(20), nullable=False)
+    entity_id = SAColumn(Integer, nullable=False)
+    op = SAColumn(String(10), nullable=False)
+    payload = SAColumn(Text, nullable=True)
+
+class AppliedAIReply(Base):
+    """AI replies whose operations are on the board; a reply shared by duplicate submits lands once."""
+    __tablename__ = 'applied_ai_replies'
+
+    reply_id = SAColumn(String(64), primary_key=True)
+    board_id = SAColumn(Integer, ForeignKey('boards.id', ondelete='CASCADE'), nullable=False)
+    applied_at = SAColumn(DateTime, nullable=False, default=utcnow, index=True)
+
+class RevokedToken(Base):
+    """Logged-out bearer tokens, by jti, kept until they would have expired anyway."""
+    __tablename__ = 'revoked_tokens'
+
+    jti = SAColumn(String(64), primary_key=True)
+    expires_at = SAColumn(DateTime, nullable=False, index=True)
@@ -0,0 +1,110 @@
+"""Password hashing on a bounded worker pool.
+
+bcrypt is deliberately slow (~250 ms at cost 12) and would stall the event loop
+if called from an async route. `hasher` runs it on a small thread pool (bcrypt
+releases the GIL while hashing) and admits at most PASSWORD_HASH_MAX_PENDING
+jobs at once; beyond that it raises PasswordPoolBusy, which the API maps to 429.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+import metrics
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+def hash_password(plain_password: str, rounds: Optional[int] = None) -> str:
+    started = time.perf_counter()
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    hashed = bcrypt.hashpw(plain_password.encode('utf-8'), salt).decode('utf-8')
+    metrics.PASSWORD_SECONDS.labels("hash").observe(time.perf_counter() - started)
+    return hashed
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    started = time.perf_counter()
+    valid = bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    metrics.PASSWORD_SECONDS.labels("verify").observe(time.perf_counter() - started)
+    return valid
+
+
+def hash_rounds(hashed_password: str) -> int:
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    return int(hashed_password.split("$")[2])
+
+
+def needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+    return hash_rounds(hashed_password) != (rounds or BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return asyncio.wrap_future(future)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._submit(hash_password, plain_password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return needs_rehash(hashed_password, self.rounds)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "rounds": self.rounds,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+hasher = PasswordHasher()
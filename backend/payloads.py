@@ -0,0 +1,43 @@
+"""Fast path for the nested Board/Column/Card JSON.
+
+Returning a model from a route makes FastAPI validate it against
+response_model (walking every ORM attribute through from_attributes) before
+encoding. The board routes instead return plain dicts in the schemas.Board
+shape, built from tuple rows (crud.get_board_payloads) or from already-loaded
+ORM objects (board_payload), wrapped in JSONResponse so the validation step
+is skipped, and the result is encoded with orjson.
+"""
+import orjson
+from fastapi.responses import JSONResponse as _JSONResponse
+
+import models
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content)
+
+
+class JSONResponse(_JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def card_payload(card: models.Card) -> dict:
+    return {
+        "title": card.title, "description": card.description, "order": card.order,
+        "id": card.id, "column_id": card.column_id, "rank": card.rank,
+    }
+
+
+def board_payload(board: models.Board) -> dict:
+    """schemas.Board as a dict, from a board whose columns and cards are loaded (crud.get_board_snapshots)."""
+    return {
+        "title": board.title, "id": board.id, "user_id": board.user_id, "version": board.version,
+        "columns": [
+            {
+                "title": column.title, "order": column.order, "id": column.id, "board_id": column.board_id,
+                "cards": [card_payload(card) for card in column.cards],
+            }
+            for column in board.columns
+        ],
+    }
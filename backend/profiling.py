@@ -0,0 +1,226 @@
+"""SQL profiler and N+1 detector, for development and tests.
+
+A Profile records each statement with its duration and the call site in this
+backend that issued it (e.g. "crud.py:71 in get_board_snapshots"). Statements
+are grouped by shape: the SQL with IN lists collapsed and whitespace
+normalized. A shape that runs N_PLUS_ONE_THRESHOLD or more times within one
+profile is reported as an N+1 pattern, which is almost always a lazy load in a
+loop.
+
+- PROFILE_SQL=true profiles every HTTP request (SQLProfilerMiddleware). Each
+  response carries X-SQL-Queries, X-SQL-Time-Ms, X-SQL-N-Plus-One and
+  X-SQL-Profile headers, and the last PROFILE_HISTORY profiles are served by
+  GET /api/debug/sql-profiles[/{id}]. Statements issued after the response
+  headers (background tasks, streamed bodies) only appear in the stored profile.
+  The SQL text is exposed, parameters are not; still, never enable this in production.
+- `with profiling.capture() as profile:` records every statement on any
+  engine while the block runs, whichever thread issues it. Tests get it as the
+  `sql_profiler` fixture and assert budgets with `profile.assert_at_most(3)`
+  and `profile.assert_no_n_plus_one()`.
+
+The listeners are attached to all engines the first time either is used,
+so the profiler costs nothing until then.
+"""
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+PROFILE_SQL = os.getenv("PROFILE_SQL", "false").lower() == "true"
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "50"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("PROFILE_N_PLUS_ONE_THRESHOLD", "3"))
+
+THIS_FILE = os.path.abspath(__file__)
+BACKEND_DIR = os.path.dirname(THIS_FILE)
+IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)|\(\s*__\[POSTCOMPILE_\w+\]\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(sql: str) -> str:
+    return WHITESPACE.sub(" ", IN_LIST.sub("(?)", sql)).strip()
+
+
+def call_site() -> Optional[str]:
+    """The innermost frame in this backend's own code (not SQLAlchemy, not this module)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(BACKEND_DIR) and filename != THIS_FILE and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+@dataclass
+class Statement:
+    sql: str
+    seconds: float
+    call_site: Optional[str]
+
+    @property
+    def shape(self) -> str:
+        return statement_shape(self.sql)
+
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Profile:
+    label: str = ""
+    id: int = field(default_factory=lambda: next(_ids))
+    statements: list[Statement] = field(default_factory=list)
+    # The authenticated user the request ran as; only they can read the profile back
+    user_id: Optional[int] = None
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def n_plus_one(self, threshold: Optional[int] = None) -> list[dict]:
+        """Shapes repeated at least `threshold` times, most repeated first."""
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        counts = Counter(statement.shape for statement in self.statements)
+        return [
+            {
+                "shape": shape,
+                "count": count,
+                "call_sites": sorted({s.call_site for s in self.statements if s.shape == shape and s.call_site}),
+            }
+            for shape, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "statements": len(self.statements),
+            "total_ms": round(self.seconds * 1000, 3),
+            "n_plus_one": self.n_plus_one(),
+            "queries": [
+                {"sql": statement.sql, "ms": round(statement.seconds * 1000, 3), "call_site": statement.call_site}
+                for statement in self.statements
+            ],
+        }
+
+    def report(self) -> str:
+        lines = [f"{len(self.statements)} statements, {self.seconds * 1000:.1f} ms"]
+        for i, statement in enumerate(self.statements, 1):
+            lines.append(f"  {i}. [{statement.call_site or '?'}] {statement.shape[:200]}")
+        for pattern in self.n_plus_one():
+            lines.append(f"  N+1: {pattern['count']}x {pattern['shape'][:200]} from {', '.join(pattern['call_sites'])}")
+        return "\n".join(lines)
+
+    def assert_at_most(self, budget: int):
+        assert len(self.statements) <= budget, f"query budget of {budget} exceeded: {self.report()}"
+
+    def assert_no_n_plus_one(self, threshold: Optional[int] = None):
+        assert not self.n_plus_one(threshold), f"N+1 query pattern: {self.report()}"
+
+
+_request_profile: ContextVar[Optional[Profile]] = ContextVar("request_profile", default=None)
+_captures: list[Profile] = []
+_lock = threading.Lock()
+_installed = False
+history: deque[Profile] = deque(maxlen=PROFILE_HISTORY)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    request_profile = _request_profile.get()
+    started = getattr(context, "profile_started", None)
+    if started is None or (request_profile is None and not _captures):
+        return
+    record = Statement(statement, time.perf_counter() - started, call_site())
+    if request_profile is not None:
+        request_profile.statements.append(record)
+    for profile in list(_captures):
+        profile.statements.append(record)
+
+
+def enable():
+    """Attach the statement listeners to every engine, present and future."""
+    global _installed
+    with _lock:
+        if _installed:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+@contextmanager
+def capture(label: str = ""):
+    enable()
+    profile = Profile(label)
+    with _lock:
+        _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        with _lock:
+            _captures.remove(profile)
+
+
+def attribute(user_id: int):
+    """Mark the current request's profile, if any, as belonging to `user_id`."""
+    profile = _request_profile.get()
+    if profile is not None:
+        profile.user_id = user_id
+
+
+def profiles_of(user_id: int) -> list[Profile]:
+    """`user_id`'s recent request profiles, newest first."""
+    return [profile for profile in reversed(history) if profile.user_id == user_id]
+
+
+def get_profile(profile_id: int, user_id: int) -> Optional[Profile]:
+    return next((profile for profile in history if profile.id == profile_id and profile.user_id == user_id), None)
+
+
+class SQLProfilerMiddleware:
+    """Profiles each HTTP request while PROFILE_SQL is on; otherwise passes straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_SQL or scope["path"].startswith("/api/debug/"):
+            await self.app(scope, receive, send)
+            return
+
+        enable()
+        profile = Profile(f"{scope['method']} {scope['path']}")
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-sql-queries", str(len(profile.statements)).encode()),
+                    (b"x-sql-time-ms", f"{profile.seconds * 1000:.3f}".encode()),
+                    (b"x-sql-n-plus-one", str(len(profile.n_plus_one())).encode()),
+                    (b"x-sql-profile", str(profile.id).encode()),
+                ]
+            await send(message)
+
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _request_profile.reset(token)
+            history.append(profile)
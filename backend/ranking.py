@@ -0,0 +1,156 @@
+"""Fractional rank keys for ordering cards.
+
+A rank is a base-62 string compared lexicographically, so a new key can always
+be generated strictly between two existing keys and inserting or moving a card
+only writes that card's row.
+
+Keys are an integer part followed by an optional fractional part. The first
+character of the integer part encodes its length ("a" = 2 chars, "b" = 3, ...;
+"Z" = 2, "Y" = 3, ... for the negative side), so appending to or prepending to
+a column increments/decrements the integer and grows the key logarithmically.
+Only inserts squeezed between two neighbours extend the fractional part.
+"""
+from typing import Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+INTEGER_ZERO = "a0"
+SMALLEST_INTEGER = "A" + DIGITS[0] * 26
+
+# Keys longer than this get their column rebalanced in the background
+MAX_RANK_LENGTH = 16
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Invalid rank head: {head!r}")
+
+
+def _split(key: str) -> tuple[str, str]:
+    if not key or key == SMALLEST_INTEGER:
+        raise ValueError(f"Invalid rank key: {key!r}")
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"Invalid rank key: {key!r}")
+    integer, fraction = key[:length], key[length:]
+    if fraction.endswith(DIGITS[0]):
+        raise ValueError(f"Invalid rank key: {key!r}")
+    return integer, fraction
+
+
+def _increment_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) + 1
+        if d < BASE:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = DIGITS[0]
+    if head == "Z":
+        return INTEGER_ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) - 1
+        if d >= 0:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    # Fractional parts only: a is "" for "no lower bound", b is None for "no upper bound"
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """Return a key sorting strictly after `before` and strictly before `after`."""
+    if before is None and after is None:
+        return INTEGER_ZERO
+    if before is None:
+        integer, fraction = _split(after)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if fraction:
+            return integer
+        decremented = _decrement_integer(integer)
+        if decremented is None:
+            raise ValueError("Cannot rank before the smallest key")
+        return decremented
+    if after is None:
+        integer, fraction = _split(before)
+        incremented = _increment_integer(integer)
+        return integer + _midpoint(fraction, None) if incremented is None else incremented
+
+    if before >= after:
+        raise ValueError(f"{before!r} must sort before {after!r}")
+    integer_a, fraction_a = _split(before)
+    integer_b, fraction_b = _split(after)
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    incremented = _increment_integer(integer_a)
+    if incremented is not None and incremented < after:
+        return incremented
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def ranks_between(before: Optional[str], after: Optional[str], n: int) -> list[str]:
+    """Return `n` increasing keys between `before` and `after`, keeping them short."""
+    if n <= 0:
+        return []
+    if n == 1:
+        return [rank_between(before, after)]
+    if after is None:
+        keys = [rank_between(before, None)]
+        while len(keys) < n:
+            keys.append(rank_between(keys[-1], None))
+        return keys
+    if before is None:
+        keys = [rank_between(None, after)]
+        while len(keys) < n:
+            keys.append(rank_between(None, keys[-1]))
+        return keys[::-1]
+    mid = rank_between(before, after)
+    half = n // 2
+    return ranks_between(before, mid, half) + [mid] + ranks_between(mid, after, n - half - 1)
+
+
+def needs_rebalance(rank: str) -> bool:
+    return len(rank) > MAX_RANK_LENGTH
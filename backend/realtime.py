@@ -0,0 +1,234 @@
+"""Real-time board updates over WebSocket.
+
+Subscribers receive each committed change as a small JSON patch event in the
+same shape as the change feed entries (`/api/boards/{id}/changes`). Their
+`seq` is a valid `since` cursor for catching up after a reconnect.
+
+`hub` fans events out to this worker's subscribers, each through a bounded
+queue. A subscriber that falls REALTIME_QUEUE_SIZE events behind is evicted:
+its socket is closed with 1013 and the client resumes from the change feed.
+
+A Broker carries committed changes from whichever session wrote them to the
+hubs. InProcessBroker serves a single worker. ChangeLogBroker tails
+`board_changes` so several uvicorn workers sharing one database see each
+other's writes; it stands in for an external pub/sub.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import WebSocket, status
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+import crud, models
+
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "memory")
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+REALTIME_POLL_INTERVAL = float(os.getenv("REALTIME_POLL_INTERVAL", "0.2"))
+
+logger = logging.getLogger(__name__)
+
+
+def encode(change: dict) -> str:
+    return json.dumps({"type": "change", **change})
+
+
+class Subscription:
+    def __init__(self, board_id: int, maxsize: int):
+        self.board_id = board_id
+        self.evicted = False
+        self._queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    async def get(self) -> Optional[str]:
+        """Next encoded event, or None once the subscription is closed."""
+        return await self._queue.get()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Pending events are dropped; the wake-up sentinel must fit
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class Hub:
+    """Per-board fan-out to this worker's subscribers. Methods run on the event loop."""
+
+    def __init__(self, queue_size: int = REALTIME_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.delivered = 0
+        self.evicted = 0
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, board_id: int) -> Subscription:
+        subscription = Subscription(board_id, self.queue_size)
+        self._subscribers[board_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.board_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.board_id]
+        subscription.close()
+
+    def boards(self) -> set:
+        return set(self._subscribers)
+
+    def dispatch(self, board_id: int, message: str):
+        for subscription in list(self._subscribers.get(board_id, ())):
+            try:
+                subscription._queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Slow consumer: drop it rather than buffer without bound or stall the others
+                subscription.evicted = True
+                self.evicted += 1
+                self.unsubscribe(subscription)
+
+    def stats(self):
+        return {
+            "boards": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+
+class Broker:
+    """Delivers committed changes to `hub.dispatch` on the serving event loop."""
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+        self.loop = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self.loop = None
+
+    def publish(self, changes: list[dict]):
+        """Called after commit from whichever thread committed; must not block."""
+
+
+class InProcessBroker(Broker):
+    def publish(self, changes):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        for change in changes:
+            loop.call_soon_threadsafe(self.hub.dispatch, change["board_id"], encode(change))
+
+
+class ChangeLogBroker(Broker):
+    """Polls `board_changes` for new seqs; every worker sees every worker's commits."""
+
+    def __init__(self, hub: Hub, session_factory=None, interval: float = REALTIME_POLL_INTERVAL):
+        super().__init__(hub)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.last_seq = 0
+        self._task = None
+
+    async def start(self):
+        await super().start()
+        if self.session_factory is None:
+            from database import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        async with self.session_factory() as db:
+            self.last_seq = await db.scalar(select(func.max(models.BoardChange.seq))) or 0
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await super().stop()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Polling board_changes failed")
+
+    async def poll_once(self):
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(models.BoardChange.seq, models.BoardChange.board_id, models.BoardChange.entity,
+                       models.BoardChange.entity_id, models.BoardChange.op, models.BoardChange.payload)
+                .where(models.BoardChange.seq > self.last_seq)
+                .order_by(models.BoardChange.seq)
+                .limit(1000)
+            )).all()
+        if not rows:
+            return
+        self.last_seq = rows[-1].seq
+        boards = self.hub.boards()
+        for row in rows:
+            if row.board_id in boards:
+                change = row._asdict()
+                change["payload"] = None if row.payload is None else json.loads(row.payload)
+                self.hub.dispatch(row.board_id, encode(change))
+
+
+def create_broker(kind: str, hub: Hub) -> Broker:
+    if kind == "memory":
+        return InProcessBroker(hub)
+    if kind == "changelog":
+        return ChangeLogBroker(hub)
+    raise ValueError(f"Unknown REALTIME_BROKER: {kind}")
+
+
+hub = Hub()
+broker = create_broker(REALTIME_BROKER, hub)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_committed_changes(session):
+    changes = session.info.pop(crud.PENDING_CHANGES, None)
+    if changes:
+        broker.publish(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_changes(session):
+    session.info.pop(crud.PENDING_CHANGES, None)
+
+
+async def serve(websocket: WebSocket, board_id: int):
+    """Accept the socket and stream a board's events until it disconnects or is evicted."""
+    # Subscribe first so nothing committed after the handshake completes is missed
+    subscription = hub.subscribe(board_id)
+    try:
+        await websocket.accept()
+    except BaseException:
+        hub.unsubscribe(subscription)
+        raise
+
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while (message := await subscription.get()) is not None:
+            await websocket.send_text(message)
+        if subscription.evicted:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too far behind; resume from the change feed")
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(subscription)
@@ -1,16 +1,21 @@
 from typing import Optional
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Json
+from typing import Any, List, Optional
 
 class CardBase(BaseModel):
     title: str
     description: Optional[str] = None
     order: Optional[int] = 0
 
-class CardCreate(CardBase):
+class CardPlacement(BaseModel):
+    # Place the card between two neighbours in the target column instead of at an absolute index
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+
+class CardCreate(CardBase, CardPlacement):
     column_id: int
 
-class CardUpdate(BaseModel):
+class CardUpdate(CardPlacement):
     title: Optional[str] = None
     description: Optional[str] = None
     order: Optional[int] = None
@@ -19,8 +24,27 @@ class CardUpdate(BaseModel):
 class Card(CardBase):
     id: int
     column_id: int
+    rank: str
     model_config = ConfigDict(from_attributes=True)
 
+class CardSearchHit(BaseModel):
+    # Highlights are HTML-escaped text with matches wrapped in <mark>
+    id: int
+    column_id: int
+    title: str
+    description: Optional[str] = None
+    title_highlight: str
+    description_snippet: Optional[str] = None
+    score: float
+
+class CardMove(BaseModel):
+    card_id: int
+    column_id: int
+    order: int
+
+class CardMoveBatch(BaseModel):
+    moves: List[CardMove]
+
 class ColumnBase(BaseModel):
     title: str
     order: Optional[int] = 0
@@ -38,6 +62,19 @@ class Column(ColumnBase):
     cards: List[Card] = []
     model_config = ConfigDict(from_attributes=True)
 
+class ColumnSummary(ColumnBase):
+    id: int
+    board_id: int
+    card_count: int
+    cards: List[Card] = []
+
+class CardPage(BaseModel):
+    # Pass next_after / next_after_id as after / after_id for the following page
+    cards: List[Card]
+    has_more: bool
+    next_after: Optional[str] = None
+    next_after_id: Optional[int] = None
+
 class BoardBase(BaseModel):
     title: str
 
@@ -47,9 +84,31 @@ class BoardCreate(BoardBase):
 class Board(BoardBase):
     id: int
     user_id: int
+    version: int = 1
     columns: List[Column] = []
     model_config = ConfigDict(from_attributes=True)
 
+class BoardSummary(BoardBase):
+    id: int
+    user_id: int
+    version: int = 1
+    columns: List[ColumnSummary] = []
+
+class BoardChange(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    op: str
+    payload: Optional[Json[Any]] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class BoardChangeFeed(BaseModel):
+    # Pass `cursor` as `since` on the next request; `resync` means reload the whole board first
+    cursor: int
+    resync: bool = False
+    has_more: bool = False
+    changes: List[BoardChange] = []
+
 class UserBase(BaseModel):
     username: str
 
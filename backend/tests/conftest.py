@@ -1,32 +1,54 @@
+import asyncio
+import json
 import pytest
-from sqlalchemy import create_engine
+import httpx
+from contextlib import contextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from openai import AsyncOpenAI
+from sqlalchemy import event, insert, text
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Minimum bcrypt cost keeps the auth-heavy tests fast
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
 
-from database import get_db
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+from database import create_async_db_engine, create_db_engine, get_async_db, get_db
 from models import Base
 from main import app
+from schemas import BoardCreate, UserCreate
+import crud
+import migrations
+import models
+import ranking
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: TestClient runs each test's app on its own event loop, so async
+# connections must not be pooled across tests
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db():
-    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
     db_session = TestingSessionLocal()
     try:
         yield db_session
     finally:
         db_session.close()
         Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+            conn.execute(text("DROP TABLE IF EXISTS cards_fts"))
 
 @pytest.fixture(scope="function")
 def client(db):
@@ -35,7 +57,149 @@ def client(db):
             yield db
         finally:
             pass
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+@pytest.fixture
+def login(client):
+    """`login(username, password="password")` logs a user in on `client`, registering them if needed.
+
+    Sets the client's Authorization header and returns the login response body
+    (`access_token`, `user_id`).
+    """
+    def login(username, password="password"):
+        client.post("/api/auth/register", json={"username": username, "password": password})
+        response = client.post("/api/auth/login", json={"username": username, "password": password})
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return response.json()
+    return login
+
+@pytest.fixture
+def user_board(client):
+    """`user_board(user_id)` is the user's first board as the API returns it."""
+    def user_board(user_id):
+        return client.get(f"/api/users/{user_id}/boards").json()[0]
+    return user_board
+
+@contextmanager
+def _count_queries(engine):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries(engine) as statements:` collects the SQL of every statement run inside the block."""
+    return _count_queries
+
+@pytest.fixture
+def seed_large_board(db):
+    """`seed_large_board(username, columns=50, cards_per_column=100)` bulk-inserts a user (password "pw") and a
+    board of that size, and returns the user."""
+    def seed(username, columns=50, cards_per_column=100):
+        user = crud.create_user(db, UserCreate(username=username, password="pw"))
+        board = crud.create_board(db, BoardCreate(title="Big Board", user_id=user.id))
+        db.execute(insert(models.Column), [
+            {"title": f"Col {i}", "order": i, "board_id": board.id} for i in range(columns)
+        ])
+        column_ids = [c.id for c in db.query(models.Column).filter(models.Column.board_id == board.id)]
+        ranks = ranking.ranks_between(None, None, cards_per_column)
+        db.execute(insert(models.Card), [
+            {"title": f"Card {column_id}-{i}", "description": "details", "order": i, "rank": ranks[i], "column_id": column_id}
+            for column_id in column_ids
+            for i in range(cards_per_column)
+        ])
+        db.commit()
+        return user
+    return seed
+
+class FakeOpenAI:
+    """In-process OpenAI-compatible chat completions server.
+
+    `reply` is the structured JSON the model "returns"; streamed requests get
+    it as content deltas of `chunk_size` characters. A non-200 `status_code`
+    makes every request fail with that status; `delay` holds each response back.
+    `usage` is reported on every reply (as a final chunk when streamed with include_usage).
+    """
+    def __init__(self):
+        self.reply = {"response_message": "Done.", "operations": []}
+        self.chunk_size = 8
+        self.status_code = 200
+        self.delay = 0
+        self.usage = {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}
+        self.requests = []
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.completions)
+
+    def _chunk(self, model, delta, finish_reason=None):
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        self.requests.append(body)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.status_code != 200:
+            return JSONResponse(status_code=self.status_code, content={"error": {"message": "upstream failure", "type": "server_error"}})
+        content = json.dumps(self.reply)
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": self.usage,
+            }
+
+        async def chunks():
+            yield f"data: {json.dumps(self._chunk(body['model'], {'role': 'assistant', 'content': ''}))}\n\n"
+            for i in range(0, len(content), self.chunk_size):
+                yield f"data: {json.dumps(self._chunk(body['model'], {'content': content[i:i + self.chunk_size]}))}\n\n"
+            yield f"data: {json.dumps(self._chunk(body['model'], {}, 'stop'))}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**self._chunk(body['model'], {}), 'choices': [], 'usage': self.usage})}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    def client(self):
+        return AsyncOpenAI(
+            api_key="test", base_url="http://fake-openai/v1", max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app)),
+        )
+
+@pytest.fixture
+def sql_profiler():
+    """`with sql_profiler() as profile:` records every statement run inside the block.
+
+    Assert budgets with profile.assert_at_most(n) and profile.assert_no_n_plus_one();
+    failures list each statement with its call site.
+    """
+    import profiling
+    return profiling.capture
+
+@pytest.fixture(autouse=True)
+def empty_ai_cache():
+    import ai_service
+    ai_service.response_cache.clear()
+    yield
+    ai_service.response_cache.clear()
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    import ai_service
+    from ai_providers import OpenAIProvider
+    server = FakeOpenAI()
+    monkeypatch.setattr(ai_service, "provider", OpenAIProvider(client=server.client()))
+    return server
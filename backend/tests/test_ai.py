@@ -57,3 +57,39 @@ async def test_ai_chat_endpoint(client, db):
         assert board_data["columns"][0]["cards"][0]["title"] == "New Task via AI"
         
         mock_process.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_ai_chat_rejects_operations_on_foreign_cards(client, db):
+    from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+    from ai_service import AIResponse, BoardOperation
+    import crud
+
+    user = crud.create_user(db, UserCreate(username="aiowner", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Mine", user_id=user.id))
+    crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    other = crud.create_user(db, UserCreate(username="aiother", password="pw"))
+    other_board = crud.create_board(db, BoardCreate(title="Theirs", user_id=other.id))
+    other_col = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=other_board.id))
+    foreign = crud.create_card(db, CardCreate(title="Not yours", column_id=other_col.id))
+
+    mock_ai_response = AIResponse(
+        response_message="Done.",
+        operations=[
+            BoardOperation(action="add_card", title="Added", column_name="To Do"),
+            BoardOperation(action="delete_card", card_id=foreign.id),
+        ]
+    )
+    with patch('main.process_chat', new_callable=AsyncMock) as mock_process:
+        mock_process.return_value = mock_ai_response
+        login_response = client.post("/api/auth/login", json={"username": "aiowner", "password": "pw"})
+        client.headers["Authorization"] = f"Bearer {login_response.json()['access_token']}"
+
+        response = client.post("/api/ai/chat", json={"message": "Clean up", "user_id": user.id})
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["errors"] == [f"operation 1: card {foreign.id} not found"]
+    # Nothing from the batch was applied
+    cards = client.get(f"/api/users/{user.id}/boards").json()[0]["columns"][0]["cards"]
+    assert cards == []
+    db.expire_all()
+    assert crud.get_card_with_owner(db, foreign.id) is not None
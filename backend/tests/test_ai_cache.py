@@ -0,0 +1,180 @@
+import asyncio
+import pytest
+import sys
+import os
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import httpx
+from ai_cache import MemoryBackend, ResponseCache, SQLiteBackend
+from main import app
+from schemas import CardCreate
+import ai_service
+import crud
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+@pytest.mark.parametrize("make_backend", [
+    lambda tmp_path, clock: MemoryBackend(max_entries=2, clock=clock),
+    lambda tmp_path, clock: SQLiteBackend(str(tmp_path / "cache.db"), max_entries=2, clock=clock),
+])
+def test_backends_expire_and_evict_least_recently_used(tmp_path, make_backend):
+    clock = Clock()
+    backend = make_backend(tmp_path, clock)
+    backend.set("a", "1", ttl=10)
+    clock.now += 1
+    backend.set("b", "2", ttl=10)
+    clock.now += 1
+    assert backend.get("a") == "1"  # now more recently used than "b"
+    clock.now += 1
+    backend.set("c", "3", ttl=10)
+    assert backend.get("b") is None
+    assert (backend.get("a"), backend.get("c")) == ("1", "3")
+    clock.now += 10
+    assert backend.get("c") is None
+    assert backend.get("missing") is None
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SQLiteBackend(path)
+    first.set("key", '{"answer": 4}', ttl=60)
+    first.close()
+    assert SQLiteBackend(path).get("key") == '{"answer": 4}'
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_computation():
+    cache = ResponseCache(MemoryBackend())
+    calls = []
+    release = asyncio.Event()
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ["value"] * 5
+    assert await cache.get_or_compute("k", compute) == "value"
+    assert len(calls) == 1
+    assert cache.stats() | {"backend": None} == {
+        "backend": None, "entries": 1, "in_flight": 0, "hits": 1, "misses": 1, "coalesced": 4, "errors": 0,
+    }
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_is_called_off_the_event_loop(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.db"))
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(backend, name)
+        def traced(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+        setattr(backend, name, traced)
+    cache = ResponseCache(backend)
+
+    async def compute():
+        return "value"
+
+    assert await cache.get_or_compute("k", compute) == "value"
+    assert await cache.get_or_compute("k", compute) == "value"
+    assert len(threads) == 3 and threading.get_ident() not in threads
+    backend.close()
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_but_not_cached():
+    cache = ResponseCache(MemoryBackend())
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "recovered"
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert await cache.get_or_compute("k", compute) == "recovered"
+    assert len(attempts) == 2
+
+@pytest.mark.asyncio
+async def test_lookup_counts_hits_misses_and_joins_in_flight_calls():
+    cache = ResponseCache(MemoryBackend())
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return "value"
+
+    assert await cache.lookup("other") is None
+    computing = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    joined = asyncio.create_task(cache.lookup("k"))
+    await asyncio.sleep(0)
+    release.set()
+    assert (await computing, await joined) == ("value", "value")
+    await cache.store("other", "stored")
+    assert await cache.lookup("other") == "stored"
+    assert {k: cache.stats()[k] for k in ("hits", "misses", "coalesced")} == {"hits": 1, "misses": 2, "coalesced": 1}
+
+def test_ai_test_endpoint_is_served_from_cache(client, fake_openai):
+    fake_openai.reply = "4"
+    assert [client.get("/api/ai/test").json()["response"] for _ in range(3)] == ['"4"'] * 3
+    assert len(fake_openai.requests) == 1
+
+@pytest.mark.asyncio
+async def test_double_submitted_chat_costs_one_call_and_applies_once(client, fake_openai):
+    client.post("/api/auth/register", json={"username": "doubleclick", "password": "password"})
+    login = client.post("/api/auth/login", json={"username": "doubleclick", "password": "password"}).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    fake_openai.reply = {
+        "response_message": "Added it.",
+        "operations": [{"action": "add_card", "title": "Once", "description": None, "column_name": "To Do", "card_id": None}],
+    }
+    fake_openai.delay = 0.05
+    body = {"message": "add a card called Once", "user_id": login["user_id"]}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers) as ac:
+        responses = await asyncio.gather(ac.post("/api/ai/chat", json=body), ac.post("/api/ai/chat", json=body))
+
+        # Both get the reply, applied once
+        assert [r.status_code for r in responses] == [200, 200]
+        assert len(fake_openai.requests) == 1
+        for response in responses:
+            assert [c["title"] for col in response.json()["board"]["columns"] for c in col["cards"]] == ["Once"]
+        board = (await ac.get(f"/api/users/{login['user_id']}/boards")).json()[0]
+        assert [c["title"] for col in board["columns"] for c in col["cards"]] == ["Once"]
+
+        # The board has moved on, so the same message is a new question
+        assert (await ac.post("/api/ai/chat", json=body)).status_code == 200
+        assert len(fake_openai.requests) == 2
+
+def test_a_fresh_reply_at_the_same_board_version_is_applied(client, db, fake_openai):
+    client.post("/api/auth/register", json={"username": "expired", "password": "password"})
+    login = client.post("/api/auth/login", json={"username": "expired", "password": "password"}).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    [board] = crud.get_board_snapshots(db, login["user_id"])
+    card = crud.create_card(db, CardCreate(title="Keep", column_id=board.columns[0].id))
+    body = {"message": "tidy up", "user_id": login["user_id"]}
+
+    # Changes nothing, so the board version stays put
+    fake_openai.reply = {"response_message": "Nothing to do.", "operations": [
+        {"action": "update_card", "title": None, "description": None, "column_name": None, "card_id": card.id},
+    ]}
+    assert client.post("/api/ai/chat", json=body, headers=headers).status_code == 200
+
+    # The cached reply expired and the model answers differently this time
+    ai_service.response_cache.clear()
+    fake_openai.reply = {"response_message": "Added Later.", "operations": [
+        {"action": "add_card", "title": "Later", "description": None, "column_name": "To Do", "card_id": None},
+    ]}
+    response = client.post("/api/ai/chat", json=body, headers=headers)
+    assert response.status_code == 200
+    assert len(fake_openai.requests) == 2
+    assert [c["title"] for col in response.json()["board"]["columns"] for c in col["cards"]] == ["Keep", "Later"]
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ai_gateway
+from ai_gateway import AIGateway, AIOverloaded, AIRateLimited, AITimeout, AIUnavailable, CircuitBreaker
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class UpstreamError(Exception):
+    def __init__(self, status_code=None):
+        self.status_code = status_code
+
+async def _fail(gateway, status_code=None):
+    with pytest.raises(UpstreamError):
+        async with gateway.slot():
+            raise UpstreamError(status_code)
+
+@pytest.mark.asyncio
+async def test_per_user_limit_and_bounded_queue():
+    gateway = AIGateway(max_concurrency=1, max_per_user=1, max_queue=1)
+    release = asyncio.Event()
+
+    async def call(user_id):
+        async with gateway.slot(user_id):
+            await release.wait()
+
+    first = asyncio.create_task(call(1))
+    await asyncio.sleep(0)
+    with pytest.raises(AIRateLimited):
+        await call(1)
+    waiting = asyncio.create_task(call(2))
+    await asyncio.sleep(0)
+    assert gateway.stats()["in_flight"] == 1 and gateway.stats()["queued"] == 1
+    with pytest.raises(AIOverloaded):
+        await call(3)
+
+    release.set()
+    await asyncio.gather(first, waiting)
+    stats = gateway.stats()
+    assert stats["calls"] == 2 and stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["rejected"] == {"per_user": 1, "queue_full": 1}
+
+@pytest.mark.asyncio
+async def test_deadline_covers_the_upstream_call():
+    gateway = AIGateway(timeout=0.01)
+    with pytest.raises(AITimeout):
+        async with gateway.slot(1):
+            await asyncio.sleep(1)
+    stats = gateway.stats()
+    assert stats["rejected"] == {"timeout": 1}
+    assert stats["consecutive_failures"] == 1
+    assert stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_breaker_opens_then_admits_one_trial_call():
+    clock = Clock()
+    gateway = AIGateway(breaker=CircuitBreaker(threshold=3, cooldown=10, clock=clock), clock=clock)
+    await _fail(gateway, status_code=400)  # the request's fault; does not count
+    for _ in range(3):
+        await _fail(gateway, status_code=502)
+    assert gateway.breaker.state == "open"
+    with pytest.raises(AIUnavailable) as excinfo:
+        async with gateway.slot():
+            pass
+    assert excinfo.value.retry_after == 10
+
+    clock.now = 10
+    assert gateway.breaker.state == "half_open"
+    await _fail(gateway)  # the trial fails: open for another cooldown
+    assert gateway.breaker.state == "open"
+    assert gateway.stats()["circuit_trips"] == 2
+
+    clock.now = 20
+    release = asyncio.Event()
+    async def trial():
+        async with gateway.slot():
+            await release.wait()
+    task = asyncio.create_task(trial())
+    await asyncio.sleep(0)
+    with pytest.raises(AIUnavailable):  # only one trial at a time
+        async with gateway.slot():
+            pass
+    release.set()
+    await task
+    assert gateway.breaker.state == "closed"
+    assert gateway.stats()["rejected"]["circuit_open"] == 2
+
+@pytest.mark.asyncio
+async def test_chat_endpoint_maps_gateway_errors_to_status_codes(client, db, monkeypatch, fake_openai):
+    from schemas import UserCreate, BoardCreate, ColumnCreate
+    import crud
+
+    user = crud.create_user(db, UserCreate(username="gated", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    login_response = client.post("/api/auth/login", json={"username": "gated", "password": "pw"})
+    client.headers["Authorization"] = f"Bearer {login_response.json()['access_token']}"
+
+    clock = Clock()
+    gateway = AIGateway(breaker=CircuitBreaker(threshold=1, cooldown=30, clock=clock), clock=clock)
+    monkeypatch.setattr(ai_gateway, "gateway", gateway)
+    fake_openai.status_code = 503
+    response = client.post("/api/ai/chat", json={"message": "hi", "user_id": user.id})
+    assert response.status_code == 500
+    response = client.post("/api/ai/chat", json={"message": "hi", "user_id": user.id})
+    assert len(fake_openai.requests) == 1
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    response = client.post("/api/ai/chat/stream", json={"message": "hi", "user_id": user.id})
+    assert response.status_code == 503
+    assert client.get("/api/ai/gateway").json()["circuit"] == "open"
@@ -0,0 +1,158 @@
+import json
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event, func, select
+from ai_service import BoardOperation
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+import crud
+import schemas
+import models
+
+def _board(db, username, cards=3):
+    user = crud.create_user(db, UserCreate(username=username, password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    todo = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    done = crud.create_column(db, ColumnCreate(title="Done", order=1, board_id=board.id))
+    card_ids = [crud.create_card(db, CardCreate(title=f"Card {i}", column_id=todo.id)).id for i in range(cards)]
+    return board, todo, done, card_ids
+
+def _titles(boards):
+    return {column.title: [card.title for card in column.cards] for column in boards[0].columns}
+
+def test_batch_is_applied_in_one_commit(db):
+    board, todo, done, card_ids = _board(db, "batch")
+    version = board.version
+    operations = [BoardOperation(action="add_card", title=f"New {i}", column_name="done") for i in range(30)]
+    operations += [
+        BoardOperation(action="update_card", card_id=card_ids[0], title="Renamed"),
+        BoardOperation(action="delete_card", card_id=card_ids[1]),
+        BoardOperation(action="add_card", title="Fallback", column_name="No such column"),
+    ]
+
+    commits = []
+    def on_commit(conn):
+        commits.append(conn)
+    event.listen(db.get_bind(), "commit", on_commit)
+    try:
+        boards = crud.apply_board_operations(db, board, operations)
+    finally:
+        event.remove(db.get_bind(), "commit", on_commit)
+
+    assert len(commits) == 1
+    titles = _titles(boards)
+    assert titles["To Do"] == ["Renamed", "Card 2", "Fallback"]
+    assert titles["Done"] == [f"New {i}" for i in range(30)]
+    ranks = [card.rank for card in boards[0].columns[1].cards]
+    assert ranks == sorted(ranks)
+    assert boards[0].version == version + 1
+
+    feed = crud.get_board_changes(db, boards[0], since=0, limit=1000)
+    ops = [(c.op, c.entity_id) for c in feed["changes"]][-33:]
+    assert ops[-2:] == [("update", card_ids[0]), ("delete", card_ids[1])]
+    assert sum(op == "create" for op, _ in ops) == 31
+
+@pytest.mark.parametrize("operation", [
+    BoardOperation(action="delete_card", card_id=999999),
+    BoardOperation(action="update_card", title="x"),
+    BoardOperation(action="archive_card", card_id=1),
+])
+def test_invalid_operation_rejects_whole_batch(db, operation):
+    board, todo, done, card_ids = _board(db, "reject")
+    operations = [
+        BoardOperation(action="add_card", title="Never added", column_name="To Do"),
+        BoardOperation(action="delete_card", card_id=card_ids[0]),
+        operation,
+    ]
+
+    with pytest.raises(crud.InvalidOperations) as excinfo:
+        crud.apply_board_operations(db, board, operations)
+
+    assert len(excinfo.value.errors) == 1
+    assert excinfo.value.errors[0].startswith("operation 2:")
+    db.rollback()
+    assert db.scalar(select(func.count(models.Card.id))) == 3
+    assert db.get(models.Board, board.id).version == board.version
+
+def test_cards_of_other_users_cannot_be_targeted(db):
+    board, _, _, _ = _board(db, "attacker")
+    _, _, _, victim_cards = _board(db, "victim")
+
+    with pytest.raises(crud.InvalidOperations):
+        crud.apply_board_operations(db, board, [
+            BoardOperation(action="update_card", card_id=victim_cards[0], title="pwned"),
+        ])
+    db.rollback()
+    assert db.get(models.Card, victim_cards[0]).title == "Card 0"
+
+def test_card_cannot_be_used_after_delete_in_same_batch(db):
+    board, _, _, card_ids = _board(db, "twice")
+    with pytest.raises(crud.InvalidOperations):
+        crud.apply_board_operations(db, board, [
+            BoardOperation(action="delete_card", card_id=card_ids[0]),
+            BoardOperation(action="update_card", card_id=card_ids[0], title="Ghost"),
+        ])
+
+def test_unrelated_edits_since_the_snapshot_do_not_conflict(db):
+    board, todo, done, card_ids = _board(db, "busy")
+    since = crud.get_latest_change_seq(db, board.id)
+    # Meanwhile: a new card, another card renamed, and the target card moved
+    crud.create_card(db, CardCreate(title="Meanwhile", column_id=todo.id))
+    crud.update_card(db, db.get(models.Card, card_ids[1]), schemas.CardUpdate(title="Renamed by hand"))
+    crud.update_card(db, db.get(models.Card, card_ids[0]), schemas.CardUpdate(column_id=done.id))
+
+    boards = crud.apply_board_operations(db, board, [
+        BoardOperation(action="update_card", card_id=card_ids[0], title="From the reply"),
+    ], since_seq=since)
+    assert _titles(boards)["Done"] == ["From the reply"]
+
+def test_edits_to_cards_the_reply_touches_conflict(db):
+    board, _, _, card_ids = _board(db, "contested")
+    since = crud.get_latest_change_seq(db, board.id)
+    crud.update_card(db, db.get(models.Card, card_ids[0]), schemas.CardUpdate(description="Edited by hand"))
+    version = db.get(models.Board, board.id).version
+
+    with pytest.raises(crud.BoardVersionConflict) as excinfo:
+        crud.apply_board_operations(db, board, [
+            BoardOperation(action="add_card", title="Never added", column_name="To Do"),
+            BoardOperation(action="delete_card", card_id=card_ids[0]),
+        ], since_seq=since)
+    assert str(card_ids[0]) in str(excinfo.value)
+    assert db.get(models.Card, card_ids[0]).description == "Edited by hand"
+    assert db.get(models.Board, board.id).version == version
+
+    # Compacted history can no longer vouch for the card
+    db.get(models.Board, board.id).change_floor = crud.get_latest_change_seq(db, board.id)
+    db.commit()
+    with pytest.raises(crud.BoardVersionConflict):
+        crud.apply_board_operations(db, board, [
+            BoardOperation(action="update_card", card_id=card_ids[1], title="x"),
+        ], since_seq=since)
+
+def test_a_reply_is_applied_once(db):
+    board, _, _, _ = _board(db, "replayed", cards=0)
+    operations = [BoardOperation(action="add_card", title="Once", column_name="To Do")]
+    crud.apply_board_operations(db, board, operations, reply_id="reply-1")
+    boards = crud.apply_board_operations(db, board, operations, reply_id="reply-1")
+    assert _titles(boards)["To Do"] == ["Once"]
+    boards = crud.apply_board_operations(db, board, operations, reply_id="reply-2")
+    assert _titles(boards)["To Do"] == ["Once", "Once"]
+
+def test_added_cards_are_inserted_in_one_statement_with_ids_in_row_order(db, sql_profiler):
+    board, _, _, _ = _board(db, "bulk", cards=0)
+    operations = [BoardOperation(action="add_card", title=f"New {i}", column_name="To Do") for i in range(5)]
+
+    with sql_profiler() as profile:
+        boards = crud.apply_board_operations(db, board, operations)
+    inserts = [s.sql for s in profile.statements if s.sql.lstrip().upper().startswith("INSERT")]
+    assert len([sql for sql in inserts if "INTO cards" in sql]) == 1
+    assert len([sql for sql in inserts if "INTO board_changes" in sql]) == 1
+
+    cards = boards[0].columns[0].cards
+    assert [card.title for card in cards] == [f"New {i}" for i in range(5)]
+    assert [card.id for card in cards] == sorted(card.id for card in cards)
+    feed = crud.get_board_changes(db, boards[0], since=0, limit=1000)
+    created = [(c.entity_id, json.loads(c.payload)["title"]) for c in feed["changes"] if c.entity == "card"]
+    assert created == [(card.id, card.title) for card in cards]
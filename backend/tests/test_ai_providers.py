@@ -0,0 +1,74 @@
+import json
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ai_service
+from ai_providers import AIProvider, LocalProvider, rule_based_reply
+from board_context import build_board_context
+
+BOARD = build_board_context({
+    "board_title": "Work",
+    "columns": [
+        {"id": 1, "title": "To Do", "cards": [{"id": 11, "title": "Write docs", "description": None}]},
+        {"id": 2, "title": "Done", "cards": [{"id": 12, "title": "Ship it", "description": None}]},
+    ],
+}).text
+
+@pytest.mark.parametrize("message, operations", [
+    ('Add a card called "Fix login" to Done', [("add_card", "Fix login", "Done", None)]),
+    ("please create a new card named Release notes", [("add_card", "Release notes", "To Do", None)]),
+    ("add 3 cards in done", [("add_card", f"Card {i}", "Done", None) for i in (1, 2, 3)]),
+    ("delete #12 and card 11, also #99", [("delete_card", None, None, 12), ("delete_card", None, None, 11)]),
+    ('rename #11 to "Write better docs"', [("update_card", "Write better docs", None, 11)]),
+    ("how are things going?", []),
+])
+def test_rule_based_reply(message, operations):
+    reply = rule_based_reply(message, BOARD)
+    assert [(op["action"], op["title"], op["column_name"], op["card_id"]) for op in reply["operations"]] == operations
+    assert reply == rule_based_reply(message, BOARD)
+
+def test_incomplete_provider_fails_when_created():
+    class ChatOnly(AIProvider):
+        async def chat(self, user_message, board_context):
+            return None
+
+    with pytest.raises(TypeError, match="complete"):
+        ChatOnly()
+
+def test_latency_distribution_is_seeded_and_centred_on_the_median():
+    samples = [LocalProvider(latency_ms=200, sigma=0.5, seed=7).latency() for _ in range(2)]
+    assert samples[0] == samples[1]
+    provider = LocalProvider(latency_ms=200, sigma=0.5, seed=7)
+    many = sorted(provider.latency() for _ in range(2001))
+    assert 0.18 < many[1000] < 0.22
+    assert LocalProvider(latency_ms=50, sigma=0).latency() == 0.05
+
+@pytest.mark.asyncio
+async def test_streamed_reply_matches_the_whole_reply():
+    provider = LocalProvider(latency_ms=0, chars_per_second=0, chunk_size=5)
+    chunks = [chunk async for chunk in provider.stream_chat("delete #11", BOARD)]
+    assert len(chunks) > 1
+    whole = await provider.chat("delete #11", BOARD)
+    assert json.loads("".join(chunks)) == whole.model_dump()
+    assert await provider.complete("What is 2+2?") == "4"
+
+def test_chat_routes_run_offline_with_the_local_provider(client, monkeypatch):
+    provider = LocalProvider(latency_ms=0, chars_per_second=0)
+    monkeypatch.setattr(ai_service, "provider", provider)
+    client.post("/api/auth/register", json={"username": "offline", "password": "password"})
+    login = client.post("/api/auth/login", json={"username": "offline", "password": "password"}).json()
+    client.headers["Authorization"] = f"Bearer {login['access_token']}"
+
+    response = client.post("/api/ai/chat", json={"message": 'add a card called "Offline" to Done', "user_id": login["user_id"]})
+    assert response.status_code == 200
+    done = next(c for c in response.json()["board"]["columns"] if c["title"] == "Done")
+    assert [c["title"] for c in done["cards"]] == ["Offline"]
+
+    response = client.post("/api/ai/chat/stream", json={"message": f"delete #{done['cards'][0]['id']}", "user_id": login["user_id"]})
+    kinds = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert kinds[-2:] == ["event: board", "event: done"]
+    assert "event: operation" in kinds
+    assert provider.requests == 2
+    assert client.get("/api/ai/test").json()["response"] == "4"
@@ -0,0 +1,84 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_service import AIResponseParser
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_parser_emits_message_text_and_operations_incrementally():
+    document = json.dumps({
+        "response_message": 'Moved "A" → Done\n',
+        "operations": [
+            {"action": "add_card", "title": "Braces {in} [title]", "description": None, "column_name": "To Do", "card_id": None},
+            {"action": "delete_card", "title": None, "description": None, "column_name": None, "card_id": 7},
+        ],
+    })
+    parser = AIResponseParser()
+    events = []
+    for ch in document:
+        events += parser.feed(ch)
+
+    assert "".join(value for kind, value in events if kind == "message") == 'Moved "A" → Done\n'
+    operations = [value for kind, value in events if kind == "operation"]
+    assert [(op.action, op.title, op.card_id) for op in operations] == [
+        ("add_card", "Braces {in} [title]", None), ("delete_card", None, 7),
+    ]
+    # The first operation is reported before the document is complete
+    first = next(i for i, (kind, _) in enumerate(events) if kind == "operation")
+    assert first < len(events) - 1
+    assert parser.result().operations == operations
+
+def test_stream_endpoint_against_fake_openai(client, fake_openai, login, user_board):
+    board = user_board(login("stream_user")["user_id"])
+    doomed = client.post("/api/cards", json={"title": "Obsolete", "column_id": board["columns"][0]["id"]}).json()
+    fake_openai.reply = {
+        "response_message": "Added a card and removed the obsolete one.",
+        "operations": [
+            {"action": "add_card", "title": "Streamed", "description": "from the model", "column_name": "Done", "card_id": None},
+            {"action": "delete_card", "title": None, "description": None, "column_name": None, "card_id": doomed["id"]},
+        ],
+    }
+
+    response = client.post("/api/ai/chat/stream", json={"message": "tidy up", "user_id": board["user_id"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(response.text)
+    kinds = [kind for kind, _ in events]
+    assert kinds[-2:] == ["board", "done"]
+    assert kinds.count("message") > 1
+    assert "".join(data["delta"] for kind, data in events if kind == "message") == fake_openai.reply["response_message"]
+    assert [data["action"] for kind, data in events if kind == "operation"] == ["add_card", "delete_card"]
+
+    delta = events[-2][1]
+    assert [(c["entity"], c["op"]) for c in delta["changes"]] == [("card", "create"), ("card", "delete")]
+    assert delta["changes"][0]["payload"]["title"] == "Streamed"
+    assert events[-1][1]["response_message"] == fake_openai.reply["response_message"]
+
+    assert fake_openai.requests[0]["stream"] is True
+    assert fake_openai.requests[0]["response_format"]["type"] == "json_schema"
+
+def test_stream_reports_model_failure_in_band(client, fake_openai, login, user_board):
+    board = user_board(login("stream_user")["user_id"])
+    fake_openai.reply = {"response_message": "truncated"}  # missing operations: fails validation
+    response = client.post("/api/ai/chat/stream", json={"message": "hi", "user_id": board["user_id"]})
+    assert response.status_code == 200
+    kind, data = _events(response.text)[-1]
+    assert kind == "error" and data["detail"]
+
+def test_non_streaming_chat_against_fake_openai(client, fake_openai, login, user_board):
+    board = user_board(login("stream_user")["user_id"])
+    fake_openai.reply = {
+        "response_message": "Added.",
+        "operations": [{"action": "add_card", "title": "Plain", "description": None, "column_name": "To Do", "card_id": None}],
+    }
+    response = client.post("/api/ai/chat", json={"message": "add", "user_id": board["user_id"]})
+    assert response.status_code == 200
+    assert response.json()["board"]["columns"][0]["cards"][0]["title"] == "Plain"
@@ -74,3 +74,36 @@ def test_users_boards_columns_cards(client, db):
     # Verify Column gone
     response = client.patch(f"/api/columns/{col_id}", json={"title": "Should fail"})
     assert response.status_code == 404
+
+def test_move_cards_batch(client, db):
+    user = crud.create_user(db, UserCreate(username="mover", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    todo = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    done = crud.create_column(db, ColumnCreate(title="Done", order=1, board_id=board.id))
+    a = crud.create_card(db, CardCreate(title="A", order=0, column_id=todo.id))
+    b = crud.create_card(db, CardCreate(title="B", order=1, column_id=todo.id))
+    c = crud.create_card(db, CardCreate(title="C", order=0, column_id=done.id))
+
+    login_response = client.post("/api/auth/login", json={"username": "mover", "password": "pw"})
+    client.headers["Authorization"] = f"Bearer {login_response.json()['access_token']}"
+
+    # Drag A to the top of Done: B closes the gap, C shifts down
+    response = client.post(f"/api/boards/{board.id}/moves", json={"moves": [
+        {"card_id": b.id, "column_id": todo.id, "order": 0},
+        {"card_id": a.id, "column_id": done.id, "order": 0},
+        {"card_id": c.id, "column_id": done.id, "order": 1},
+    ]})
+    assert response.status_code == 200
+    columns = {col["id"]: [card["title"] for card in col["cards"]] for col in response.json()}
+    assert columns == {todo.id: ["B"], done.id: ["A", "C"]}
+
+    # Cards and columns from another user's board are rejected without applying anything
+    other = crud.create_user(db, UserCreate(username="other", password="pw"))
+    other_board = crud.create_board(db, BoardCreate(title="Other", user_id=other.id))
+    other_col = crud.create_column(db, ColumnCreate(title="Theirs", order=0, board_id=other_board.id))
+    response = client.post(f"/api/boards/{board.id}/moves", json={"moves": [
+        {"card_id": b.id, "column_id": other_col.id, "order": 0},
+    ]})
+    assert response.status_code == 404
+    response = client.post(f"/api/boards/{other_board.id}/moves", json={"moves": []})
+    assert response.status_code == 403
@@ -0,0 +1,29 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate, CardUpdate
+import async_crud
+from conftest import TestingAsyncSessionLocal
+
+@pytest.mark.asyncio
+async def test_async_crud_round_trip(db):
+    async with TestingAsyncSessionLocal() as session:
+        user = await async_crud.create_user(session, UserCreate(username="async", password="pw"))
+        assert await async_crud.authenticate_user(session, "async", "pw") is not None
+        assert await async_crud.authenticate_user(session, "async", "wrong") is None
+
+        board = await async_crud.create_board(session, BoardCreate(title="Async Board", user_id=user.id))
+        column = await async_crud.create_column(session, ColumnCreate(title="To Do", order=0, board_id=board.id))
+        first = await async_crud.create_card(session, CardCreate(title="first", column_id=column.id))
+        second = await async_crud.create_card(session, CardCreate(title="second", column_id=column.id))
+        await async_crud.update_card(session, second, CardUpdate(before_id=first.id))
+
+        row = await async_crud.get_card_with_owner(session, first.id)
+        assert row.user_id == user.id
+        await async_crud.delete_card(session, row.Card)
+
+        boards = await async_crud.get_board_snapshots(session, user.id)
+        # Collections are populated eagerly, so no lazy load happens outside the greenlet
+        assert [c.title for c in boards[0].columns[0].cards] == ["second"]
@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+import crud
+
+@pytest.fixture
+def boards(client, db):
+    owner = crud.create_user(db, UserCreate(username="owner", password="pw"))
+    intruder = crud.create_user(db, UserCreate(username="intruder", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Owner Board", user_id=owner.id))
+    column = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    card = crud.create_card(db, CardCreate(title="Secret", column_id=column.id))
+    intruder_board = crud.create_board(db, BoardCreate(title="Intruder Board", user_id=intruder.id))
+    intruder_column = crud.create_column(db, ColumnCreate(title="Mine", order=0, board_id=intruder_board.id))
+    return {"board": board.id, "column": column.id, "card": card.id, "intruder_column": intruder_column.id}
+
+def test_mutations_on_other_users_rows_are_forbidden(client, boards, login):
+    login("intruder", "pw")
+    requests = [
+        ("post", "/api/columns", {"title": "x", "order": 1, "board_id": boards["board"]}),
+        ("patch", f"/api/columns/{boards['column']}", {"title": "x"}),
+        ("delete", f"/api/columns/{boards['column']}", None),
+        ("post", "/api/cards", {"title": "x", "column_id": boards["column"]}),
+        ("patch", f"/api/cards/{boards['card']}", {"title": "x"}),
+        ("delete", f"/api/cards/{boards['card']}", None),
+        ("post", f"/api/boards/{boards['board']}/moves", {"moves": []}),
+    ]
+    for method, url, body in requests:
+        kwargs = {"json": body} if body is not None else {}
+        response = getattr(client, method)(url, **kwargs)
+        assert response.status_code == 403, (method, url)
+
+def test_missing_rows_are_not_found(client, boards, login):
+    login("owner", "pw")
+    assert client.patch("/api/columns/9999", json={"title": "x"}).status_code == 404
+    assert client.delete("/api/cards/9999").status_code == 404
+    assert client.post("/api/cards", json={"title": "x", "column_id": 9999}).status_code == 404
+
+def test_cannot_move_card_into_another_users_column(client, boards, login):
+    login("owner", "pw")
+    response = client.patch(f"/api/cards/{boards['card']}", json={"column_id": boards["intruder_column"]})
+    assert response.status_code == 403
+
+def test_ownership_check_is_a_single_query(client, db, boards, login):
+    login("owner", "pw")
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.delete(f"/api/cards/{boards['card']}")
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200
+    # One joined ownership lookup, the board version bump, the change log entry, then the DELETE itself
+    assert len(statements) == 4
+    assert "JOIN boards" in statements[0]
+    assert statements[1].startswith("UPDATE boards")
+    assert statements[2].startswith("INSERT INTO board_changes")
@@ -0,0 +1,85 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import crud
+
+def _changes(client, board_id, since, **params):
+    response = client.get(f"/api/boards/{board_id}/changes", params={"since": since, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def test_feed_returns_only_changes_after_cursor(client, login, user_board):
+    board = user_board(login("feed_user")["user_id"])
+    todo, doing = board["columns"][0]["id"], board["columns"][1]["id"]
+    cursor = _changes(client, board["id"], 0)["cursor"]
+
+    card = client.post("/api/cards", json={"title": "Draft", "column_id": todo}).json()
+    client.patch(f"/api/cards/{card['id']}", json={"title": "Final"})
+    client.patch(f"/api/cards/{card['id']}", json={"column_id": doing})
+    client.patch(f"/api/columns/{todo}", json={"title": "Backlog"})
+    client.delete(f"/api/cards/{card['id']}")
+
+    feed = _changes(client, board["id"], cursor)
+    assert not feed["resync"] and not feed["has_more"]
+    assert [(c["entity"], c["op"]) for c in feed["changes"]] == [
+        ("card", "create"), ("card", "update"), ("card", "update"), ("column", "update"), ("card", "delete"),
+    ]
+    create, rename, move, column, delete = feed["changes"]
+    assert create["payload"]["title"] == "Draft" and create["payload"]["column_id"] == todo
+    assert rename["payload"] == {"title": "Final"}
+    assert move["payload"]["column_id"] == doing and "rank" in move["payload"]
+    assert column["payload"] == {"title": "Backlog"}
+    assert delete["payload"] is None
+    assert feed["cursor"] == delete["seq"]
+
+    # Caught up: nothing new, cursor unchanged
+    assert _changes(client, board["id"], feed["cursor"]) == {"cursor": feed["cursor"], "resync": False, "has_more": False, "changes": []}
+
+def test_feed_pages_with_limit(client, login, user_board):
+    board = user_board(login("feed_user")["user_id"])
+    for i in range(5):
+        client.post("/api/cards", json={"title": f"Card {i}", "column_id": board["columns"][0]["id"]})
+
+    pages, cursor = [], 0
+    while not pages or pages[-1]["has_more"]:
+        pages.append(_changes(client, board["id"], cursor, limit=3))
+        cursor = pages[-1]["cursor"]
+    assert all(len(page["changes"]) <= 3 for page in pages) and len(pages) > 1
+    titles = [c["payload"]["title"] for page in pages for c in page["changes"] if c["entity"] == "card"]
+    assert titles == [f"Card {i}" for i in range(5)]
+
+def test_old_cursor_is_told_to_resync_after_compaction(client, monkeypatch, login, user_board):
+    monkeypatch.setattr(crud, "CHANGE_LOG_RETAIN", 3)
+    monkeypatch.setattr(crud, "CHANGE_LOG_COMPACT_EVERY", 4)
+    board = user_board(login("feed_user")["user_id"])
+    for i in range(10):
+        client.post("/api/cards", json={"title": f"Card {i}", "column_id": board["columns"][0]["id"]})
+
+    # Compaction ran on its own while the cards were written
+    feed = _changes(client, board["id"], 0)
+    assert feed["resync"] and feed["changes"] == []
+
+    recent = _changes(client, board["id"], feed["cursor"] - 2)
+    assert not recent["resync"]
+    assert [c["payload"]["title"] for c in recent["changes"]] == ["Card 8", "Card 9"]
+
+def test_feed_requires_board_owner(client, login, user_board):
+    board = user_board(login("feed_owner")["user_id"])
+    login("feed_intruder")
+    assert client.get(f"/api/boards/{board['id']}/changes", params={"since": 0}).status_code == 403
+
+def test_move_to_another_board_leaves_one_feed_and_enters_the_other(client, login, user_board):
+    board = user_board(login("feed_user")["user_id"])
+    other = client.post("/api/boards", json={"title": "Other", "user_id": 0}).json()
+    target = client.post("/api/columns", json={"title": "Inbox", "order": 0, "board_id": other["id"]}).json()
+    card = client.post("/api/cards", json={"title": "Travelling", "column_id": board["columns"][0]["id"]}).json()
+    cursors = {b: _changes(client, b, 0)["cursor"] for b in (board["id"], other["id"])}
+
+    assert client.patch(f"/api/cards/{card['id']}", json={"column_id": target["id"]}).status_code == 200
+
+    left = _changes(client, board["id"], cursors[board["id"]])["changes"]
+    entered = _changes(client, other["id"], cursors[other["id"]])["changes"]
+    assert [(c["entity_id"], c["op"]) for c in left] == [(card["id"], "delete")]
+    assert [(c["entity_id"], c["op"]) for c in entered] == [(card["id"], "create")]
+    assert entered[0]["payload"]["column_id"] == target["id"]
@@ -0,0 +1,62 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from board_context import build_board_context, estimate_tokens
+
+def _board(cards_per_column=200, columns=("To Do", "Doing", "Done")):
+    return {
+        "board_title": "Roadmap",
+        "columns": [
+            {
+                "id": c + 1,
+                "title": title,
+                "cards": [
+                    {
+                        "id": (c + 1) * 1000 + i,
+                        "title": "Renew invoice integration" if i == 150 else f"Task {i}",
+                        "description": "Lengthy notes " * 40,
+                    }
+                    for i in range(cards_per_column)
+                ],
+            }
+            for c, title in enumerate(columns)
+        ],
+    }
+
+def test_small_board_is_listed_in_full():
+    board = _board(cards_per_column=3)
+    context = build_board_context(board, "hello", budget=4000)
+    assert context.cards_listed == context.cards_total == 9
+    for column in board["columns"]:
+        assert f'Column {column["id"]} "{column["title"]}"' in context.text
+        for card in column["cards"]:
+            assert f"#{card['id']} {card['title']}" in context.text
+    # No card matched the message, so no descriptions are spent
+    assert context.descriptions == 0
+
+def test_budget_is_enforced_and_relevant_cards_come_first():
+    board = _board()
+    context = build_board_context(board, "Please rename the invoice integration card", budget=600)
+    assert context.tokens <= 600
+    assert context.tokens == estimate_tokens(context.text)
+    assert 0 < context.cards_listed < context.cards_total
+    # The matching cards deep in each column are included, with their descriptions and ids
+    for column_id in (1, 2, 3):
+        assert f"#{column_id * 1000 + 150} Renew invoice integration — Lengthy notes" in context.text
+    # Every column still appears, with the rest summarized
+    assert context.text.count("more cards not shown") == 3
+    assert '"Done"' in context.text
+
+def test_mentioned_card_ids_are_prioritized():
+    context = build_board_context(_board(), "delete card #3199", budget=300)
+    assert "#3199 Task 199" in context.text
+
+def test_long_fields_are_clipped():
+    board = {"board_title": "B", "columns": [{"id": 1, "title": "C", "cards": [
+        {"id": 7, "title": "alpha " * 100, "description": "beta " * 1000},
+    ]}]}
+    context = build_board_context(board, "alpha", budget=4000)
+    assert context.descriptions == 1
+    line = next(l for l in context.text.splitlines() if l.startswith("- #7"))
+    assert len(line) < 320
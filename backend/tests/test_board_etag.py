@@ -0,0 +1,66 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _board(client, user_id):
+    response = client.get(f"/api/users/{user_id}/boards")
+    return response, response.json()[0]
+
+def test_unchanged_boards_answer_304_without_loading_contents(client, db, login, count_queries):
+    user_id = login("etag_user")["user_id"]
+    response, _ = _board(client, user_id)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "Last-Modified" in response.headers
+
+    with count_queries(db.get_bind()) as statements:
+        response = client.get(f"/api/users/{user_id}/boards", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1
+    assert "columns" not in statements[0] and "cards" not in statements[0]
+
+def test_every_mutation_bumps_the_board_version(client, login):
+    user_id = login("etag_user")["user_id"]
+    _, board = _board(client, user_id)
+    todo, doing = board["columns"][0]["id"], board["columns"][1]["id"]
+
+    def mutations():
+        card = client.post("/api/cards", json={"title": "A", "column_id": todo}).json()
+        yield
+        other = client.post("/api/cards", json={"title": "B", "column_id": todo}).json()
+        yield
+        assert client.patch(f"/api/cards/{card['id']}", json={"title": "A2"}).status_code == 200
+        yield
+        assert client.patch(f"/api/cards/{card['id']}", json={"column_id": doing}).status_code == 200
+        yield
+        assert client.post(f"/api/boards/{board['id']}/moves", json={"moves": [{"card_id": other["id"], "column_id": doing, "order": 0}]}).status_code == 200
+        yield
+        assert client.delete(f"/api/cards/{card['id']}").status_code == 200
+        yield
+        column = client.post("/api/columns", json={"title": "New", "order": 3, "board_id": board["id"]}).json()
+        yield
+        assert client.patch(f"/api/columns/{column['id']}", json={"title": "Renamed"}).status_code == 200
+        yield
+        assert client.delete(f"/api/columns/{column['id']}").status_code == 200
+        yield
+
+    response, current = _board(client, user_id)
+    etag = response.headers["ETag"]
+    for _ in mutations():
+        response, updated = _board(client, user_id)
+        assert updated["version"] == current["version"] + 1
+        assert response.headers["ETag"] != etag
+        current, etag = updated, response.headers["ETag"]
+
+def test_stale_etag_gets_full_response(client, login):
+    user_id = login("etag_user")["user_id"]
+    response, board = _board(client, user_id)
+    etag = response.headers["ETag"]
+    client.post("/api/cards", json={"title": "New", "column_id": board["columns"][0]["id"]})
+
+    response = client.get(f"/api/users/{user_id}/boards", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["columns"][0]["cards"][0]["title"] == "New"
@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import insert
+import crud
+import models
+
+def test_summary_has_counts_and_leading_cards_in_fixed_queries(client, db, login, seed_large_board, count_queries):
+    user_id = seed_large_board("bigboard", columns=20, cards_per_column=100).id
+    board_id = crud.get_boards(db, user_id)[0].id
+    login("bigboard", "pw")
+
+    with count_queries(db.get_bind()) as statements:
+        response = client.get(f"/api/boards/{board_id}/summary", params={"cards_per_column": 3})
+    assert response.status_code == 200
+    # Ownership lookup, columns, counts, leading cards
+    assert len(statements) == 4
+
+    columns = response.json()["columns"]
+    assert len(columns) == 20
+    assert all(c["card_count"] == 100 for c in columns)
+    first = columns[0]
+    assert [card["title"] for card in first["cards"]] == [f"Card {first['id']}-{i}" for i in range(3)]
+
+    etag = response.headers["ETag"]
+    assert client.get(f"/api/boards/{board_id}/summary", headers={"If-None-Match": etag}).status_code == 304
+
+def test_column_pages_walk_every_card_once_in_order(client, db, login, seed_large_board):
+    user_id = seed_large_board("bigboard", columns=1, cards_per_column=95).id
+    column_id = crud.get_boards(db, user_id)[0].columns[0].id
+    # Cards sharing a rank are still ordered, and paged, by id
+    db.execute(insert(models.Card), [
+        {"title": f"Tie {i}", "order": 0, "rank": "0|zzzz", "column_id": column_id} for i in range(5)
+    ])
+    db.commit()
+    login("bigboard", "pw")
+
+    expected = [card.id for card in crud.get_board_snapshots(db, user_id)[0].columns[0].cards]
+    seen, params = [], {"limit": 7}
+    while True:
+        page = client.get(f"/api/columns/{column_id}/cards", params=params).json()
+        seen += [card["id"] for card in page["cards"]]
+        if not page["has_more"]:
+            break
+        params = {"limit": 7, "after": page["next_after"], "after_id": page["next_after_id"]}
+    assert seen == expected
+    assert len(seen) == 100
+
+def test_pagination_requires_ownership(client, db, login, seed_large_board):
+    other = seed_large_board("owner", columns=1, cards_per_column=1)
+    board = crud.get_boards(db, other.id)[0]
+    login("intruder", "pw")
+    assert client.get(f"/api/columns/{board.columns[0].id}/cards").status_code == 403
+    assert client.get(f"/api/boards/{board.id}/summary").status_code == 403
@@ -0,0 +1,34 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schemas import BoardCreate
+import crud
+import schemas
+
+def test_board_snapshot_uses_fixed_number_of_queries(db, seed_large_board, count_queries):
+    user_id = seed_large_board("bigboard").id
+    db.expire_all()
+
+    with count_queries(db.get_bind()) as statements:
+        boards = crud.get_board_snapshots(db, user_id)
+        payload = [schemas.Board.model_validate(b).model_dump() for b in boards]
+
+    assert len(statements) == 3
+    assert len(payload[0]["columns"]) == 50
+    assert sum(len(c["cards"]) for c in payload[0]["columns"]) == 5000
+    first_column = payload[0]["columns"][0]["cards"]
+    assert [c["rank"] for c in first_column] == sorted(c["rank"] for c in first_column)
+
+def test_read_user_boards_query_count_is_independent_of_board_size(client, db, login, seed_large_board, count_queries):
+    user_id = seed_large_board("bigboard").id
+    crud.create_board(db, BoardCreate(title="Second", user_id=user_id))
+    login("bigboard", "pw")
+
+    with count_queries(db.get_bind()) as statements:
+        response = client.get(f"/api/users/{user_id}/boards")
+
+    assert response.status_code == 200
+    assert [b["title"] for b in response.json()] == ["Big Board", "Second"]
+    # The ETag lookup plus the three snapshot queries
+    assert len(statements) <= 4
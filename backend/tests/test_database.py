@@ -0,0 +1,41 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text
+from database import create_async_db_engine, create_db_engine
+
+def _pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+def test_sqlite_engine_applies_tuned_profile(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    with engine.connect() as conn:
+        assert _pragma(conn, "journal_mode") == "wal"
+        assert _pragma(conn, "synchronous") == 1  # NORMAL
+        assert _pragma(conn, "busy_timeout") == 5000
+        assert _pragma(conn, "temp_store") == 2  # MEMORY
+        assert _pragma(conn, "cache_size") < 0
+    assert engine.pool.size() == 10
+    engine.dispose()
+
+def test_in_memory_sqlite_skips_file_only_pragmas():
+    engine = create_db_engine("sqlite://")
+    with engine.connect() as conn:
+        assert _pragma(conn, "journal_mode") == "memory"
+        assert _pragma(conn, "busy_timeout") == 5000
+    engine.dispose()
+
+def test_non_sqlite_urls_get_pool_settings_without_pragmas(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    pytest.importorskip("psycopg2")
+    engine = create_db_engine("postgresql+psycopg2://user:pw@localhost/kanban")
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+def test_missing_driver_names_the_extra(monkeypatch):
+    # None in sys.modules makes the import fail as if asyncpg were not installed
+    monkeypatch.setitem(sys.modules, "asyncpg", None)
+    with pytest.raises(RuntimeError, match=r"needs the asyncpg package \(uv sync --extra postgres\)"):
+        create_async_db_engine("postgresql://user:pw@localhost/kanban")
@@ -0,0 +1,99 @@
+import re
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+def _sample(text: str, name: str, **labels) -> float:
+    """Value of one sample in the exposition text, 0 if it is not there yet."""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = rf"^{re.escape(name)}{re.escape('{' + wanted + '}') if labels else ''} (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+def test_histogram_and_counter_exposition():
+    registry = metrics.Registry()
+    requests = registry.counter("test_total", "Test counter.", ("path",))
+    latency = registry.histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    requests.labels('/a "quoted"\\path').inc(3)
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE kanban_test_total counter" in text
+    assert 'kanban_test_total{path="/a \\"quoted\\"\\\\path"} 3' in text
+    # Buckets are cumulative and end with +Inf, which equals the count
+    assert 'kanban_test_seconds_bucket{le="0.1"} 1' in text
+    assert 'kanban_test_seconds_bucket{le="1.0"} 3' in text
+    assert 'kanban_test_seconds_bucket{le="+Inf"} 4' in text
+    assert "kanban_test_seconds_count 4" in text
+    assert "kanban_test_seconds_sum 6.05" in text
+
+def test_metric_kinds_must_define_their_children():
+    class Summary(metrics._Metric):
+        kind = "summary"
+
+    with pytest.raises(TypeError, match="_new_child"):
+        Summary("kanban_summary", "No child type.")
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    registry = metrics.Registry()
+    calls = registry.counter("disabled_total", "Test counter.")
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    calls.inc()
+    assert "kanban_disabled_total 0" in registry.render()
+
+def test_requests_are_counted_per_route_with_their_sql(client, login):
+    user_id = login("metrics_user")["user_id"]
+    route = "/api/users/{user_id}/boards"
+    before = client.get("/metrics").text
+
+    assert client.get(f"/api/users/{user_id}/boards").status_code == 200
+    assert client.get("/api/users/999999/boards").status_code == 403
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = response.text
+    ok = {"method": "GET", "route": route, "status": "200"}
+    forbidden = {"method": "GET", "route": route, "status": "403"}
+    assert _sample(after, "kanban_http_requests_total", **ok) == _sample(before, "kanban_http_requests_total", **ok) + 1
+    assert _sample(after, "kanban_http_requests_total", **forbidden) == _sample(before, "kanban_http_requests_total", **forbidden) + 1
+    assert _sample(after, "kanban_http_request_duration_seconds_count", method="GET", route=route) == \
+        _sample(before, "kanban_http_request_duration_seconds_count", method="GET", route=route) + 2
+    # The board read ran SQL and it was attributed to the route; the 403 ran none
+    assert _sample(after, "kanban_http_request_sql_statements_sum", route=route) > \
+        _sample(before, "kanban_http_request_sql_statements_sum", route=route)
+    assert _sample(after, "kanban_http_request_sql_statements_bucket", route=route, le="0") == \
+        _sample(before, "kanban_http_request_sql_statements_bucket", route=route, le="0") + 1
+    assert _sample(after, "kanban_sql_statement_duration_seconds_count") > _sample(before, "kanban_sql_statement_duration_seconds_count")
+    assert _sample(after, "kanban_password_hash_duration_seconds_count", operation="verify") >= 1
+    assert _sample(after, "kanban_http_requests_in_flight", method="GET") == 1
+
+def test_component_stats_are_exposed(client):
+    text = client.get("/metrics").text
+    assert 'kanban_ai_gateway_circuit{value="closed"} 1' in text
+    assert "kanban_ai_gateway_in_flight 0" in text
+    assert "kanban_ai_cache_hits " in text
+    assert "kanban_token_cache_size " in text
+    assert "kanban_realtime_subscribers " in text
+    assert "kanban_password_pool_rejected " in text
+
+def test_ai_latency_and_token_usage(client, fake_openai, login):
+    user_id = login("metrics_user")["user_id"]
+    before = client.get("/metrics").text
+
+    assert client.post("/api/ai/chat", json={"message": "hello", "user_id": user_id}).status_code == 200
+    assert client.post("/api/ai/chat/stream", json={"message": "stream it", "user_id": user_id}).status_code == 200
+
+    after = client.get("/metrics").text
+    for operation in ("chat", "stream"):
+        labels = {"provider": "openai", "operation": operation, "outcome": "ok"}
+        assert _sample(after, "kanban_ai_request_duration_seconds_count", **labels) == \
+            _sample(before, "kanban_ai_request_duration_seconds_count", **labels) + 1
+    assert fake_openai.requests[1]["stream_options"] == {"include_usage": True}
+    for kind, tokens in (("prompt", 120), ("completion", 30)):
+        assert _sample(after, "kanban_ai_tokens_total", provider="openai", kind=kind) == \
+            _sample(before, "kanban_ai_tokens_total", provider="openai", kind=kind) + 2 * tokens
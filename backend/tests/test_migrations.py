@@ -0,0 +1,136 @@
+import pytest
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+import crud
+import migrations
+import models
+
+# Schema as created by the first release, before ranks and indexes existed
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL)",
+    "CREATE TABLE boards (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, user_id INTEGER NOT NULL REFERENCES users (id))",
+    'CREATE TABLE columns (id INTEGER PRIMARY KEY, title VARCHAR(50) NOT NULL, "order" INTEGER NOT NULL, board_id INTEGER NOT NULL REFERENCES boards (id))',
+    'CREATE TABLE cards (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, "order" INTEGER NOT NULL, column_id INTEGER NOT NULL REFERENCES columns (id))',
+]
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users VALUES (1, 'old', 'x')"))
+        conn.execute(text("INSERT INTO boards VALUES (1, 'Old Board', 1)"))
+        conn.execute(text('INSERT INTO columns VALUES (1, \'To Do\', 0, 1)'))
+        conn.execute(text('INSERT INTO cards (id, title, "order", column_id) VALUES (1, \'second\', 1, 1), (2, \'first\', 0, 1)'))
+    yield engine
+    engine.dispose()
+
+def test_upgrade_migrates_legacy_database(legacy_engine):
+    assert migrations.current_version(legacy_engine) == 0
+
+    applied = migrations.upgrade(legacy_engine)
+
+    assert applied == [name for _, name, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(legacy_engine) == migrations.MIGRATIONS[-1][0]
+    indexes = {ix["name"] for table in ("boards", "columns", "cards") for ix in inspect(legacy_engine).get_indexes(table)}
+    assert {"ix_boards_user_id", "ix_columns_board_id_order", "ix_cards_column_id_rank"} <= indexes
+    with legacy_engine.connect() as conn:
+        titles = conn.execute(text("SELECT title FROM cards ORDER BY column_id, rank")).scalars().all()
+    assert titles == ["first", "second"]
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT version, updated_at IS NOT NULL FROM boards")).one() == (1, 1)
+
+    # Running again is a no-op
+    assert migrations.upgrade(legacy_engine) == []
+
+def test_upgrade_on_fresh_database_records_every_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations.upgrade(engine)
+    assert migrations.current_version(engine) == migrations.MIGRATIONS[-1][0]
+    engine.dispose()
+
+def test_concurrent_upgrades_apply_each_migration_once(tmp_path, monkeypatch):
+    # Widen the race window: every migration holds its transaction a little longer
+    def slowly(migrate):
+        def run(conn):
+            migrate(conn)
+            time.sleep(0.05)
+        return run
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(v, name, slowly(m)) for v, name, m in migrations.MIGRATIONS])
+
+    url = f"sqlite:///{tmp_path / 'race.db'}"
+    engines = [create_engine(url, connect_args={"timeout": 30}) for _ in range(2)]
+    barrier = threading.Barrier(len(engines))
+    def start(engine):
+        barrier.wait()
+        return migrations.upgrade(engine)
+
+    with ThreadPoolExecutor(len(engines)) as pool:
+        results = list(pool.map(start, engines))
+
+    applied = [name for result in results for name in result]
+    assert sorted(applied) == sorted(name for _, name, _ in migrations.MIGRATIONS)
+    with engines[0].connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(migrations.MIGRATIONS)
+    for engine in engines:
+        engine.dispose()
+
+def _query_plans(engine, fn):
+    """Run fn, capturing each SELECT it issues, and return their EXPLAIN QUERY PLAN details."""
+    captured = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append((statement, [row[-1] for row in rows]))
+    return plans
+
+def test_hot_queries_use_indexes(db):
+    user = crud.create_user(db, UserCreate(username="indexed", password="pw"))
+    for b in range(3):
+        board = crud.create_board(db, BoardCreate(title=f"Board {b}", user_id=user.id))
+        for c in range(3):
+            column = crud.create_column(db, ColumnCreate(title=f"Col {c}", order=c, board_id=board.id))
+            crud.create_card(db, CardCreate(title="Card", column_id=column.id))
+    card_id = db.query(models.Card.id).first()[0]
+    column_id = db.query(models.Column.id).first()[0]
+    engine = db.get_bind()
+    db.execute(text("ANALYZE"))
+
+    def hot_paths():
+        with Session(engine) as session:
+            crud.get_board_snapshots(session, user.id)
+            crud.get_board_versions(session, user.id)
+            crud.get_card_with_owner(session, card_id)
+            crud.get_column_with_owner(session, column_id)
+            crud.get_board_summary(session, session.get(models.Board, board.id), 5)
+            crud.get_column_cards_page(session, column_id, after="a", after_id=1, limit=5)
+            crud.create_card(session, CardCreate(title="Appended", column_id=column_id))
+            crud.create_card(session, CardCreate(title="Inserted", order=1, column_id=column_id))
+
+    plans = _query_plans(engine, hot_paths)
+    assert plans
+    for statement, details in plans:
+        for detail in details:
+            # Every table access must be an index search, never a full scan
+            # (scanning a subquery's own rows, e.g. "SCAN anon_1", is fine)
+            words = detail.split()
+            assert not (words[0] == "SCAN" and words[1] in models.Base.metadata.tables), (statement, details)
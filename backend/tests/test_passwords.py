@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import passwords
+from passwords import PasswordHasher, PasswordPoolBusy
+from models import User
+
+def register(client, username="pw_user", password="password"):
+    response = client.post("/api/auth/register", json={"username": username, "password": password})
+    assert response.status_code == 200
+    return response.json()
+
+def test_hashes_use_configured_rounds(client, db):
+    register(client)
+    user = db.query(User).filter(User.username == "pw_user").one()
+    assert passwords.hash_rounds(user.password_hash) == passwords.hasher.rounds
+
+def test_login_rehashes_when_cost_changes(client, db, monkeypatch):
+    register(client)
+    old_hash = db.query(User).filter(User.username == "pw_user").one().password_hash
+
+    monkeypatch.setattr(passwords.hasher, "rounds", passwords.hasher.rounds + 1)
+    assert client.post("/api/auth/login", json={"username": "pw_user", "password": "password"}).status_code == 200
+
+    db.expire_all()
+    new_hash = db.query(User).filter(User.username == "pw_user").one().password_hash
+    assert new_hash != old_hash
+    assert passwords.hash_rounds(new_hash) == passwords.hasher.rounds
+    # The upgraded hash still verifies
+    assert client.post("/api/auth/login", json={"username": "pw_user", "password": "password"}).status_code == 200
+
+def test_pool_rejects_work_beyond_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=2, rounds=4)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher._submit(release.wait))
+        second = asyncio.ensure_future(hasher._submit(release.wait))
+        try:
+            await hasher.hash("password")
+        except PasswordPoolBusy:
+            rejected = True
+        else:
+            rejected = False
+        release.set()
+        await asyncio.gather(first, second)
+        return rejected
+
+    try:
+        assert asyncio.run(scenario())
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["pending"] == 0
+        # Capacity is returned once the jobs finish
+        assert asyncio.run(hasher.verify("password", passwords.hash_password("password", 4)))
+    finally:
+        hasher.shutdown()
+
+def test_busy_pool_returns_429(client, monkeypatch):
+    register(client)
+    def busy(*args):
+        raise PasswordPoolBusy("Too many password operations in progress")
+    monkeypatch.setattr(passwords.hasher, "_submit", busy)
+    response = client.post("/api/auth/login", json={"username": "pw_user", "password": "password"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,34 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.encoders import jsonable_encoder
+import crud
+import payloads
+import schemas
+
+def test_board_payloads_match_the_board_schema(db, seed_large_board, count_queries):
+    user_id = seed_large_board("bigboard", columns=5, cards_per_column=20).id
+    crud.create_board(db, schemas.BoardCreate(title="Empty", user_id=user_id))
+    expected = [schemas.Board.model_validate(b).model_dump() for b in crud.get_board_snapshots(db, user_id)]
+
+    with count_queries(db.get_bind()) as statements:
+        rows = crud.get_board_payloads(db, user_id)
+    assert len(statements) == 3
+    assert rows == expected
+    assert [payloads.board_payload(b) for b in crud.get_board_snapshots(db, user_id)] == expected
+    # Same keys in the same order, so the JSON is byte-for-byte what response_model produced
+    assert payloads.dumps(rows) == json.dumps(jsonable_encoder(expected), separators=(",", ":")).encode()
+
+def test_read_user_boards_serves_the_fast_payload(client, db, seed_large_board):
+    user_id = seed_large_board("bigboard", columns=3, cards_per_column=10).id
+    token = client.post("/api/auth/login", json={"username": "bigboard", "password": "pw"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    expected = [schemas.Board.model_validate(b).model_dump() for b in crud.get_board_snapshots(db, user_id)]
+
+    response = client.get(f"/api/users/{user_id}/boards")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["ETag"]
+    assert response.json() == expected
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import crud
+import profiling
+
+def test_lazy_loading_in_a_loop_is_flagged_with_its_call_site(db, sql_profiler, seed_large_board):
+    user_id = seed_large_board("bigboard", columns=5, cards_per_column=3).id
+    db.expire_all()
+
+    with sql_profiler() as profile:
+        for board in crud.get_boards(db, user_id):
+            for column in board.columns:
+                column.cards
+
+    # One boards query, one columns load, then a cards load per column
+    assert len(profile) == 7
+    [pattern] = profile.n_plus_one()
+    assert pattern["count"] == 5
+    assert "FROM cards" in pattern["shape"]
+    assert pattern["call_sites"] == [f"tests/test_profiling.py:{test_lazy_loading_in_a_loop_is_flagged_with_its_call_site.__code__.co_firstlineno + 7} in test_lazy_loading_in_a_loop_is_flagged_with_its_call_site"]
+    with pytest.raises(AssertionError, match="N\\+1"):
+        profile.assert_no_n_plus_one()
+    with pytest.raises(AssertionError, match="query budget of 3 exceeded"):
+        profile.assert_at_most(3)
+
+def test_in_lists_of_any_length_share_a_shape():
+    assert profiling.statement_shape("SELECT * FROM cards WHERE id IN (?, ?,\n ?)") == \
+        profiling.statement_shape("SELECT * FROM cards WHERE id IN (?)")
+
+def test_board_reads_stay_within_their_query_budget(client, db, sql_profiler, login, seed_large_board):
+    user_id = seed_large_board("bigboard", columns=20, cards_per_column=50).id
+    board_id = crud.get_boards(db, user_id)[0].id
+    login("bigboard", "pw")
+
+    with sql_profiler() as profile:
+        assert client.get(f"/api/users/{user_id}/boards").status_code == 200
+    # Board versions for the ETag, then boards, columns and cards
+    profile.assert_at_most(4)
+    profile.assert_no_n_plus_one()
+    assert all(statement.call_site.startswith("crud.py:") for statement in profile.statements)
+
+    with sql_profiler() as profile:
+        assert client.get(f"/api/boards/{board_id}/summary").status_code == 200
+    profile.assert_at_most(4)
+    profile.assert_no_n_plus_one()
+
+def test_chat_loads_the_board_without_lazy_loads(client, db, sql_profiler, fake_openai, login, seed_large_board):
+    user_id = seed_large_board("bigboard", columns=10, cards_per_column=20).id
+    login("bigboard", "pw")
+    fake_openai.reply = {"response_message": "Added.", "operations": [
+        {"action": "add_card", "title": f"New {i}", "description": None, "column_name": "Col 0", "card_id": None}
+        for i in range(5)
+    ]}
+
+    with sql_profiler() as profile:
+        assert client.post("/api/ai/chat", json={"message": "add five", "user_id": user_id}).status_code == 200
+    profile.assert_no_n_plus_one()
+
+def test_requests_carry_their_profile_when_enabled(client, db, monkeypatch, login, seed_large_board):
+    monkeypatch.setattr(profiling, "PROFILE_SQL", True)
+    user_id = seed_large_board("bigboard", columns=3, cards_per_column=3).id
+    login("bigboard", "pw")
+
+    response = client.get(f"/api/users/{user_id}/boards")
+    assert response.status_code == 200
+    assert response.headers["X-SQL-Queries"] == "4"
+    assert response.headers["X-SQL-N-Plus-One"] == "0"
+    assert float(response.headers["X-SQL-Time-Ms"]) > 0
+
+    profile_id = response.headers["X-SQL-Profile"]
+    listed = client.get("/api/debug/sql-profiles").json()
+    assert listed[0]["id"] == int(profile_id)
+    assert listed[0]["label"] == f"GET /api/users/{user_id}/boards"
+    detail = client.get(f"/api/debug/sql-profiles/{profile_id}").json()
+    assert detail["statements"] == 4
+    assert [query["call_site"].split(":")[0] for query in detail["queries"]] == ["crud.py"] * 4
+
+    # Profiles hold other users' SQL, so each user reads back only their own
+    login("snooper")
+    assert client.get(f"/api/debug/sql-profiles/{profile_id}").status_code == 404
+    assert all(p["id"] != int(profile_id) for p in client.get("/api/debug/sql-profiles").json())
+    del client.headers["Authorization"]
+    assert client.get("/api/debug/sql-profiles").status_code in (401, 403)
+
+def test_debug_endpoints_are_hidden_when_disabled(client):
+    assert client.get("/api/debug/sql-profiles").status_code == 404
+    assert "X-SQL-Queries" not in client.get("/api/hello").headers
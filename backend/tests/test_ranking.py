@@ -0,0 +1,124 @@
+import pytest
+import random
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, text
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+import crud
+import migrations
+import ranking
+
+def test_rank_between_stays_ordered_under_random_inserts():
+    rng = random.Random(42)
+    keys = []
+    for _ in range(2000):
+        i = rng.randint(0, len(keys))
+        lower = keys[i - 1] if i > 0 else None
+        upper = keys[i] if i < len(keys) else None
+        keys.insert(i, ranking.rank_between(lower, upper))
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+def test_appending_grows_keys_logarithmically():
+    key = None
+    for _ in range(10000):
+        key = ranking.rank_between(key, None)
+    assert len(key) <= 4
+
+    keys = ranking.ranks_between(None, None, 5000)
+    assert keys == sorted(keys)
+    assert max(len(k) for k in keys) <= 4
+
+def test_rank_between_rejects_unordered_bounds():
+    with pytest.raises(ValueError):
+        ranking.rank_between("a1", "a1")
+
+def test_move_card_with_neighbours_writes_one_row(client, db, login):
+    user = crud.create_user(db, UserCreate(username="ranker", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    col = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    other = crud.create_column(db, ColumnCreate(title="Done", order=1, board_id=board.id))
+    cards = [crud.create_card(db, CardCreate(title=t, column_id=col.id)) for t in "ABCD"]
+    ranks_before = {c.id: c.rank for c in cards}
+    login("ranker", "pw")
+
+    # Move D between A and B
+    response = client.patch(f"/api/cards/{cards[3].id}", json={"after_id": cards[0].id, "before_id": cards[1].id})
+    assert response.status_code == 200
+
+    # Insert a new card right before A
+    response = client.post("/api/cards", json={"title": "Top", "column_id": col.id, "before_id": cards[0].id})
+    assert response.status_code == 200
+
+    # Move C to another column, after nothing in particular (append)
+    response = client.patch(f"/api/cards/{cards[2].id}", json={"column_id": other.id})
+    assert response.status_code == 200
+
+    board_data = client.get(f"/api/users/{user.id}/boards").json()[0]
+    titles = [[card["title"] for card in c["cards"]] for c in board_data["columns"]]
+    assert titles == [["Top", "A", "D", "B"], ["C"]]
+
+    # Untouched siblings kept their keys
+    db.expire_all()
+    for card in cards[:2]:
+        db.refresh(card)
+        assert card.rank == ranks_before[card.id]
+
+    # Neighbours must live in the target column
+    response = client.patch(f"/api/cards/{cards[0].id}", json={"after_id": cards[2].id})
+    assert response.status_code == 400
+
+def test_inverted_or_identical_anchors_are_rejected(client, db, login):
+    user = crud.create_user(db, UserCreate(username="anchors", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    col = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    a, b, c = [crud.create_card(db, CardCreate(title=t, column_id=col.id)) for t in "ABC"]
+    login("anchors", "pw")
+
+    for placement in ({"after_id": b.id, "before_id": a.id}, {"after_id": a.id, "before_id": a.id}):
+        response = client.patch(f"/api/cards/{c.id}", json=placement)
+        assert response.status_code == 400
+        response = client.post("/api/cards", json={"title": "New", "column_id": col.id, **placement})
+        assert response.status_code == 400
+
+    board_data = client.get(f"/api/users/{user.id}/boards").json()[0]
+    assert [card["title"] for card in board_data["columns"][0]["cards"]] == ["A", "B", "C"]
+
+def test_ranks_use_bytewise_collation_on_postgresql():
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+    import models
+    assert 'rank VARCHAR(255) COLLATE "C"' in str(CreateTable(models.Card.__table__).compile(dialect=postgresql.dialect()))
+
+def test_rebalance_column_shortens_keys(db):
+    user = crud.create_user(db, UserCreate(username="rebal", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    col = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    first = crud.create_card(db, CardCreate(title="first", column_id=col.id))
+    last = crud.create_card(db, CardCreate(title="last", column_id=col.id))
+    # Keep squeezing cards in right after `first` until the keys get long
+    for i in range(120):
+        crud.create_card(db, CardCreate(title=f"squeezed {i}", column_id=col.id, after_id=first.id))
+    db.refresh(col)
+    order_before = [c.id for c in col.cards]
+    assert any(ranking.needs_rebalance(c.rank) for c in col.cards)
+
+    crud.rebalance_column(db, col.id)
+    db.expire_all()
+    assert [c.id for c in col.cards] == order_before
+    assert not any(ranking.needs_rebalance(c.rank) for c in col.cards)
+    assert col.cards[-1].id == last.id
+
+def test_upgrade_backfills_ranks_from_dense_order(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE cards (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, "order" INTEGER NOT NULL, column_id INTEGER NOT NULL)'))
+        conn.execute(text('INSERT INTO cards (id, title, "order", column_id) VALUES (1, "b", 1, 1), (2, "a", 0, 1), (3, "c", 0, 2)'))
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT title FROM cards ORDER BY column_id, rank")).scalars().all()
+    assert rows == ["a", "b", "c"]
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+from starlette.websockets import WebSocketDisconnect
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import crud
+from realtime import ChangeLogBroker, Hub
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate
+from conftest import TestingAsyncSessionLocal
+
+def test_rest_mutations_are_pushed_to_subscribers(client, login, user_board):
+    session = login("live_user")
+    token, board = session["access_token"], user_board(session["user_id"])
+    column_id = board["columns"][0]["id"]
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={token}") as ws:
+        card = client.post("/api/cards", json={"title": "Live", "column_id": column_id}).json()
+        client.patch(f"/api/cards/{card['id']}", json={"title": "Edited"})
+
+        created, updated = ws.receive_json(), ws.receive_json()
+    assert created["type"] == "change" and created["op"] == "create"
+    assert created["payload"]["title"] == "Live"
+    assert (updated["entity_id"], updated["op"], updated["payload"]) == (card["id"], "update", {"title": "Edited"})
+    # Events carry change-feed seqs, so a reconnecting client can catch up from the last one
+    feed = client.get(f"/api/boards/{board['id']}/changes", params={"since": created["seq"]}).json()
+    assert [c["seq"] for c in feed["changes"]] == [updated["seq"]]
+
+def test_ai_operations_are_pushed_to_subscribers(client, login, user_board):
+    from ai_service import AIResponse, BoardOperation
+    session = login("live_user")
+    token, board = session["access_token"], user_board(session["user_id"])
+    ai_response = AIResponse(
+        response_message="Added.",
+        operations=[BoardOperation(action="add_card", title="From AI", column_name="To Do")],
+    )
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={token}") as ws:
+        with patch('main.process_chat', new_callable=AsyncMock) as mock_process:
+            mock_process.return_value = ai_response
+            client.post("/api/ai/chat", json={"message": "add", "user_id": board["user_id"]})
+        event = ws.receive_json()
+    assert event["op"] == "create" and event["payload"]["title"] == "From AI"
+
+def test_subscribing_requires_board_owner(client, login, user_board):
+    board = user_board(login("live_owner")["user_id"])
+    intruder_token = login("live_intruder")["access_token"]
+    for bad_token in ("", "garbage", intruder_token):
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={bad_token}") as ws:
+                ws.receive_json()
+        assert excinfo.value.code == 1008
+
+def test_slow_consumer_is_evicted_without_affecting_others():
+    async def scenario():
+        hub = Hub(queue_size=2)
+        slow, fast = hub.subscribe(1), hub.subscribe(1)
+        received = []
+        for i in range(3):
+            hub.dispatch(1, f"event {i}")
+            received.append(await fast.get())
+        return hub, slow, fast, received
+
+    hub, slow, fast, received = asyncio.run(scenario())
+    assert received == ["event 0", "event 1", "event 2"]
+    assert slow.evicted and not fast.evicted
+    assert hub.stats()["subscribers"] == 1 and hub.stats()["evicted"] == 1
+
+@pytest.mark.asyncio
+async def test_changelog_broker_delivers_commits_from_other_workers(db):
+    user = crud.create_user(db, UserCreate(username="worker", password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Shared", user_id=user.id))
+    column = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+
+    hub = Hub()
+    broker = ChangeLogBroker(hub, TestingAsyncSessionLocal, interval=0.01)
+    await broker.start()
+    try:
+        subscription = hub.subscribe(board.id)
+        # Written through a plain session, as another worker process would
+        crud.create_card(db, CardCreate(title="Elsewhere", column_id=column.id))
+        message = await asyncio.wait_for(subscription.get(), timeout=2)
+    finally:
+        await broker.stop()
+    assert '"title": "Elsewhere"' in message
@@ -0,0 +1,96 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, text
+from schemas import UserCreate, BoardCreate, ColumnCreate, CardCreate, CardUpdate
+import crud
+import migrations
+
+def _board(db, username):
+    user = crud.create_user(db, UserCreate(username=username, password="pw"))
+    board = crud.create_board(db, BoardCreate(title="Board", user_id=user.id))
+    column = crud.create_column(db, ColumnCreate(title="To Do", order=0, board_id=board.id))
+    return user, board, column
+
+def _ids(hits):
+    return [hit["id"] for hit in hits]
+
+def test_search_ranks_title_matches_first_and_matches_prefixes(db):
+    _, board, column = _board(db, "searcher")
+    in_description = crud.create_card(db, CardCreate(title="Tidy up", description="deployment notes", column_id=column.id))
+    in_title = crud.create_card(db, CardCreate(title="Deploy to staging", description="", column_id=column.id))
+    crud.create_card(db, CardCreate(title="Unrelated", description="nothing here", column_id=column.id))
+
+    assert _ids(crud.search_cards(db, board.id, "deploy")) == [in_title.id, in_description.id]
+    assert _ids(crud.search_cards(db, board.id, "DEPL stag")) == [in_title.id]
+    assert crud.search_cards(db, board.id, "   ") == []
+    assert len(crud.search_cards(db, board.id, '"deploy*')) == 2  # FTS syntax in the query is not interpreted
+
+    hit = crud.search_cards(db, board.id, "deploy")[1]
+    assert hit["title_highlight"] == "Tidy up"
+    assert hit["description_snippet"] == "<mark>deployment</mark> notes"
+
+def test_highlights_are_html_escaped(db):
+    _, board, column = _board(db, "escaper")
+    crud.create_card(db, CardCreate(title="<b>bold</b> move", column_id=column.id))
+    hit, = crud.search_cards(db, board.id, "move")
+    assert hit["title_highlight"] == "&lt;b&gt;bold&lt;/b&gt; <mark>move</mark>"
+
+def test_index_follows_every_write_path(db):
+    _, board, column = _board(db, "writer")
+    card = crud.create_card(db, CardCreate(title="Original", column_id=column.id))
+    crud.update_card(db, card, CardUpdate(title="Renamed"))
+    assert crud.search_cards(db, board.id, "original") == []
+    assert _ids(crud.search_cards(db, board.id, "renamed")) == [card.id]
+
+    crud.delete_card(db, card)
+    assert crud.search_cards(db, board.id, "renamed") == []
+
+    crud.create_card(db, CardCreate(title="Column casualty", column_id=column.id))
+    crud.delete_column(db, column)
+    assert crud.search_cards(db, board.id, "casualty") == []
+    assert db.execute(text("SELECT count(*) FROM cards_fts WHERE cards_fts MATCH 'casualty'")).scalar() == 0
+
+def test_search_endpoint_is_scoped_to_the_owner_board(client, db):
+    _, other_board, other_column = _board(db, "other")
+    crud.create_card(db, CardCreate(title="Secret plan", column_id=other_column.id))
+    client.post("/api/auth/register", json={"username": "finder", "password": "password"})
+    login = client.post("/api/auth/login", json={"username": "finder", "password": "password"}).json()
+    client.headers["Authorization"] = f"Bearer {login['access_token']}"
+    board = client.get(f"/api/users/{login['user_id']}/boards").json()[0]
+    client.post("/api/cards", json={"title": "Plan the sprint", "column_id": board["columns"][0]["id"]})
+
+    response = client.get(f"/api/boards/{board['id']}/search", params={"q": "plan"})
+    assert response.status_code == 200
+    assert [hit["title_highlight"] for hit in response.json()] == ["<mark>Plan</mark> the sprint"]
+    assert client.get(f"/api/boards/{other_board.id}/search", params={"q": "plan"}).status_code == 403
+
+def test_migration_indexes_existing_cards(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL)"))
+        conn.execute(text("CREATE TABLE boards (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, user_id INTEGER NOT NULL)"))
+        conn.execute(text('CREATE TABLE columns (id INTEGER PRIMARY KEY, title VARCHAR(50) NOT NULL, "order" INTEGER NOT NULL, board_id INTEGER NOT NULL)'))
+        conn.execute(text('CREATE TABLE cards (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, "order" INTEGER NOT NULL, column_id INTEGER NOT NULL)'))
+        conn.execute(text("INSERT INTO boards VALUES (1, 'Old', 1)"))
+        conn.execute(text("INSERT INTO columns VALUES (1, 'To Do', 0, 1)"))
+        conn.execute(text("""INSERT INTO cards (id, title, description, "order", column_id) VALUES (7, 'Legacy card', 'from before search', 0, 1)"""))
+
+    migrations.upgrade(engine)
+
+    from sqlalchemy.orm import Session
+    with Session(engine) as db:
+        assert _ids(crud.search_cards(db, 1, "legacy")) == [7]
+        assert _ids(crud.search_cards(db, 1, "before")) == [7]
+    engine.dispose()
+
+def test_every_match_is_ranked_not_just_the_newest(db):
+    _, board, column = _board(db, "many")
+    oldest_title_match = crud.create_card(db, CardCreate(title="report", column_id=column.id))
+    for i in range(30):
+        crud.create_card(db, CardCreate(title="x", description=f"report {i}", column_id=column.id))
+
+    # The oldest card is the only title match, so it leads even a one-result page
+    assert _ids(crud.search_cards(db, board.id, "report", limit=1)) == [oldest_title_match.id]
+    assert len(crud.search_cards(db, board.id, "report", limit=100)) == 31
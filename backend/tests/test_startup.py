@@ -0,0 +1,56 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, text
+import crud
+import main
+import migrations
+import passwords
+
+def test_upgrade_of_a_current_database_only_inspects_it(tmp_path, sql_profiler):
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    assert not migrations.is_current(engine)
+    migrations.upgrade(engine)
+    assert migrations.is_current(engine)
+
+    with sql_profiler() as profile:
+        assert migrations.upgrade(engine) == []
+    assert not any(statement.sql.lstrip().upper().startswith(("CREATE", "INSERT", "UPDATE", "ALTER"))
+                   for statement in profile.statements)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM schema_migrations WHERE version = (SELECT MAX(version) FROM schema_migrations)"))
+    assert not migrations.is_current(engine)
+    engine.dispose()
+
+def test_register_creates_user_and_board_in_one_transaction(client, db, sql_profiler):
+    with sql_profiler() as profile:
+        response = client.post("/api/auth/register", json={"username": "newcomer", "password": "pw"})
+    assert response.status_code == 200
+    # Username check, then user, board and columns inserts
+    profile.assert_at_most(6)
+    profile.assert_no_n_plus_one()
+
+    user_id = response.json()["user_id"]
+    [board] = crud.get_board_snapshots(db, user_id)
+    assert board.title == "Default Board"
+    assert [(column.title, column.order) for column in board.columns] == [("To Do", 0), ("In Progress", 1), ("Done", 2)]
+    assert crud.get_board_changes(db, board, 0)["changes"] == []
+
+    duplicate = client.post("/api/auth/register", json={"username": "newcomer", "password": "pw"})
+    assert duplicate.status_code == 400
+
+def test_demo_seed_is_built_once(db):
+    main.setup_dummy_data(db)
+    main.setup_dummy_data(db)
+
+    user = crud.get_user_by_username(db, "user")
+    assert passwords.verify_password("password", user.password_hash)
+    [board] = crud.get_board_snapshots(db, user.id)
+    assert [column.title for column in board.columns] == ["Backlog", "Discovery", "In Progress", "Review", "Done"]
+    cards = [card for column in board.columns for card in column.cards]
+    assert len(cards) == 8
+    # Ranks ascend within each column
+    for column in board.columns:
+        assert [card.rank for card in column.cards] == sorted(card.rank for card in column.cards)
@@ -0,0 +1,76 @@
+import gzip
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import static_assets
+
+SCRIPT = b"console.log('kanban');\n" * 200
+
+@pytest.fixture
+def static_client(tmp_path):
+    chunks = tmp_path / "_next" / "static" / "chunks"
+    chunks.mkdir(parents=True)
+    (chunks / "app-3f2a.js").write_bytes(SCRIPT)
+    (chunks / "app-3f2a.js.gz").write_bytes(gzip.compress(SCRIPT))
+    # Not real brotli: the tests read the raw body, so any bytes identify the variant
+    (chunks / "app-3f2a.js.br").write_bytes(b"brotli-bytes")
+    (tmp_path / "index.html").write_bytes(b"<html>board</html>")
+
+    app = FastAPI()
+    app.mount("/", static_assets.PrecompressedStaticFiles(directory=tmp_path, html=True), name="static")
+    with TestClient(app) as client:
+        yield client
+
+def _raw(client, path, **headers):
+    with client.stream("GET", path, headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+def test_accept_encoding_parsing():
+    assert static_assets.accepted_encodings("gzip, deflate, br;q=0.8") == {"gzip", "deflate", "br"}
+    assert static_assets.accepted_encodings("br;q=0, GZIP") == {"gzip"}
+    assert static_assets.accepted_encodings("") == set()
+
+def test_serves_the_best_precompressed_sibling(static_client):
+    path = "/_next/static/chunks/app-3f2a.js"
+
+    response, body = _raw(static_client, path, **{"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert body == b"brotli-bytes"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response = static_client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == SCRIPT
+
+    response, body = _raw(static_client, path, **{"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert body == SCRIPT
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_hashed_assets_are_immutable_and_html_revalidates(static_client):
+    asset = static_client.get("/_next/static/chunks/app-3f2a.js", headers={"Accept-Encoding": "gzip"})
+    assert asset.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    page = static_client.get("/")
+    assert page.headers["cache-control"] == "no-cache"
+    assert "vary" not in page.headers
+    revalidated = static_client.get("/", headers={"If-None-Match": page.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["cache-control"] == "no-cache"
+
+def test_each_encoding_has_its_own_etag(static_client):
+    path = "/_next/static/chunks/app-3f2a.js"
+    gzipped = static_client.get(path, headers={"Accept-Encoding": "gzip"})
+    plain, _ = _raw(static_client, path, **{"Accept-Encoding": "identity"})
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+
+    # A gzip ETag must not validate the uncompressed representation
+    response, _ = _raw(static_client, path, **{"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]})
+    assert response.status_code == 200
+    response = static_client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert response.status_code == 304
@@ -0,0 +1,86 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import auth
+from auth import TokenCache
+
+def login(client, username="cache_user"):
+    client.post("/api/auth/register", json={"username": username, "password": "password"})
+    response = client.post("/api/auth/login", json={"username": username, "password": "password"})
+    return response.json()["user_id"], {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_repeat_requests_skip_jwt_decode(client, monkeypatch):
+    user_id, headers = login(client)
+    decodes = []
+    real_decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+    hits = auth.token_cache.hits
+
+    for _ in range(5):
+        assert client.get(f"/api/users/{user_id}/boards", headers=headers).status_code == 200
+    # Login already cached the token it issued
+    assert len(decodes) == 0
+    assert auth.token_cache.hits - hits == 5
+
+    # After the entry is gone (another worker, a restart) one decode re-caches it
+    auth.token_cache.clear()
+    for _ in range(3):
+        assert client.get(f"/api/users/{user_id}/boards", headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+def test_logout_revokes_token(client):
+    user_id, headers = login(client)
+    assert client.get(f"/api/users/{user_id}/boards", headers=headers).status_code == 200
+
+    assert client.get("/api/auth/logout", headers=headers).status_code == 200
+    assert client.get(f"/api/users/{user_id}/boards", headers=headers).status_code == 401
+
+    # A fresh login gets a new token that works
+    _, new_headers = login(client)
+    assert client.get(f"/api/users/{user_id}/boards", headers=new_headers).status_code == 200
+
+def test_revocation_outlives_the_process_cache(client):
+    user_id, headers = login(client)
+    assert client.get("/api/auth/logout", headers=headers).status_code == 200
+
+    # Another worker, or this one after a restart, has no memory of the logout
+    auth.token_cache.clear()
+    assert client.get(f"/api/users/{user_id}/boards", headers=headers).status_code == 401
+    assert auth.token_cache.is_revoked(headers["Authorization"].removeprefix("Bearer "))
+
+def test_entries_expire_with_token_exp():
+    now = [1000.0]
+    cache = TokenCache(maxsize=10, ttl=300, clock=lambda: now[0])
+    cache.put("short", 1, exp=1010)
+    cache.put("long", 2, exp=5000)
+    now[0] = 1011
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    now[0] = 1301
+    # Capped by the TTL even though the token is still valid
+    assert cache.get("long") is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_is_bounded_lru():
+    cache = TokenCache(maxsize=2, ttl=300)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+def test_revoked_tokens_are_not_recached():
+    cache = TokenCache(maxsize=10, ttl=300)
+    cache.put("t", 1)
+    cache.revoke("t")
+    cache.put("t", 1)
+    assert cache.get("t") is None
+    assert cache.is_revoked("t")
+
+def test_stats_endpoint(client):
+    _, headers = login(client)
+    stats = client.get("/api/auth/token-cache", headers=headers).json()
+    assert {"size", "maxsize", "hits", "misses", "revoked"} <= stats.keys()
@@ -0,0 +1,45 @@
+// Writes .br and .gz siblings for the compressible files of a static export,
+// served by the backend's PrecompressedStaticFiles according to Accept-Encoding.
+//
+//   node scripts/compress-static.mjs out
+import { readdir, readFile, stat, writeFile } from "node:fs/promises";
+import { join, extname } from "node:path";
+import { brotliCompressSync, gzipSync, constants } from "node:zlib";
+
+const COMPRESSIBLE = new Set([
+  ".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".webmanifest",
+]);
+// Below this the framing overhead outweighs the savings
+const MIN_BYTES = 1024;
+
+async function* files(dir) {
+  for (const entry of await readdir(dir, { withFileTypes: true })) {
+    const path = join(dir, entry.name);
+    if (entry.isDirectory()) yield* files(path);
+    else if (entry.isFile()) yield path;
+  }
+}
+
+const root = process.argv[2] ?? "out";
+let original = 0;
+let brotli = 0;
+for await (const path of files(root)) {
+  if (!COMPRESSIBLE.has(extname(path)) || (await stat(path)).size < MIN_BYTES) continue;
+  const data = await readFile(path);
+  const variants = [
+    [".br", brotliCompressSync(data, {
+      params: {
+        [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+        [constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+      },
+    })],
+    [".gz", gzipSync(data, { level: 9 })],
+  ];
+  for (const [suffix, compressed] of variants) {
+    // Only keep a variant that is actually smaller
+    if (compressed.length < data.length) await writeFile(path + suffix, compressed);
+  }
+  original += data.length;
+  brotli += Math.min(data.length, variants[0][1].length);
+}
+console.log(`compressed ${(original / 1024).toFixed(0)} KiB of assets to ${(brotli / 1024).toFixed(0)} KiB (brotli)`);
@@ -74,7 +74,12 @@ export function AIChatSidebar({ userId, onUpdateBoard }: AIChatSidebarProps) {
           onUpdateBoard({ columns, cards });
         }
       } else {
-        setMessages((prev) => [...prev, { role: "assistant", content: data.detail || "Error." }]);
+        // 409/422 carry the reply whose changes were not applied
+        const detail = data.detail;
+        const content = typeof detail === "object" && detail !== null
+          ? `${detail.response_message}\n\n(These changes were not applied: ${detail.errors.join("; ")})`
+          : detail || "Error.";
+        setMessages((prev) => [...prev, { role: "assistant", content }]);
       }
     } catch (err) {
       console.error(err);
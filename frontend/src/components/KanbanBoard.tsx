@@ -86,7 +86,7 @@ export const KanbanBoard = ({ userId, onLogout, initialBoard }: KanbanBoardProps
           const columns: Column[] = dbBoard.columns.map((c: DBColumn) => ({
             id: toColId(c.id),
             title: c.title,
-            cardIds: c.cards.sort((a: DBCard, b: DBCard) => a.order - b.order).map((card: DBCard) => toCardId(card.id)),
+            cardIds: c.cards.sort((a: DBCard, b: DBCard) => (a.rank < b.rank ? -1 : a.rank > b.rank ? 1 : a.id - b.id)).map((card: DBCard) => toCardId(card.id)),
           }));
 
           const cards: Record<string, Card> = {};
@@ -197,38 +197,29 @@ export const KanbanBoard = ({ userId, onLogout, initialBoard }: KanbanBoardProps
         if (!activeColumnId) return;
 
         const targetColumn = finalColumns.find(c => c.cardIds.includes(activeId));
-        const sourceColumn = finalColumns.find(c => c.id === activeColumnId);
         if (!targetColumn) return;
 
         const targetColIdNum = fromPrefixedId(targetColumn.id);
-        const sourceColIdNum = sourceColumn ? fromPrefixedId(sourceColumn.id) : null;
-
-        if (!isNaN(targetColIdNum)) {
-          const updates = targetColumn.cardIds.map((id, index) => {
-            const numId = fromPrefixedId(id);
-            if (!isNaN(numId)) {
-              return fetch(`/api/cards/${numId}`, {
-                method: "PATCH",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ column_id: targetColIdNum, order: index }),
-              });
-            }
-            return Promise.resolve();
+        const cardIdNum = fromPrefixedId(activeId);
+
+        if (!isNaN(targetColIdNum) && !isNaN(cardIdNum)) {
+          // Place the card between its new neighbours; no other card is rewritten
+          const index = targetColumn.cardIds.indexOf(activeId);
+          const afterId = index > 0 ? fromPrefixedId(targetColumn.cardIds[index - 1]) : NaN;
+          const beforeId = index < targetColumn.cardIds.length - 1 ? fromPrefixedId(targetColumn.cardIds[index + 1]) : NaN;
+
+          await fetch(`/api/cards/${cardIdNum}`, {
+            method: "PATCH",
+            headers: {
+              "Content-Type": "application/json",
+              ...(userToken ? { "Authorization": `Bearer ${userToken}` } : {}),
+            },
+            body: JSON.stringify({
+              column_id: targetColIdNum,
+              ...(isNaN(afterId) ? {} : { after_id: afterId }),
+              ...(isNaN(beforeId) ? {} : { before_id: beforeId }),
+            }),
           });
-
-          if (sourceColumn && sourceColIdNum !== targetColIdNum) {
-            sourceColumn.cardIds.forEach((id, index) => {
-              const numId = fromPrefixedId(id);
-              if (!isNaN(numId)) {
-                updates.push(fetch(`/api/cards/${numId}`, {
-                  method: "PATCH",
-                  headers: { "Content-Type": "application/json" },
-                  body: JSON.stringify({ column_id: sourceColIdNum, order: index }),
-                }));
-              }
-            });
-          }
-          await Promise.all(updates);
         }
       } catch (e) {
         console.error("Failed to update card position", e);
@@ -236,7 +227,7 @@ export const KanbanBoard = ({ userId, onLogout, initialBoard }: KanbanBoardProps
     }, 0);
 
     pointerPosRef.current = null;
-  }, [board.columns]);
+  }, [board.columns, userToken]);
 
   const handleRenameColumn = useCallback(async (columnId: string, title: string) => {
     setBoard((prev) => ({
@@ -20,6 +20,7 @@ export type DBCard = {
   title: string;
   description: string | null;
   order: number;
+  rank: string;
 };
 
 export type DBColumn = {